@@ -68,6 +68,8 @@ class Raqueta:
         self._puntos = 0
         self._posicion_marcador = posicion_marcador
         self._tipo_letra = pygame.font.SysFont('arial', TAMANO_FUENTE)
+        # Texto del marcador ya renderizado (None si hay que volver a renderizarlo)
+        self._marcador = None
     
     @property
     def puntos(self) -> int:
@@ -76,6 +78,8 @@ class Raqueta:
     @puntos.setter
     def puntos(self, valor: int):
         self._puntos = valor
+        # El marcador ha cambiado, hay que volver a renderizarlo
+        self._marcador = None
     
     def mover(self, direccion: int):
         """Mueve la raqueta en la dirección especificada"""
@@ -104,8 +108,9 @@ class Raqueta:
     
     def dibuja_marcador(self, pantalla: pygame.Surface):
         """Dibuja el marcador en la pantalla"""
-        marcador = self._tipo_letra.render(str(self._puntos), True, BLANCO)
-        pantalla.blit(marcador, self._posicion_marcador + (50, 50))
+        if self._marcador is None:
+            self._marcador = self._tipo_letra.render(str(self._puntos), True, BLANCO)
+        pantalla.blit(self._marcador, self._posicion_marcador + (50, 50))
 
 class Pelota:
     """Clase que representa la pelota y su comportamiento"""
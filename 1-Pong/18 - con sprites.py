@@ -72,6 +72,9 @@ class Raqueta(pygame.sprite.Sprite):
         self.puntos = 0
         self.posicion_marcador = posicion_marcador
         self.tipo_letra = pygame.font.SysFont('arial', 96)
+        # El texto del marcador solo se vuelve a renderizar cuando cambian los puntos
+        self.marcador = None
+        self.puntos_marcador = None
 
     def controla_y(self):
         """Controla que la raqueta no se salga de los límites verticales"""
@@ -92,8 +95,10 @@ class Raqueta(pygame.sprite.Sprite):
 
     def dibuja_marcador(self, pantalla: pygame.Surface):
         """Dibuja el marcador en la pantalla"""
-        marcador = self.tipo_letra.render(str(self.puntos), True, BLANCO)
-        pantalla.blit(marcador, self.posicion_marcador)
+        if self.puntos != self.puntos_marcador:
+            self.marcador = self.tipo_letra.render(str(self.puntos), True, BLANCO)
+            self.puntos_marcador = self.puntos
+        pantalla.blit(self.marcador, self.posicion_marcador)
 
 # -------------------------------------------------
 # Pelota
@@ -0,0 +1,368 @@
+"""
+Ejemplo 19: Máquina de estados sin esperas bloqueantes
+Este ejemplo reorganiza el bucle del juego de sprites como una máquina de estados:
+
+1. Estados del juego:
+   - ESPERANDO_TECLA: pantalla de inicio, hasta que se pulsa una tecla
+   - SACANDO: la pelota espera un momento en el centro antes de salir
+   - JUGANDO: la pelota se mueve y rebota
+   - PUNTO: se ha marcado un punto y el juego se para un momento
+
+2. Características:
+   - Las esperas se cuentan con el reloj del juego en lugar de con time.sleep(),
+     así que la ventana sigue respondiendo (se puede cerrar o salir con ESC)
+   - En los estados en los que no se mueve nada se usa pygame.event.wait(), que
+     duerme hasta que llega un evento en lugar de consultar la cola sin parar
+"""
+
+# -------------------------------------------------
+# Importar las librerías
+# -------------------------------------------------
+import pygame
+import sys
+from pygame.locals import *
+from typing import Optional, Tuple, List
+
+# -------------------------------------------------
+# Constantes
+# -------------------------------------------------
+
+# Colores
+BLANCO = (255, 255, 255)
+NEGRO = (0, 0, 0)
+
+# Configuración del juego
+FPS = 60
+ANCHO_VENTANA = 800
+ALTO_VENTANA = 600
+VELOCIDAD_RAQUETA = 5
+
+# Estados del juego
+ESPERANDO_TECLA = 0
+SACANDO = 1
+JUGANDO = 2
+PUNTO = 3
+
+# Duración (en milisegundos) de los estados que se acaban solos
+TIEMPO_SAQUE = 500
+TIEMPO_PUNTO = 1000
+
+# Rutas de recursos
+RUTA_RAQUETA = 'recursos/raqueta.png'
+RUTA_PELOTA = 'recursos/pelota.png'
+RUTA_FONDO = 'recursos/pistaTenis.jpg'
+RUTA_SONIDO_RAQUETA = 'recursos/Ping_Pong.wav'
+RUTA_SONIDO_PUNTO = 'recursos/Aplausos.wav'
+
+# -------------------------------------------------
+# Clases de los objetos del juego
+# -------------------------------------------------
+
+# -------------------------------------------------
+# Raqueta
+
+class Raqueta(pygame.sprite.Sprite):
+    """Las raquetas de ambos jugadores implementadas como sprites"""
+
+    def __init__(self, posicion: Tuple[int, int], posicion_marcador: Tuple[int, int]):
+        # Inicializar la clase padre Sprite
+        super().__init__()
+        
+        try:
+            # Cargar y configurar la imagen
+            self.image = pygame.image.load(RUTA_RAQUETA)
+            self.rect = self.image.get_rect()
+            self.rect.centerx = posicion[0]
+            self.rect.centery = posicion[1]
+        except pygame.error as e:
+            print(f"Error al cargar la imagen de la raqueta: {e}")
+            # Crear un rectángulo blanco como fallback
+            self.image = pygame.Surface((10, 50))
+            self.image.fill(BLANCO)
+            self.rect = self.image.get_rect()
+            self.rect.centerx = posicion[0]
+            self.rect.centery = posicion[1]
+        
+        # Configuración del marcador
+        self.puntos = 0
+        self.posicion_marcador = posicion_marcador
+        self.tipo_letra = pygame.font.SysFont('arial', 96)
+        # El texto del marcador solo se vuelve a renderizar cuando cambian los puntos
+        self.marcador = None
+        self.puntos_marcador = None
+
+    def controla_y(self):
+        """Controla que la raqueta no se salga de los límites verticales"""
+        if self.rect.top <= 0:
+            self.rect.top = 0
+        if self.rect.bottom >= ALTO_VENTANA:
+            self.rect.bottom = ALTO_VENTANA
+
+    def colision(self, pelota: 'Pelota') -> bool:
+        """Detecta colisión con la pelota usando los rectángulos de los sprites"""
+        return self.rect.colliderect(pelota.rect)
+
+    def update(self, direccion: int = 0):
+        """Actualiza la posición de la raqueta según la dirección"""
+        if direccion:
+            self.rect.centery += direccion * VELOCIDAD_RAQUETA
+            self.controla_y()
+
+    def dibuja_marcador(self, pantalla: pygame.Surface):
+        """Dibuja el marcador en la pantalla"""
+        if self.puntos != self.puntos_marcador:
+            self.marcador = self.tipo_letra.render(str(self.puntos), True, BLANCO)
+            self.puntos_marcador = self.puntos
+        pantalla.blit(self.marcador, self.posicion_marcador)
+
+# -------------------------------------------------
+# Pelota
+    
+class Pelota(pygame.sprite.Sprite):
+    """La pelota y su comportamiento implementada como sprite"""
+
+    def __init__(self, sonido_raqueta: Optional[pygame.mixer.Sound], sonido_punto: Optional[pygame.mixer.Sound]):
+        # Inicializar la clase padre Sprite
+        super().__init__()
+        
+        try:
+            # Cargar y configurar la imagen
+            self.image = pygame.image.load(RUTA_PELOTA)
+            self.rect = self.image.get_rect()
+        except pygame.error as e:
+            print(f"Error al cargar la imagen de la pelota: {e}")
+            # Crear un círculo blanco como fallback
+            self.image = pygame.Surface((8, 8))
+            pygame.draw.circle(self.image, BLANCO, (4, 4), 4)
+            self.rect = self.image.get_rect()
+        
+        # Posición inicial
+        self.rect.centerx = ANCHO_VENTANA // 2
+        self.rect.centery = ALTO_VENTANA // 2
+        
+        # Velocidad inicial
+        self.velocidad = [2, 2]
+        
+        # Sonidos
+        self.sonido_raqueta = sonido_raqueta
+        self.sonido_punto = sonido_punto
+
+    def update(self, jugador1: Raqueta, jugador2: Raqueta) -> Optional[Tuple[int, int]]:
+        """
+        Actualiza la posición de la pelota y maneja colisiones
+        
+        Returns:
+            Optional[Tuple[int, int]]: Puntos a añadir (jugador1, jugador2) o None
+        """
+        # Colisiones con raquetas
+        if jugador1.colision(self) or jugador2.colision(self):
+            self.velocidad[0] = -self.velocidad[0]
+            if self.sonido_raqueta:
+                self.sonido_raqueta.play()
+
+        # Control de puntuación
+        if self.rect.left <= 0 or self.rect.right >= ANCHO_VENTANA:
+            if self.sonido_punto:
+                self.sonido_punto.play()
+            
+            # Determinar quién marcó el punto
+            marcador = (0, 1) if self.rect.left <= 0 else (1, 0)  # (jugador1, jugador2)
+            
+            # Reiniciar posición
+            self.rect.centerx = ANCHO_VENTANA // 2
+            self.rect.centery = ALTO_VENTANA // 2
+            self.velocidad[0] = -self.velocidad[0]
+            
+            return marcador
+
+        # Rebotes verticales
+        if self.rect.top <= 0 or self.rect.bottom >= ALTO_VENTANA:
+            self.velocidad[1] = -self.velocidad[1]
+
+        # Actualizar posición
+        self.rect.move_ip(tuple(self.velocidad))  # Convertir a tupla para move_ip
+        return None
+
+    # Dibuja la pelota
+    def dibuja(self, pantalla):
+        pantalla.blit(self.image, self.rect);
+
+
+    
+# -------------------------------------------------
+# Juego: la máquina de estados
+# -------------------------------------------------
+
+class Juego:
+    """El bucle del juego, que hace en cada vuelta lo que toca según el estado en el que está"""
+
+    def __init__(self, pantalla: pygame.Surface, imagen_fondo: Optional[pygame.Surface],
+                 sonido_raqueta: Optional[pygame.mixer.Sound], sonido_punto: Optional[pygame.mixer.Sound]):
+        self.pantalla = pantalla
+        self.imagen_fondo = imagen_fondo
+        self.reloj = pygame.time.Clock()
+
+        # Crear sprites
+        self.jugador1 = Raqueta((50, ALTO_VENTANA // 2), (ANCHO_VENTANA // 4, ALTO_VENTANA // 8))
+        self.jugador2 = Raqueta((ANCHO_VENTANA - 50, ALTO_VENTANA // 2), (ANCHO_VENTANA * 3 // 4, ALTO_VENTANA // 8))
+        self.pelota = Pelota(sonido_raqueta, sonido_punto)
+
+        # Crear grupos de sprites
+        self.todos_los_sprites = pygame.sprite.Group()
+        self.todos_los_sprites.add(self.jugador1, self.jugador2, self.pelota)
+
+        # Textos de la pantalla de inicio
+        tipo_letra = pygame.font.SysFont('arial', 96)
+        self.texto_titulo = tipo_letra.render('PONG', True, BLANCO)
+        self.texto_mensaje = tipo_letra.render('Pulse cualquier tecla', True, BLANCO)
+
+        # Estado actual, y milisegundos que le quedan (en los estados que se acaban solos)
+        self.estado = ESPERANDO_TECLA
+        self.tiempo_restante = 0
+
+    def cambiar_estado(self, estado: int, duracion: int = 0):
+        """Pasa a otro estado; si duracion no es 0, el estado se acaba solo pasados esos milisegundos"""
+        self.estado = estado
+        self.tiempo_restante = duracion
+        # Al volver a un estado con movimiento, el reloj no debe contar el tiempo que se ha estado esperando
+        self.reloj.tick()
+
+    def salir(self):
+        pygame.quit()
+        sys.exit()
+
+    def ejecutar(self):
+        """Bucle principal"""
+        self.dibuja()
+        while True:
+            if self.estado == ESPERANDO_TECLA:
+                self.esperar_tecla()
+            elif self.estado == PUNTO:
+                self.esperar_punto()
+            else:
+                self.jugar()
+
+    # -------------------------------------------------
+    # Estados sin movimiento: se duerme hasta el siguiente evento
+
+    def esperar_tecla(self):
+        """Pantalla de inicio: no hay nada que mover, así que se espera sin gastar CPU"""
+        evento = pygame.event.wait()
+        if evento.type == QUIT:
+            self.salir()
+        if evento.type == KEYDOWN:
+            if evento.key == K_ESCAPE:
+                self.salir()
+            self.cambiar_estado(SACANDO, TIEMPO_SAQUE)
+
+    def esperar_punto(self):
+        """Después de un punto, se espera hasta que pase el tiempo o llegue algún evento"""
+        inicio = pygame.time.get_ticks()
+        evento = pygame.event.wait(self.tiempo_restante)
+        if evento.type == QUIT or (evento.type == KEYDOWN and evento.key == K_ESCAPE):
+            self.salir()
+        self.tiempo_restante -= pygame.time.get_ticks() - inicio
+        if self.tiempo_restante <= 0:
+            self.cambiar_estado(SACANDO, TIEMPO_SAQUE)
+            self.dibuja()
+
+    # -------------------------------------------------
+    # Estados con movimiento: se actualiza y se dibuja a FPS fotogramas por segundo
+
+    def jugar(self):
+        tiempo_pasado = self.reloj.tick(FPS)
+
+        # Procesar eventos
+        for evento in pygame.event.get():
+            if evento.type == QUIT:
+                self.salir()
+            
+            if evento.type == KEYDOWN:
+                if evento.key == K_ESCAPE:
+                    self.salir()
+                elif evento.key == K_q:
+                    self.jugador1.update(-1)
+                elif evento.key == K_a:
+                    self.jugador1.update(1)
+                elif evento.key == K_o:
+                    self.jugador2.update(-1)
+                elif evento.key == K_l:
+                    self.jugador2.update(1)
+
+        if self.estado == SACANDO:
+            # La pelota espera en el centro hasta que se acaba el saque (las raquetas sí se mueven)
+            self.tiempo_restante -= tiempo_pasado
+            if self.tiempo_restante <= 0:
+                self.cambiar_estado(JUGANDO)
+        else:
+            # Actualizar estado del juego
+            resultado = self.pelota.update(self.jugador1, self.jugador2)
+            if resultado:
+                puntos_j1, puntos_j2 = resultado
+                self.jugador1.puntos += puntos_j1
+                self.jugador2.puntos += puntos_j2
+                # En lugar de time.sleep(1), se pasa al estado PUNTO durante un segundo
+                self.cambiar_estado(PUNTO, TIEMPO_PUNTO)
+
+        self.dibuja()
+
+    def dibuja(self):
+        """Dibuja la pantalla del estado actual"""
+        if self.imagen_fondo:
+            self.pantalla.blit(self.imagen_fondo, (0, 0))
+        else:
+            self.pantalla.fill(NEGRO)
+
+        if self.estado == ESPERANDO_TECLA:
+            # Mostrar textos
+            self.pantalla.blit(self.texto_titulo, (50, ALTO_VENTANA // 4))
+            self.pantalla.blit(self.texto_mensaje, (20, ALTO_VENTANA // 2))
+        else:
+            # Dibujar todos los sprites
+            self.todos_los_sprites.draw(self.pantalla)
+            
+            # Dibujar marcadores
+            self.jugador1.dibuja_marcador(self.pantalla)
+            self.jugador2.dibuja_marcador(self.pantalla)
+
+        pygame.display.update()
+
+# -------------------------------------------------
+# Funcion principal del juego
+# -------------------------------------------------
+
+def main():
+    """Función principal del juego"""
+    # Inicializar pygame
+    pygame.init()
+    pygame.mixer.init()
+
+    # Cargar recursos
+    try:
+        sonido_raqueta = pygame.mixer.Sound(RUTA_SONIDO_RAQUETA)
+        sonido_punto = pygame.mixer.Sound(RUTA_SONIDO_PUNTO)
+    except pygame.error as e:
+        print(f"Error al cargar los sonidos: {e}")
+        sonido_raqueta = None
+        sonido_punto = None
+
+    # Configurar pantalla
+    pantalla = pygame.display.set_mode((ANCHO_VENTANA, ALTO_VENTANA))
+    pygame.display.set_caption("Ejemplo 19: Máquina de estados sin esperas bloqueantes")
+
+    try:
+        imagen_fondo = pygame.image.load(RUTA_FONDO).convert()
+    except pygame.error as e:
+        print(f"Error al cargar la imagen de fondo: {e}")
+        imagen_fondo = None
+
+    # Configuración adicional
+    pygame.key.set_repeat(1, 25)
+    pygame.mouse.set_visible(False)
+
+    # Crear el juego y ejecutarlo
+    juego = Juego(pantalla, imagen_fondo, sonido_raqueta, sonido_punto)
+    juego.ejecutar()
+
+if __name__ == "__main__":
+    main()
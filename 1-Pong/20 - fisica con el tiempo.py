@@ -0,0 +1,412 @@
+"""
+Ejemplo 20: Física con el tiempo transcurrido
+Este ejemplo hace que el juego vaya igual de rápido a cualquier número de fotogramas por segundo:
+
+1. Movimiento según el tiempo:
+   - Las velocidades están en píxeles por segundo y en cada fotograma se multiplican
+     por el tiempo que ha pasado desde el anterior
+   - Las posiciones se guardan con decimales, y solo se redondean al dibujar
+   - Las raquetas se mueven mientras la tecla está pulsada (pygame.key.get_pressed)
+     en lugar de depender de la repetición de teclas
+
+2. Colisiones barridas:
+   - Se calcula en qué momento del fotograma cruza la pelota la cara de la raqueta,
+     así que aunque la pelota vaya muy rápido no puede atravesarla
+   - La pelota acelera un poco en cada golpe para comprobarlo
+"""
+
+# -------------------------------------------------
+# Importar las librerías
+# -------------------------------------------------
+import pygame
+import sys
+from pygame.locals import *
+from typing import Optional, Tuple, List
+
+# -------------------------------------------------
+# Constantes
+# -------------------------------------------------
+
+# Colores
+BLANCO = (255, 255, 255)
+NEGRO = (0, 0, 0)
+
+# Configuración del juego
+FPS = 60
+ANCHO_VENTANA = 800
+ALTO_VENTANA = 600
+# Velocidades en píxeles por segundo
+VELOCIDAD_RAQUETA = 400
+VELOCIDAD_INICIAL_PELOTA = 240
+VELOCIDAD_MAXIMA_PELOTA = 3000
+# La pelota va un poco más rápido después de cada golpe
+ACELERACION_GOLPE = 1.1
+# Si un fotograma tarda más que esto (en segundos), se simula como si hubiera tardado esto
+TIEMPO_MAXIMO_FOTOGRAMA = 0.1
+
+# Estados del juego
+ESPERANDO_TECLA = 0
+SACANDO = 1
+JUGANDO = 2
+PUNTO = 3
+
+# Duración (en milisegundos) de los estados que se acaban solos
+TIEMPO_SAQUE = 500
+TIEMPO_PUNTO = 1000
+
+# Teclas de cada raqueta (arriba, abajo)
+TECLAS_JUGADOR1 = (K_q, K_a)
+TECLAS_JUGADOR2 = (K_o, K_l)
+
+# Rutas de recursos
+RUTA_RAQUETA = 'recursos/raqueta.png'
+RUTA_PELOTA = 'recursos/pelota.png'
+RUTA_FONDO = 'recursos/pistaTenis.jpg'
+RUTA_SONIDO_RAQUETA = 'recursos/Ping_Pong.wav'
+RUTA_SONIDO_PUNTO = 'recursos/Aplausos.wav'
+
+# -------------------------------------------------
+# Clases de los objetos del juego
+# -------------------------------------------------
+
+# -------------------------------------------------
+# Raqueta
+
+class Raqueta(pygame.sprite.Sprite):
+    """Las raquetas de ambos jugadores implementadas como sprites"""
+
+    def __init__(self, posicion: Tuple[int, int], posicion_marcador: Tuple[int, int], teclas: Tuple[int, int]):
+        # Inicializar la clase padre Sprite
+        super().__init__()
+        
+        try:
+            # Cargar y configurar la imagen
+            self.image = pygame.image.load(RUTA_RAQUETA)
+        except pygame.error as e:
+            print(f"Error al cargar la imagen de la raqueta: {e}")
+            # Crear un rectángulo blanco como fallback
+            self.image = pygame.Surface((10, 50))
+            self.image.fill(BLANCO)
+        self.rect = self.image.get_rect()
+        self.rect.centerx = posicion[0]
+
+        # Posición vertical (del centro) con decimales; el rectángulo se coloca a partir de ella
+        self.y = float(posicion[1])
+        self.teclas = teclas
+        self.controla_y()
+        
+        # Configuración del marcador
+        self.puntos = 0
+        self.posicion_marcador = posicion_marcador
+        self.tipo_letra = pygame.font.SysFont('arial', 96)
+        # El texto del marcador solo se vuelve a renderizar cuando cambian los puntos
+        self.marcador = None
+        self.puntos_marcador = None
+
+    def controla_y(self):
+        """Controla que la raqueta no se salga de los límites verticales, y coloca su rectángulo"""
+        mitad = self.rect.height / 2
+        self.y = min(max(self.y, mitad), ALTO_VENTANA - mitad)
+        self.rect.centery = round(self.y)
+
+    def update(self, tiempo: float, teclas_pulsadas):
+        """Mueve la raqueta según las teclas pulsadas y el tiempo (en segundos) que ha pasado"""
+        arriba, abajo = self.teclas
+        direccion = teclas_pulsadas[abajo] - teclas_pulsadas[arriba]
+        if direccion:
+            self.y += direccion * VELOCIDAD_RAQUETA * tiempo
+            self.controla_y()
+
+    def dibuja_marcador(self, pantalla: pygame.Surface):
+        """Dibuja el marcador en la pantalla"""
+        if self.puntos != self.puntos_marcador:
+            self.marcador = self.tipo_letra.render(str(self.puntos), True, BLANCO)
+            self.puntos_marcador = self.puntos
+        pantalla.blit(self.marcador, self.posicion_marcador)
+
+# -------------------------------------------------
+# Pelota
+    
+class Pelota(pygame.sprite.Sprite):
+    """La pelota y su comportamiento implementada como sprite"""
+
+    def __init__(self, sonido_raqueta: Optional[pygame.mixer.Sound], sonido_punto: Optional[pygame.mixer.Sound]):
+        # Inicializar la clase padre Sprite
+        super().__init__()
+        
+        try:
+            # Cargar y configurar la imagen
+            self.image = pygame.image.load(RUTA_PELOTA)
+            self.rect = self.image.get_rect()
+        except pygame.error as e:
+            print(f"Error al cargar la imagen de la pelota: {e}")
+            # Crear un círculo blanco como fallback
+            self.image = pygame.Surface((8, 8))
+            pygame.draw.circle(self.image, BLANCO, (4, 4), 4)
+            self.rect = self.image.get_rect()
+        # La mitad del ancho y del alto, para las colisiones con el centro de la pelota
+        self.mitad_ancho = self.rect.width / 2
+        self.mitad_alto = self.rect.height / 2
+        
+        # Posición (del centro) con decimales, y velocidad en píxeles por segundo
+        self.reiniciar(1)
+        
+        # Sonidos
+        self.sonido_raqueta = sonido_raqueta
+        self.sonido_punto = sonido_punto
+
+    def reiniciar(self, direccion: int):
+        """Pone la pelota en el centro, saliendo hacia la dirección indicada"""
+        self.x = ANCHO_VENTANA / 2
+        self.y = ALTO_VENTANA / 2
+        self.velocidad = [VELOCIDAD_INICIAL_PELOTA * direccion, VELOCIDAD_INICIAL_PELOTA]
+        self.rect.center = (round(self.x), round(self.y))
+
+    def golpe(self, raqueta: Raqueta, x_nueva: float, y_nueva: float) -> Optional[float]:
+        """
+        Comprueba si la pelota cruza la cara de la raqueta al ir de su posición actual a la nueva.
+
+        Returns:
+            Optional[float]: La coordenada x de la cara de la raqueta si la golpea, o None
+        """
+        vx = self.velocidad[0]
+        if vx < 0:
+            # La pelota va hacia la izquierda: puede chocar con la cara derecha de la raqueta
+            cara = raqueta.rect.right + self.mitad_ancho
+            if not (self.x >= cara > x_nueva):
+                return None
+        elif vx > 0:
+            cara = raqueta.rect.left - self.mitad_ancho
+            if not (self.x <= cara < x_nueva):
+                return None
+        else:
+            return None
+        # Momento del fotograma (entre 0 y 1) en el que la pelota llega a la cara, y su altura entonces
+        t = (cara - self.x) / (x_nueva - self.x)
+        y = self.y + (y_nueva - self.y) * t
+        if raqueta.rect.top - self.mitad_alto <= y <= raqueta.rect.bottom + self.mitad_alto:
+            return cara
+        return None
+
+    def update(self, tiempo: float, jugador1: Raqueta, jugador2: Raqueta) -> Optional[Tuple[int, int]]:
+        """
+        Mueve la pelota el tiempo indicado (en segundos) y maneja colisiones
+        
+        Returns:
+            Optional[Tuple[int, int]]: Puntos a añadir (jugador1, jugador2) o None
+        """
+        x_nueva = self.x + self.velocidad[0] * tiempo
+        y_nueva = self.y + self.velocidad[1] * tiempo
+
+        # Rebotes verticales: la parte del movimiento que se pasa del borde se refleja
+        if y_nueva < self.mitad_alto:
+            y_nueva = 2 * self.mitad_alto - y_nueva
+            self.velocidad[1] = abs(self.velocidad[1])
+        elif y_nueva > ALTO_VENTANA - self.mitad_alto:
+            y_nueva = 2 * (ALTO_VENTANA - self.mitad_alto) - y_nueva
+            self.velocidad[1] = -abs(self.velocidad[1])
+
+        # Colisiones con raquetas, con el movimiento entero del fotograma
+        for raqueta in (jugador1, jugador2):
+            cara = self.golpe(raqueta, x_nueva, y_nueva)
+            if cara is not None:
+                # Rebota en la cara: lo que le quedaba por recorrer lo recorre hacia el otro lado
+                x_nueva = 2 * cara - x_nueva
+                velocidad = min(abs(self.velocidad[0]) * ACELERACION_GOLPE, VELOCIDAD_MAXIMA_PELOTA)
+                self.velocidad[0] = velocidad if self.velocidad[0] < 0 else -velocidad
+                if self.sonido_raqueta:
+                    self.sonido_raqueta.play()
+                break
+
+        self.x, self.y = x_nueva, y_nueva
+
+        # Control de puntuación
+        if self.x - self.mitad_ancho <= 0 or self.x + self.mitad_ancho >= ANCHO_VENTANA:
+            if self.sonido_punto:
+                self.sonido_punto.play()
+            
+            # Determinar quién marcó el punto
+            marcador = (0, 1) if self.x - self.mitad_ancho <= 0 else (1, 0)  # (jugador1, jugador2)
+            
+            # Reiniciar posición, sacando hacia el que ha perdido el punto
+            self.reiniciar(-1 if marcador == (0, 1) else 1)
+            return marcador
+
+        # El rectángulo se coloca a partir de la posición con decimales
+        self.rect.center = (round(self.x), round(self.y))
+        return None
+
+# -------------------------------------------------
+# Juego: la máquina de estados
+# -------------------------------------------------
+
+class Juego:
+    """El bucle del juego, que hace en cada vuelta lo que toca según el estado en el que está"""
+
+    def __init__(self, pantalla: pygame.Surface, imagen_fondo: Optional[pygame.Surface],
+                 sonido_raqueta: Optional[pygame.mixer.Sound], sonido_punto: Optional[pygame.mixer.Sound]):
+        self.pantalla = pantalla
+        self.imagen_fondo = imagen_fondo
+        self.reloj = pygame.time.Clock()
+
+        # Crear sprites
+        self.jugador1 = Raqueta((50, ALTO_VENTANA // 2), (ANCHO_VENTANA // 4, ALTO_VENTANA // 8), TECLAS_JUGADOR1)
+        self.jugador2 = Raqueta((ANCHO_VENTANA - 50, ALTO_VENTANA // 2), (ANCHO_VENTANA * 3 // 4, ALTO_VENTANA // 8), TECLAS_JUGADOR2)
+        self.pelota = Pelota(sonido_raqueta, sonido_punto)
+
+        # Crear grupos de sprites
+        self.todos_los_sprites = pygame.sprite.Group()
+        self.todos_los_sprites.add(self.jugador1, self.jugador2, self.pelota)
+
+        # Textos de la pantalla de inicio
+        tipo_letra = pygame.font.SysFont('arial', 96)
+        self.texto_titulo = tipo_letra.render('PONG', True, BLANCO)
+        self.texto_mensaje = tipo_letra.render('Pulse cualquier tecla', True, BLANCO)
+
+        # Estado actual, y milisegundos que le quedan (en los estados que se acaban solos)
+        self.estado = ESPERANDO_TECLA
+        self.tiempo_restante = 0
+
+    def cambiar_estado(self, estado: int, duracion: int = 0):
+        """Pasa a otro estado; si duracion no es 0, el estado se acaba solo pasados esos milisegundos"""
+        self.estado = estado
+        self.tiempo_restante = duracion
+        # Al volver a un estado con movimiento, el reloj no debe contar el tiempo que se ha estado esperando
+        self.reloj.tick()
+
+    def salir(self):
+        pygame.quit()
+        sys.exit()
+
+    def ejecutar(self):
+        """Bucle principal"""
+        self.dibuja()
+        while True:
+            if self.estado == ESPERANDO_TECLA:
+                self.esperar_tecla()
+            elif self.estado == PUNTO:
+                self.esperar_punto()
+            else:
+                self.jugar()
+
+    # -------------------------------------------------
+    # Estados sin movimiento: se duerme hasta el siguiente evento
+
+    def esperar_tecla(self):
+        """Pantalla de inicio: no hay nada que mover, así que se espera sin gastar CPU"""
+        evento = pygame.event.wait()
+        if evento.type == QUIT:
+            self.salir()
+        if evento.type == KEYDOWN:
+            if evento.key == K_ESCAPE:
+                self.salir()
+            self.cambiar_estado(SACANDO, TIEMPO_SAQUE)
+
+    def esperar_punto(self):
+        """Después de un punto, se espera hasta que pase el tiempo o llegue algún evento"""
+        inicio = pygame.time.get_ticks()
+        evento = pygame.event.wait(self.tiempo_restante)
+        if evento.type == QUIT or (evento.type == KEYDOWN and evento.key == K_ESCAPE):
+            self.salir()
+        self.tiempo_restante -= pygame.time.get_ticks() - inicio
+        if self.tiempo_restante <= 0:
+            self.cambiar_estado(SACANDO, TIEMPO_SAQUE)
+            self.dibuja()
+
+    # -------------------------------------------------
+    # Estados con movimiento: se actualiza y se dibuja a FPS fotogramas por segundo
+
+    def jugar(self):
+        tiempo_pasado = self.reloj.tick(FPS)
+        # Tiempo del fotograma en segundos, para las velocidades
+        tiempo = min(tiempo_pasado / 1000, TIEMPO_MAXIMO_FOTOGRAMA)
+
+        # Procesar eventos
+        for evento in pygame.event.get():
+            if evento.type == QUIT:
+                self.salir()
+            
+            if evento.type == KEYDOWN and evento.key == K_ESCAPE:
+                self.salir()
+
+        # Las raquetas se mueven mientras su tecla este pulsada
+        teclas_pulsadas = pygame.key.get_pressed()
+        self.jugador1.update(tiempo, teclas_pulsadas)
+        self.jugador2.update(tiempo, teclas_pulsadas)
+
+        if self.estado == SACANDO:
+            # La pelota espera en el centro hasta que se acaba el saque (las raquetas sí se mueven)
+            self.tiempo_restante -= tiempo_pasado
+            if self.tiempo_restante <= 0:
+                self.cambiar_estado(JUGANDO)
+        else:
+            # Actualizar estado del juego
+            resultado = self.pelota.update(tiempo, self.jugador1, self.jugador2)
+            if resultado:
+                puntos_j1, puntos_j2 = resultado
+                self.jugador1.puntos += puntos_j1
+                self.jugador2.puntos += puntos_j2
+                # En lugar de time.sleep(1), se pasa al estado PUNTO durante un segundo
+                self.cambiar_estado(PUNTO, TIEMPO_PUNTO)
+
+        self.dibuja()
+
+    def dibuja(self):
+        """Dibuja la pantalla del estado actual"""
+        if self.imagen_fondo:
+            self.pantalla.blit(self.imagen_fondo, (0, 0))
+        else:
+            self.pantalla.fill(NEGRO)
+
+        if self.estado == ESPERANDO_TECLA:
+            # Mostrar textos
+            self.pantalla.blit(self.texto_titulo, (50, ALTO_VENTANA // 4))
+            self.pantalla.blit(self.texto_mensaje, (20, ALTO_VENTANA // 2))
+        else:
+            # Dibujar todos los sprites
+            self.todos_los_sprites.draw(self.pantalla)
+            
+            # Dibujar marcadores
+            self.jugador1.dibuja_marcador(self.pantalla)
+            self.jugador2.dibuja_marcador(self.pantalla)
+
+        pygame.display.update()
+
+# -------------------------------------------------
+# Funcion principal del juego
+# -------------------------------------------------
+
+def main():
+    """Función principal del juego"""
+    # Inicializar pygame
+    pygame.init()
+    pygame.mixer.init()
+
+    # Cargar recursos
+    try:
+        sonido_raqueta = pygame.mixer.Sound(RUTA_SONIDO_RAQUETA)
+        sonido_punto = pygame.mixer.Sound(RUTA_SONIDO_PUNTO)
+    except pygame.error as e:
+        print(f"Error al cargar los sonidos: {e}")
+        sonido_raqueta = None
+        sonido_punto = None
+
+    # Configurar pantalla
+    pantalla = pygame.display.set_mode((ANCHO_VENTANA, ALTO_VENTANA))
+    pygame.display.set_caption("Ejemplo 20: Física con el tiempo transcurrido")
+
+    try:
+        imagen_fondo = pygame.image.load(RUTA_FONDO).convert()
+    except pygame.error as e:
+        print(f"Error al cargar la imagen de fondo: {e}")
+        imagen_fondo = None
+
+    # Configuración adicional (ya no hace falta la repetición de teclas)
+    pygame.mouse.set_visible(False)
+
+    # Crear el juego y ejecutarlo
+    juego = Juego(pantalla, imagen_fondo, sonido_raqueta, sonido_punto)
+    juego.ejecutar()
+
+if __name__ == "__main__":
+    main()
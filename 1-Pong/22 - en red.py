@@ -0,0 +1,202 @@
+"""
+Ejemplo 22: Pong en red
+Este ejemplo permite que cada jugador juegue desde su propio programa, conectados por la red
+(con el módulo red.py):
+
+1. Formas de ejecutarlo:
+   - python "22 - en red.py"                      : servidor, jugador del ordenador y jugador local en un solo programa
+   - python "22 - en red.py" servidor [puerto]    : solo el servidor
+   - python "22 - en red.py" cliente host [puerto] [latencia en ms] : un jugador que se conecta a un servidor
+
+2. Bucle con asyncio:
+   - pygame y la red comparten un único hilo: en cada fotograma se leen las teclas, se dibuja
+     y se cede el control a asyncio hasta el siguiente fotograma para que envíe y reciba mensajes
+   - Lo que se dibuja sale de ClientePong.vista(): la raqueta propia predicha al momento, y la del
+     otro jugador y la pelota interpoladas entre los estados que envía el servidor
+
+3. Estadísticas:
+   - En el título de la ventana se muestran los bytes recibidos por segundo, la latencia de las
+     entradas y la corrección media de la predicción
+"""
+
+# -------------------------------------------------
+# Importar las librerías
+# -------------------------------------------------
+import asyncio
+import pygame
+import sys
+from pygame.locals import *
+
+from red import ServidorPong, ClientePong, controlar, HOST, PUERTO
+from simulacion import JugadorCPU, ANCHO_VENTANA, ALTO_VENTANA, X_RAQUETA1, X_RAQUETA2
+
+# -------------------------------------------------
+# Constantes
+# -------------------------------------------------
+
+# Colores
+BLANCO = (255, 255, 255)
+NEGRO = (0, 0, 0)
+
+# Configuración del juego
+FPS = 60
+
+# Teclas de la raqueta (arriba, abajo); cada jugador usa las suyas en su programa
+TECLAS = (K_UP, K_DOWN)
+
+# Cada cuántos segundos se actualizan las estadísticas
+TIEMPO_ESTADISTICAS = 1.0
+
+# Rutas de recursos
+RUTA_RAQUETA = 'recursos/raqueta.png'
+RUTA_PELOTA = 'recursos/pelota.png'
+RUTA_FONDO = 'recursos/pistaTenis.jpg'
+
+# -------------------------------------------------
+# Funciones auxiliares
+# -------------------------------------------------
+
+def cargar_imagen(ruta: str, tamano_alternativo: tuple) -> pygame.Surface:
+    """Carga una imagen, o crea un rectángulo blanco si no se puede"""
+    try:
+        return pygame.image.load(ruta).convert_alpha()
+    except pygame.error as e:
+        print(f"Error al cargar la imagen {ruta}: {e}")
+        imagen = pygame.Surface(tamano_alternativo)
+        imagen.fill(BLANCO)
+        return imagen
+
+# -------------------------------------------------
+# Cliente con pantalla
+# -------------------------------------------------
+
+async def jugar(cliente: ClientePong):
+    """Bucle del jugador: lee el teclado, dibuja la vista del cliente y deja a asyncio atender la red"""
+    pantalla = pygame.display.get_surface()
+    try:
+        imagen_fondo = pygame.image.load(RUTA_FONDO).convert()
+    except pygame.error as e:
+        print(f"Error al cargar la imagen de fondo: {e}")
+        imagen_fondo = None
+    imagen_raqueta = cargar_imagen(RUTA_RAQUETA, (16, 75))
+    imagen_pelota = cargar_imagen(RUTA_PELOTA, (23, 23))
+    tipo_letra = pygame.font.SysFont('arial', 96)
+    # Los marcadores solo se vuelven a renderizar cuando cambian
+    marcadores = {}
+
+    bucle = asyncio.get_running_loop()
+    siguiente_fotograma = bucle.time()
+    siguientes_estadisticas = bucle.time() + TIEMPO_ESTADISTICAS
+    while cliente.conectado:
+        for evento in pygame.event.get():
+            if evento.type == QUIT or (evento.type == KEYDOWN and evento.key == K_ESCAPE):
+                return
+
+        teclas_pulsadas = pygame.key.get_pressed()
+        arriba, abajo = TECLAS
+        cliente.accion = teclas_pulsadas[abajo] - teclas_pulsadas[arriba]
+
+        if imagen_fondo:
+            pantalla.blit(imagen_fondo, (0, 0))
+        else:
+            pantalla.fill(NEGRO)
+        vista = cliente.vista()
+        if vista is not None:
+            raqueta1_y, raqueta2_y, pelota_x, pelota_y = vista[:4]
+            pantalla.blit(imagen_raqueta, imagen_raqueta.get_rect(center=(X_RAQUETA1, round(raqueta1_y))))
+            pantalla.blit(imagen_raqueta, imagen_raqueta.get_rect(center=(X_RAQUETA2, round(raqueta2_y))))
+            pantalla.blit(imagen_pelota, imagen_pelota.get_rect(center=(round(pelota_x), round(pelota_y))))
+            for puntos, x in ((int(vista[6]), ANCHO_VENTANA // 4), (int(vista[7]), ANCHO_VENTANA * 3 // 4)):
+                if puntos not in marcadores:
+                    marcadores[puntos] = tipo_letra.render(str(puntos), True, BLANCO)
+                pantalla.blit(marcadores[puntos], (x, ALTO_VENTANA // 8))
+        pygame.display.update()
+
+        if bucle.time() >= siguientes_estadisticas:
+            siguientes_estadisticas += TIEMPO_ESTADISTICAS
+            datos = cliente.estadisticas()
+            pygame.display.set_caption(
+                f"Ejemplo 22: Pong en red - jugador {cliente.jugador + 1} - "
+                f"{datos['bytesPorSegundo']:.0f} B/s, latencia {datos['latenciaEntradaMs']:.0f} ms, "
+                f"corrección {datos['correccionMediaPx']:.2f} px")
+
+        # En lugar de reloj.tick(FPS), se espera con asyncio para que mientras tanto se atienda la red
+        siguiente_fotograma = max(siguiente_fotograma + 1 / FPS, bucle.time())
+        await asyncio.sleep(siguiente_fotograma - bucle.time())
+
+# -------------------------------------------------
+# Formas de ejecutarlo
+# -------------------------------------------------
+
+async def servidor(puerto: int):
+    """Solo el servidor: muestra sus estadísticas cada pocos segundos"""
+    servidor = ServidorPong()
+    await servidor.iniciar('0.0.0.0', puerto)
+    print(f"Servidor escuchando en el puerto {puerto}")
+    try:
+        while True:
+            await asyncio.sleep(5)
+            print(servidor.estadisticas())
+    finally:
+        await servidor.cerrar()
+
+async def cliente(host: str, puerto: int, latencia: float):
+    """Un jugador que se conecta a un servidor"""
+    cliente = ClientePong(latencia)
+    await cliente.conectar(host, puerto)
+    try:
+        await jugar(cliente)
+    finally:
+        await cliente.cerrar()
+
+async def local():
+    """Servidor, jugador del ordenador y jugador local en el mismo programa"""
+    servidor = ServidorPong()
+    puerto = await servidor.iniciar(HOST, 0)
+    jugador = ClientePong()
+    await jugador.conectar(HOST, puerto)
+    rival = ClientePong()
+    await rival.conectar(HOST, puerto)
+    control = asyncio.create_task(controlar(rival, JugadorCPU(rival.jugador)))
+    try:
+        await jugar(jugador)
+    finally:
+        control.cancel()
+        await jugador.cerrar()
+        await rival.cerrar()
+        await servidor.cerrar()
+
+# -------------------------------------------------
+# Funcion principal del juego
+# -------------------------------------------------
+
+def main():
+    """Función principal del juego"""
+    argumentos = sys.argv[1:]
+    modo = argumentos[0] if argumentos else 'local'
+
+    if modo == 'servidor':
+        puerto = int(argumentos[1]) if len(argumentos) > 1 else PUERTO
+        try:
+            asyncio.run(servidor(puerto))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    # Inicializar pygame y configurar pantalla
+    pygame.init()
+    pygame.display.set_mode((ANCHO_VENTANA, ALTO_VENTANA))
+    pygame.display.set_caption("Ejemplo 22: Pong en red")
+    pygame.mouse.set_visible(False)
+
+    if modo == 'cliente':
+        host = argumentos[1] if len(argumentos) > 1 else HOST
+        puerto = int(argumentos[2]) if len(argumentos) > 2 else PUERTO
+        latencia = float(argumentos[3]) / 1000 if len(argumentos) > 3 else 0.0
+        asyncio.run(cliente(host, puerto, latencia))
+    else:
+        asyncio.run(local())
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
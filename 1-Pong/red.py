@@ -0,0 +1,461 @@
+"""
+Pong en red
+Este módulo permite jugar cada raqueta desde un programa (o un ordenador) distinto, con asyncio:
+
+1. ServidorPong:
+   - Es el único que simula la partida (con SimulacionPong), a un número fijo de pasos por segundo
+   - En cada paso aplica las entradas que le han llegado de cada jugador y les envía el estado
+   - Solo simula (y solo acepta entradas) mientras están conectados los dos jugadores; si uno se va,
+     avisa al otro de que la partida está en espera
+
+2. Mensajes binarios:
+   - Cada mensaje empieza por un byte con su tipo y tiene un formato fijo de struct
+   - El estado se envía cuantizado a enteros, y solo con los campos que han cambiado respecto
+     al último enviado a ese cliente (compresión delta): una máscara de bits indica cuáles van
+
+3. ClientePong:
+   - No envía entradas hasta que recibe el primer estado de la partida (ni mientras está en espera)
+   - Predice su propia raqueta aplicando sus entradas al momento, sin esperar al servidor; cuando
+     llega el estado, parte de la posición del servidor y vuelve a aplicar las entradas que este
+     aún no ha procesado
+   - La raqueta del otro jugador y la pelota se interpolan entre los dos últimos estados recibidos,
+     dibujándolas un poco en el pasado para que se muevan suavemente
+   - Puede simular latencia, para ver cómo se comporta el juego
+
+Ejecutando este archivo se juega una partida entre dos clientes controlados por el ordenador en
+localhost y se muestran el ancho de banda y la latencia (python red.py [segundos] [latencia en ms]).
+"""
+
+# -------------------------------------------------
+# Importar módulos
+# -------------------------------------------------
+import asyncio
+import struct
+import sys
+from collections import deque
+from typing import Optional, Tuple, List
+
+from simulacion import SimulacionPong, JugadorCPU, mover_raqueta, QUIETO, ALTO_VENTANA
+
+# -------------------------------------------------
+# Constantes
+# -------------------------------------------------
+
+# Dirección por defecto del servidor
+HOST = '127.0.0.1'
+PUERTO = 5555
+
+# Pasos de simulación por segundo del servidor (y entradas por segundo de cada cliente)
+TICKS_POR_SEGUNDO = 30
+# Si el servidor acumula más entradas de un jugador, aplica en el mismo paso todas menos la última
+#  (que es la del paso), para que el retraso de ese jugador vuelva a ser el mínimo
+ENTRADAS_MAXIMAS = 3
+# Tiempo (en segundos) que se dibuja en el pasado lo que se interpola
+RETARDO_INTERPOLACION = 2 / TICKS_POR_SEGUNDO
+
+# Tipos de mensaje
+MENSAJE_BIENVENIDA = 1
+MENSAJE_ENTRADA = 2
+MENSAJE_ESTADO = 3
+MENSAJE_ESPERA = 4
+
+# Bienvenida (servidor -> cliente): tipo, jugador (0 o 1), ticks por segundo
+BIENVENIDA = struct.Struct('<BBB')
+# Entrada (cliente -> servidor): tipo, número de entrada, acción
+ENTRADA = struct.Struct('<BIb')
+# Estado (servidor -> cliente): tipo, tick, última entrada procesada de ese cliente, máscara de campos
+CABECERA_ESTADO = struct.Struct('<BIIB')
+# Espera (servidor -> cliente): solo el tipo; el otro jugador se ha ido y la partida se para hasta que vuelva otro
+ESPERA = struct.Struct('<B')
+
+# Campos del estado, con su formato y su escala de cuantización (las posiciones van en cuartos de píxel)
+CAMPOS = ('raqueta1_y', 'raqueta2_y', 'pelota_x', 'pelota_y', 'velocidad_x', 'velocidad_y', 'puntos1', 'puntos2')
+FORMATOS = ('h', 'h', 'h', 'h', 'h', 'h', 'B', 'B')
+ESCALAS = (4, 4, 4, 4, 1, 1, 1, 1)
+TODOS_LOS_CAMPOS = (1 << len(CAMPOS)) - 1
+TAMANO_ESTADO_COMPLETO = CABECERA_ESTADO.size + struct.calcsize('<' + ''.join(FORMATOS))
+
+# -------------------------------------------------
+# Codificación del estado
+# -------------------------------------------------
+
+# Un struct por cada combinación de campos, creado la primera vez que se usa
+_structs_mascara = {}
+
+def struct_mascara(mascara: int) -> struct.Struct:
+    formato = _structs_mascara.get(mascara)
+    if formato is None:
+        formato = _structs_mascara[mascara] = struct.Struct(
+            '<' + ''.join(f for i, f in enumerate(FORMATOS) if mascara & (1 << i)))
+    return formato
+
+def cuantizar(estado) -> Tuple[int, ...]:
+    """Valores enteros del estado que se envían"""
+    valores = tuple(round(getattr(estado, campo) * escala) for campo, escala in zip(CAMPOS, ESCALAS))
+    # Los marcadores van en un byte
+    return valores[:6] + (valores[6] % 256, valores[7] % 256)
+
+def codificar_estado(tick: int, ultima_entrada: int, valores: Tuple[int, ...],
+                     anteriores: Optional[Tuple[int, ...]]) -> bytes:
+    """Mensaje de estado con los campos que han cambiado respecto a los anteriores (todos si no hay)"""
+    if anteriores is None:
+        mascara = TODOS_LOS_CAMPOS
+    else:
+        mascara = 0
+        for i, (valor, anterior) in enumerate(zip(valores, anteriores)):
+            if valor != anterior:
+                mascara |= 1 << i
+    cambiados = [valor for i, valor in enumerate(valores) if mascara & (1 << i)]
+    return CABECERA_ESTADO.pack(MENSAJE_ESTADO, tick, ultima_entrada, mascara) + struct_mascara(mascara).pack(*cambiados)
+
+def decodificar_campos(mascara: int, datos: bytes, anteriores: List[int]) -> List[int]:
+    """Actualiza los valores anteriores con los campos que vienen en el mensaje"""
+    valores = list(anteriores)
+    cambiados = iter(struct_mascara(mascara).unpack(datos))
+    for i in range(len(CAMPOS)):
+        if mascara & (1 << i):
+            valores[i] = next(cambiados)
+    return valores
+
+# -------------------------------------------------
+# Servidor
+# -------------------------------------------------
+
+class ServidorPong:
+    """Servidor con autoridad: simula la partida y envía el estado a los dos jugadores"""
+
+    def __init__(self, ticks: int = TICKS_POR_SEGUNDO, semilla: Optional[int] = None):
+        self.ticks = ticks
+        self.simulacion = SimulacionPong(semilla, 1 / ticks)
+        self.tick = 0
+        # Conexión, entradas pendientes, última entrada procesada y último estado enviado de cada jugador
+        self.conexiones = [None, None]
+        self.entradas = [deque(), deque()]
+        self.ultima_entrada = [0, 0]
+        self.enviados = [None, None]
+        # Si se está jugando: están los dos jugadores y se ha empezado la partida
+        self.en_juego = False
+        self.servidor = None
+        self.tarea = None
+        # Tareas que atienden a cada conexión, para esperar a que terminen al cerrar
+        self.tareas_conexion = set()
+        # Estadísticas
+        self.bytes_enviados = 0
+        self.estados_enviados = 0
+
+    async def iniciar(self, host: str = HOST, puerto: int = PUERTO) -> int:
+        """Empieza a aceptar jugadores y a simular; devuelve el puerto en el que escucha"""
+        self.servidor = await asyncio.start_server(self._conexion, host, puerto)
+        self.tarea = asyncio.create_task(self._bucle())
+        return self.servidor.sockets[0].getsockname()[1]
+
+    async def cerrar(self):
+        if self.tarea is not None:
+            self.tarea.cancel()
+        for conexion in self.conexiones:
+            if conexion is not None:
+                conexion.close()
+        await asyncio.gather(*self.tareas_conexion, return_exceptions=True)
+        if self.servidor is not None:
+            self.servidor.close()
+            await self.servidor.wait_closed()
+
+    async def _conexion(self, lector: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        if None not in self.conexiones:
+            # La partida ya está completa
+            escritor.close()
+            return
+        jugador = self.conexiones.index(None)
+        self.conexiones[jugador] = escritor
+        tarea = asyncio.current_task()
+        self.tareas_conexion.add(tarea)
+        self.entradas[jugador].clear()
+        self.ultima_entrada[jugador] = 0
+        self.enviados[jugador] = None
+        escritor.write(BIENVENIDA.pack(MENSAJE_BIENVENIDA, jugador, self.ticks))
+        if None not in self.conexiones:
+            # Están los dos jugadores: empieza una partida nueva, sin entradas de antes
+            self.simulacion.reiniciar()
+            for entradas in self.entradas:
+                entradas.clear()
+            self.en_juego = True
+        try:
+            while True:
+                tipo, numero, accion = ENTRADA.unpack(await lector.readexactly(ENTRADA.size))
+                # Las entradas que llegan mientras no se juega se descartan (no se acumulan)
+                if tipo == MENSAJE_ENTRADA and self.en_juego:
+                    self.entradas[jugador].append((numero, max(-1, min(1, accion))))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.conexiones[jugador] = None
+            self.tareas_conexion.discard(tarea)
+            escritor.close()
+            if self.en_juego:
+                # La partida se para (sin guardar las entradas que no se han aplicado), y se le avisa al otro jugador
+                self.en_juego = False
+                for entradas in self.entradas:
+                    entradas.clear()
+                otro = self.conexiones[1 - jugador]
+                if otro is not None:
+                    otro.write(ESPERA.pack(MENSAJE_ESPERA))
+
+    async def _bucle(self):
+        """Simula a un número fijo de pasos por segundo, sin acumular retraso"""
+        bucle = asyncio.get_running_loop()
+        siguiente = bucle.time()
+        while True:
+            if self.en_juego:
+                self._paso()
+            siguiente += 1 / self.ticks
+            espera = siguiente - bucle.time()
+            if espera < -1:
+                # Si el servidor se ha quedado muy atrás, no intenta recuperar todos los pasos perdidos
+                siguiente = bucle.time()
+            await asyncio.sleep(max(0.0, espera))
+
+    def _paso(self):
+        estado = self.simulacion.estado
+        tiempo = self.simulacion.paso_tiempo
+        acciones = [QUIETO, QUIETO]
+        for jugador, entradas in enumerate(self.entradas):
+            # Normalmente se aplica una entrada por paso; si hay demasiadas acumuladas, las más antiguas
+            #  se aplican también ahora, hasta que solo queda la de este paso, para que el retraso no crezca
+            if len(entradas) > ENTRADAS_MAXIMAS:
+                while len(entradas) > 1:
+                    numero, accion = entradas.popleft()
+                    if jugador == 0:
+                        estado.raqueta1_y = mover_raqueta(estado.raqueta1_y, accion, tiempo)
+                    else:
+                        estado.raqueta2_y = mover_raqueta(estado.raqueta2_y, accion, tiempo)
+                    self.ultima_entrada[jugador] = numero
+            if entradas:
+                numero, acciones[jugador] = entradas.popleft()
+                self.ultima_entrada[jugador] = numero
+        estado, _ = self.simulacion.paso(acciones)
+        self.tick += 1
+
+        valores = cuantizar(estado)
+        for jugador, escritor in enumerate(self.conexiones):
+            mensaje = codificar_estado(self.tick, self.ultima_entrada[jugador], valores, self.enviados[jugador])
+            escritor.write(mensaje)
+            self.enviados[jugador] = valores
+            self.bytes_enviados += len(mensaje)
+            self.estados_enviados += 1
+
+    def estadisticas(self) -> dict:
+        return {
+            'ticks': self.tick,
+            'estadosEnviados': self.estados_enviados,
+            'bytesEnviados': self.bytes_enviados,
+            'bytesPorEstado': self.bytes_enviados / self.estados_enviados if self.estados_enviados else 0.0,
+            'bytesEstadoCompleto': TAMANO_ESTADO_COMPLETO,
+            'entradasPendientes': [len(entradas) for entradas in self.entradas],
+        }
+
+# -------------------------------------------------
+# Cliente
+# -------------------------------------------------
+
+class ClientePong:
+    """
+    Cliente de un jugador: envía su acción a TICKS_POR_SEGUNDO entradas por segundo y recibe el estado.
+
+    La acción que se envía es la del atributo accion, que se cambia desde fuera (con el teclado o
+    con un JugadorCPU), y lo que hay que dibujar lo devuelve vista().
+    """
+
+    def __init__(self, latencia: float = 0.0, retardo_interpolacion: float = RETARDO_INTERPOLACION):
+        """
+        Args:
+            latencia: Segundos que se retrasa cada mensaje enviado y recibido (para simular una red lenta)
+            retardo_interpolacion: Segundos en el pasado a los que se dibuja lo que se interpola
+        """
+        self.latencia = latencia
+        self.retardo_interpolacion = retardo_interpolacion
+        self.jugador = None
+        self.ticks = TICKS_POR_SEGUNDO
+        self.accion = QUIETO
+        # Si se está jugando: hasta que llega el primer estado (y mientras la partida está en espera)
+        #  no se envían entradas ni se predice la raqueta
+        self.en_juego = False
+        self.lector = None
+        self.escritor = None
+        self.tareas = []
+        # Entradas enviadas que el servidor todavía no ha procesado: (número, acción, momento de envío)
+        self.numero = 0
+        self.pendientes = deque()
+        # Raqueta propia según la predicción
+        self.raqueta_y = ALTO_VENTANA / 2
+        # Últimos valores recibidos (cuantizados) y estados para interpolar: (tiempo en el servidor, valores)
+        self.valores = [0] * len(CAMPOS)
+        self.estados = deque(maxlen=16)
+        # Diferencia mínima vista entre el reloj local y el tiempo del servidor (tick / ticks por segundo)
+        self.desfase = None
+        self.conectado = False
+        # Estadísticas
+        self.bytes_recibidos = 0
+        self.estados_recibidos = 0
+        self.latencias = deque(maxlen=300)
+        self.correcciones = deque(maxlen=300)
+        self.inicio = 0.0
+
+    async def conectar(self, host: str = HOST, puerto: int = PUERTO):
+        self.lector, self.escritor = await asyncio.open_connection(host, puerto)
+        tipo, self.jugador, self.ticks = BIENVENIDA.unpack(await self.lector.readexactly(BIENVENIDA.size))
+        self.conectado = True
+        self.inicio = asyncio.get_running_loop().time()
+        self.tareas = [asyncio.create_task(self._recibir()), asyncio.create_task(self._enviar())]
+
+    async def cerrar(self):
+        self.conectado = False
+        for tarea in self.tareas:
+            tarea.cancel()
+        if self.escritor is not None:
+            self.escritor.close()
+
+    def _tras_latencia(self, funcion, *args):
+        if self.latencia > 0:
+            asyncio.get_running_loop().call_later(self.latencia, funcion, *args)
+        else:
+            funcion(*args)
+
+    async def _enviar(self):
+        bucle = asyncio.get_running_loop()
+        siguiente = bucle.time()
+        while self.conectado:
+            if self.en_juego:
+                self.numero += 1
+                accion = self.accion
+                self._tras_latencia(self.escritor.write, ENTRADA.pack(MENSAJE_ENTRADA, self.numero, accion))
+                # Predicción: la raqueta propia se mueve ya, sin esperar al servidor
+                self.pendientes.append((self.numero, accion, bucle.time()))
+                self.raqueta_y = mover_raqueta(self.raqueta_y, accion, 1 / self.ticks)
+            siguiente += 1 / self.ticks
+            await asyncio.sleep(max(0.0, siguiente - bucle.time()))
+
+    async def _recibir(self):
+        try:
+            while True:
+                cabecera = await self.lector.readexactly(ESPERA.size)
+                if cabecera[0] == MENSAJE_ESPERA:
+                    self.bytes_recibidos += len(cabecera)
+                    self._tras_latencia(self._esperar)
+                    continue
+                cabecera += await self.lector.readexactly(CABECERA_ESTADO.size - ESPERA.size)
+                tipo, tick, ultima_entrada, mascara = CABECERA_ESTADO.unpack(cabecera)
+                datos = await self.lector.readexactly(struct_mascara(mascara).size)
+                self.bytes_recibidos += len(cabecera) + len(datos)
+                # Los campos se decodifican en el orden de llegada, porque cada mensaje depende del anterior
+                self.valores = decodificar_campos(mascara, datos, self.valores)
+                self._tras_latencia(self._aplicar, tick, ultima_entrada, self.valores)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self.conectado = False
+
+    def _esperar(self):
+        # El otro jugador se ha ido: se dejan de enviar entradas, y las que no ha procesado el servidor
+        #  ya no las va a procesar. Como el tiempo del servidor se para, se vuelve a medir el desfase
+        #  (y se olvidan los estados para interpolar) cuando empiece la siguiente partida
+        self.en_juego = False
+        self.pendientes.clear()
+        self.estados.clear()
+        self.desfase = None
+
+    def _aplicar(self, tick: int, ultima_entrada: int, valores: List[int]):
+        ahora = asyncio.get_running_loop().time()
+        self.en_juego = True
+        self.estados_recibidos += 1
+        tiempo_servidor = tick / self.ticks
+        if self.desfase is None or ahora - tiempo_servidor < self.desfase:
+            self.desfase = ahora - tiempo_servidor
+        estado = [valor / escala for valor, escala in zip(valores, ESCALAS)]
+        self.estados.append((tiempo_servidor, estado))
+
+        # Reconciliación: se parte de la raqueta del servidor y se aplican las entradas que aún no ha procesado
+        while self.pendientes and self.pendientes[0][0] <= ultima_entrada:
+            numero, accion, enviada = self.pendientes.popleft()
+            if numero == ultima_entrada:
+                self.latencias.append(ahora - enviada)
+        raqueta_y = estado[self.jugador]
+        for numero, accion, enviada in self.pendientes:
+            raqueta_y = mover_raqueta(raqueta_y, accion, 1 / self.ticks)
+        self.correcciones.append(abs(raqueta_y - self.raqueta_y))
+        self.raqueta_y = raqueta_y
+
+    def vista(self) -> Optional[List[float]]:
+        """
+        Lo que hay que dibujar ahora: raquetas, pelota, velocidad de la pelota y marcadores
+        (en el orden de CAMPOS), o None si todavía no ha llegado ningún estado
+        """
+        if not self.estados:
+            return None
+        objetivo = asyncio.get_running_loop().time() - self.desfase - self.retardo_interpolacion
+        # Se busca el primer estado posterior al momento que se dibuja
+        anterior = self.estados[0]
+        for siguiente in self.estados:
+            if siguiente[0] >= objetivo:
+                break
+            anterior = siguiente
+        tiempo_anterior, valores_anterior = anterior
+        tiempo_siguiente, valores_siguiente = siguiente
+        if tiempo_siguiente <= tiempo_anterior or valores_anterior[6:] != valores_siguiente[6:]:
+            # No hay dos estados entre los que interpolar, o entre ellos se ha marcado un punto
+            vista = list(valores_siguiente)
+        else:
+            t = min(1.0, max(0.0, (objetivo - tiempo_anterior) / (tiempo_siguiente - tiempo_anterior)))
+            vista = [a + (b - a) * t for a, b in zip(valores_anterior[:4], valores_siguiente[:4])] + valores_siguiente[4:]
+        vista[self.jugador] = self.raqueta_y
+        return vista
+
+    def observacion(self) -> Optional[List[float]]:
+        """La vista en el formato de EstadoPong.observacion, para un JugadorCPU"""
+        vista = self.vista()
+        return None if vista is None else vista[:6]
+
+    def estadisticas(self) -> dict:
+        duracion = max(1e-9, asyncio.get_running_loop().time() - self.inicio)
+        return {
+            'estadosRecibidos': self.estados_recibidos,
+            'bytesPorSegundo': self.bytes_recibidos / duracion,
+            'latenciaEntradaMs': 1000 * sum(self.latencias) / len(self.latencias) if self.latencias else 0.0,
+            'correccionMediaPx': sum(self.correcciones) / len(self.correcciones) if self.correcciones else 0.0,
+        }
+
+# -------------------------------------------------
+# Partida de prueba entre dos clientes controlados por el ordenador
+# -------------------------------------------------
+
+async def controlar(cliente: ClientePong, cpu: JugadorCPU):
+    """Cambia la acción del cliente según lo que decida el JugadorCPU, a 60 fotogramas por segundo"""
+    while cliente.conectado:
+        observacion = cliente.observacion()
+        if observacion is not None:
+            cliente.accion = cpu.accion(observacion, 1 / 60)
+        await asyncio.sleep(1 / 60)
+
+async def demostracion(segundos: float = 5.0, latencia: float = 0.05):
+    servidor = ServidorPong(semilla=0)
+    puerto = await servidor.iniciar(HOST, 0)
+    clientes = [ClientePong(latencia) for _ in range(2)]
+    for cliente in clientes:
+        await cliente.conectar(HOST, puerto)
+    controles = [asyncio.create_task(controlar(cliente, JugadorCPU(cliente.jugador, 'dificil', cliente.jugador)))
+                 for cliente in clientes]
+    await asyncio.sleep(segundos)
+
+    print(f"Servidor: {servidor.estadisticas()}")
+    for cliente in clientes:
+        print(f"Jugador {cliente.jugador + 1}: {cliente.estadisticas()}")
+    vista = clientes[0].vista()
+    print(f"Marcador: {int(vista[6])}-{int(vista[7])}")
+
+    for control in controles:
+        control.cancel()
+    for cliente in clientes:
+        await cliente.cerrar()
+    await servidor.cerrar()
+
+if __name__ == "__main__":
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    latencia = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+    asyncio.run(demostracion(segundos, latencia))
@@ -0,0 +1,427 @@
+"""
+Simulación de Pong sin pantalla
+Este módulo contiene solo las reglas del juego, separadas del dibujado y de los eventos de pygame,
+para poder simular miles de pasos por segundo (por ejemplo, para entrenar o probar jugadores automáticos):
+
+1. SimulacionPong:
+   - Una partida: paso(acciones) mueve las raquetas y la pelota un paso de tiempo fijo
+     y devuelve el nuevo estado y la recompensa de cada jugador (+1 al marcar, -1 al recibir)
+   - Usa la misma física que el ejemplo 20 (velocidades en píxeles por segundo y colisiones barridas)
+
+2. LotePong:
+   - Muchas partidas independientes que avanzan a la vez, con arrays de NumPy
+   - Si NumPy no está instalado, funciona igual con una lista de SimulacionPong (más despacio)
+
+3. JugadorCPU:
+   - Calcula directamente (sin simular fotograma a fotograma) dónde va a llegar la pelota,
+     contando los rebotes en las paredes, y solo lo recalcula cuando cambia su velocidad
+   - La dificultad se ajusta con un tiempo de reacción y un error en la predicción
+
+Ejecutando este archivo se mide cuántos pasos por segundo se simulan.
+"""
+
+# -------------------------------------------------
+# Importar módulos
+# -------------------------------------------------
+import random
+import time
+from typing import Optional, Sequence, Tuple, List
+
+# NumPy es opcional: solo se usa para simular muchas partidas a la vez
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# -------------------------------------------------
+# Constantes
+# -------------------------------------------------
+
+# Dimensiones del campo (las del ejemplo 20)
+ANCHO_VENTANA = 800
+ALTO_VENTANA = 600
+# Tamaño de las imágenes de la raqueta y de la pelota
+ANCHO_RAQUETA = 16
+ALTO_RAQUETA = 75
+TAMANO_PELOTA = 23
+# Posición horizontal del centro de cada raqueta
+X_RAQUETA1 = 50
+X_RAQUETA2 = ANCHO_VENTANA - 50
+
+# Velocidades en píxeles por segundo
+VELOCIDAD_RAQUETA = 400
+VELOCIDAD_INICIAL_PELOTA = 240
+VELOCIDAD_MAXIMA_PELOTA = 3000
+# La pelota va un poco más rápido después de cada golpe
+ACELERACION_GOLPE = 1.1
+
+# Paso de tiempo fijo de la simulación, en segundos
+PASO_TIEMPO = 1 / 60
+
+# Acciones de cada raqueta
+SUBIR = -1
+QUIETO = 0
+BAJAR = 1
+
+# Valores que se usan en las colisiones
+MITAD_RAQUETA = ALTO_RAQUETA / 2
+MITAD_PELOTA = TAMANO_PELOTA / 2
+# Posición x del centro de la pelota cuando toca la cara de cada raqueta
+CARA_RAQUETA1 = X_RAQUETA1 + ANCHO_RAQUETA / 2 + MITAD_PELOTA
+CARA_RAQUETA2 = X_RAQUETA2 - ANCHO_RAQUETA / 2 - MITAD_PELOTA
+
+# -------------------------------------------------
+# Estado de una partida
+# -------------------------------------------------
+
+class EstadoPong:
+    """Todo lo que cambia durante una partida"""
+    __slots__ = ("raqueta1_y", "raqueta2_y", "pelota_x", "pelota_y", "velocidad_x", "velocidad_y",
+                 "puntos1", "puntos2", "pasos")
+
+    def __init__(self):
+        self.raqueta1_y = ALTO_VENTANA / 2
+        self.raqueta2_y = ALTO_VENTANA / 2
+        self.pelota_x = ANCHO_VENTANA / 2
+        self.pelota_y = ALTO_VENTANA / 2
+        self.velocidad_x = VELOCIDAD_INICIAL_PELOTA
+        self.velocidad_y = VELOCIDAD_INICIAL_PELOTA
+        self.puntos1 = 0
+        self.puntos2 = 0
+        self.pasos = 0
+
+    def copiar(self) -> 'EstadoPong':
+        copia = EstadoPong.__new__(EstadoPong)
+        for campo in EstadoPong.__slots__:
+            setattr(copia, campo, getattr(self, campo))
+        return copia
+
+    def observacion(self) -> Tuple[float, float, float, float, float, float]:
+        """Lo que ve un jugador automático: raquetas, posición y velocidad de la pelota"""
+        return (self.raqueta1_y, self.raqueta2_y, self.pelota_x, self.pelota_y,
+                self.velocidad_x, self.velocidad_y)
+
+# -------------------------------------------------
+# Simulación de una partida
+# -------------------------------------------------
+
+def mover_raqueta(y: float, accion: int, tiempo: float = PASO_TIEMPO) -> float:
+    """Nueva altura de una raqueta después de un paso, sin salirse del campo"""
+    return min(max(y + accion * VELOCIDAD_RAQUETA * tiempo, MITAD_RAQUETA), ALTO_VENTANA - MITAD_RAQUETA)
+
+class SimulacionPong:
+    """Una partida de Pong sin pantalla, que avanza con paso(acciones)"""
+
+    def __init__(self, semilla: Optional[int] = None, paso_tiempo: float = PASO_TIEMPO):
+        self.aleatorio = random.Random(semilla)
+        self.paso_tiempo = paso_tiempo
+        self.estado = EstadoPong()
+        self.reiniciar()
+
+    def reiniciar(self) -> EstadoPong:
+        """Empieza una partida nueva"""
+        self.estado = EstadoPong()
+        self.sacar(self.aleatorio.choice((-1, 1)))
+        return self.estado
+
+    def sacar(self, direccion: int):
+        """Pone la pelota en el centro, saliendo hacia la dirección indicada"""
+        estado = self.estado
+        estado.pelota_x = ANCHO_VENTANA / 2
+        estado.pelota_y = ALTO_VENTANA / 2
+        estado.velocidad_x = VELOCIDAD_INICIAL_PELOTA * direccion
+        estado.velocidad_y = VELOCIDAD_INICIAL_PELOTA * self.aleatorio.choice((-1, 1))
+
+    def paso(self, acciones: Tuple[int, int]) -> Tuple[EstadoPong, Tuple[int, int]]:
+        """
+        Avanza la partida un paso de tiempo
+
+        Args:
+            acciones: Acción de cada jugador (SUBIR, QUIETO o BAJAR)
+
+        Returns:
+            Tuple[EstadoPong, Tuple[int, int]]: El estado y la recompensa de cada jugador
+        """
+        estado = self.estado
+        tiempo = self.paso_tiempo
+        estado.pasos += 1
+
+        # Raquetas, sin salirse del campo
+        estado.raqueta1_y = mover_raqueta(estado.raqueta1_y, acciones[0], tiempo)
+        estado.raqueta2_y = mover_raqueta(estado.raqueta2_y, acciones[1], tiempo)
+
+        x, y = estado.pelota_x, estado.pelota_y
+        x_nueva = x + estado.velocidad_x * tiempo
+        y_nueva = y + estado.velocidad_y * tiempo
+
+        # Rebotes verticales: la parte del movimiento que se pasa del borde se refleja
+        if y_nueva < MITAD_PELOTA:
+            y_nueva = 2 * MITAD_PELOTA - y_nueva
+            estado.velocidad_y = abs(estado.velocidad_y)
+        elif y_nueva > ALTO_VENTANA - MITAD_PELOTA:
+            y_nueva = 2 * (ALTO_VENTANA - MITAD_PELOTA) - y_nueva
+            estado.velocidad_y = -abs(estado.velocidad_y)
+
+        # Colisión barrida con la raqueta hacia la que va la pelota
+        if estado.velocidad_x < 0:
+            cara, raqueta_y = CARA_RAQUETA1, estado.raqueta1_y
+            cruza = x >= cara > x_nueva
+        else:
+            cara, raqueta_y = CARA_RAQUETA2, estado.raqueta2_y
+            cruza = x <= cara < x_nueva
+        if cruza:
+            # Altura de la pelota en el momento en que llega a la cara de la raqueta
+            y_cara = y + (y_nueva - y) * (cara - x) / (x_nueva - x)
+            if abs(y_cara - raqueta_y) <= MITAD_RAQUETA + MITAD_PELOTA:
+                x_nueva = 2 * cara - x_nueva
+                velocidad = min(abs(estado.velocidad_x) * ACELERACION_GOLPE, VELOCIDAD_MAXIMA_PELOTA)
+                estado.velocidad_x = velocidad if estado.velocidad_x < 0 else -velocidad
+
+        estado.pelota_x, estado.pelota_y = x_nueva, y_nueva
+
+        # Control de puntuación: se saca hacia el que ha perdido el punto
+        if x_nueva - MITAD_PELOTA <= 0:
+            estado.puntos2 += 1
+            self.sacar(-1)
+            return estado, (-1, 1)
+        if x_nueva + MITAD_PELOTA >= ANCHO_VENTANA:
+            estado.puntos1 += 1
+            self.sacar(1)
+            return estado, (1, -1)
+        return estado, (0, 0)
+
+# -------------------------------------------------
+# Simulación de muchas partidas a la vez
+# -------------------------------------------------
+
+class LotePong:
+    """
+    Varias partidas independientes que avanzan a la vez.
+
+    Con NumPy, cada campo del estado es un array con un valor por partida y paso() recibe un
+    array de acciones de forma (partidas, 2); devuelve las observaciones, de forma (partidas, 6),
+    y las recompensas, de forma (partidas, 2). Sin NumPy devuelve listas de tuplas.
+    """
+
+    def __init__(self, partidas: int, semilla: Optional[int] = None, paso_tiempo: float = PASO_TIEMPO):
+        self.partidas = partidas
+        self.paso_tiempo = paso_tiempo
+        if np is None:
+            aleatorio = random.Random(semilla)
+            self.simulaciones = [SimulacionPong(aleatorio.getrandbits(32), paso_tiempo) for _ in range(partidas)]
+            return
+        self.aleatorio = np.random.default_rng(semilla)
+        self.raquetas_y = np.full((partidas, 2), ALTO_VENTANA / 2)
+        self.pelota_x = np.empty(partidas)
+        self.pelota_y = np.empty(partidas)
+        self.velocidad_x = np.empty(partidas)
+        self.velocidad_y = np.empty(partidas)
+        self.puntos = np.zeros((partidas, 2), dtype=np.int64)
+        self.sacar(np.ones(partidas, dtype=bool), self.aleatorio.choice((-1.0, 1.0), partidas))
+
+    def sacar(self, cuales, direcciones):
+        """Pone la pelota en el centro en las partidas indicadas (un array de booleanos)"""
+        cuantas = int(cuales.sum())
+        self.pelota_x[cuales] = ANCHO_VENTANA / 2
+        self.pelota_y[cuales] = ALTO_VENTANA / 2
+        self.velocidad_x[cuales] = VELOCIDAD_INICIAL_PELOTA * direcciones
+        self.velocidad_y[cuales] = VELOCIDAD_INICIAL_PELOTA * self.aleatorio.choice((-1.0, 1.0), cuantas)
+
+    def observaciones(self):
+        if np is None:
+            return [simulacion.estado.observacion() for simulacion in self.simulaciones]
+        return np.column_stack((self.raquetas_y, self.pelota_x, self.pelota_y, self.velocidad_x, self.velocidad_y))
+
+    def paso(self, acciones):
+        """Avanza todas las partidas un paso de tiempo (ver SimulacionPong.paso)"""
+        if np is None:
+            recompensas = [simulacion.paso(accion)[1] for simulacion, accion in zip(self.simulaciones, acciones)]
+            return self.observaciones(), recompensas
+        tiempo = self.paso_tiempo
+
+        # Raquetas, sin salirse del campo
+        self.raquetas_y += np.asarray(acciones) * (VELOCIDAD_RAQUETA * tiempo)
+        np.clip(self.raquetas_y, MITAD_RAQUETA, ALTO_VENTANA - MITAD_RAQUETA, out=self.raquetas_y)
+
+        x, y = self.pelota_x, self.pelota_y
+        x_nueva = x + self.velocidad_x * tiempo
+        y_nueva = y + self.velocidad_y * tiempo
+
+        # Rebotes verticales
+        arriba = y_nueva < MITAD_PELOTA
+        abajo = y_nueva > ALTO_VENTANA - MITAD_PELOTA
+        y_nueva = np.where(arriba, 2 * MITAD_PELOTA - y_nueva, y_nueva)
+        y_nueva = np.where(abajo, 2 * (ALTO_VENTANA - MITAD_PELOTA) - y_nueva, y_nueva)
+        self.velocidad_y = np.where(arriba, np.abs(self.velocidad_y),
+                                    np.where(abajo, -np.abs(self.velocidad_y), self.velocidad_y))
+
+        # Colisión barrida con la raqueta hacia la que va cada pelota
+        izquierda = self.velocidad_x < 0
+        cara = np.where(izquierda, CARA_RAQUETA1, CARA_RAQUETA2)
+        raqueta_y = np.where(izquierda, self.raquetas_y[:, 0], self.raquetas_y[:, 1])
+        cruza = np.where(izquierda, (x >= cara) & (cara > x_nueva), (x <= cara) & (cara < x_nueva))
+        avance = np.where(cruza, x_nueva - x, 1.0)
+        y_cara = y + (y_nueva - y) * (cara - x) / avance
+        golpe = cruza & (np.abs(y_cara - raqueta_y) <= MITAD_RAQUETA + MITAD_PELOTA)
+        x_nueva = np.where(golpe, 2 * cara - x_nueva, x_nueva)
+        velocidad = np.minimum(np.abs(self.velocidad_x) * ACELERACION_GOLPE, VELOCIDAD_MAXIMA_PELOTA)
+        self.velocidad_x = np.where(golpe, np.where(izquierda, velocidad, -velocidad), self.velocidad_x)
+
+        self.pelota_x, self.pelota_y = x_nueva, y_nueva
+
+        # Control de puntuación: se saca hacia el que ha perdido el punto
+        punto2 = x_nueva - MITAD_PELOTA <= 0
+        punto1 = x_nueva + MITAD_PELOTA >= ANCHO_VENTANA
+        recompensas = np.zeros((self.partidas, 2), dtype=np.int64)
+        recompensas[punto1] = (1, -1)
+        recompensas[punto2] = (-1, 1)
+        self.puntos += recompensas > 0
+        fuera = punto1 | punto2
+        if fuera.any():
+            self.sacar(fuera, np.where(punto1[fuera], 1.0, -1.0))
+        return self.observaciones(), recompensas
+
+# -------------------------------------------------
+# Jugador controlado por el ordenador
+# -------------------------------------------------
+
+# Dificultades: (tiempo de reacción en segundos, error típico de la predicción en píxeles)
+DIFICULTADES = {
+    'facil': (0.3, 60),
+    'normal': (0.15, 25),
+    'dificil': (0.05, 5),
+}
+
+def prediccion_y(x: float, y: float, velocidad_x: float, velocidad_y: float, cara: float) -> float:
+    """
+    Altura a la que llegará el centro de la pelota a la posición x de la cara de una raqueta.
+
+    En lugar de simular los rebotes, se "desdobla" el campo: la pelota sigue en línea recta
+    y la altura se pliega sobre la franja por la que se puede mover su centro.
+    """
+    if velocidad_x == 0:
+        return y
+    y_recta = y + velocidad_y * (cara - x) / velocidad_x
+    franja = ALTO_VENTANA - 2 * MITAD_PELOTA
+    posicion = (y_recta - MITAD_PELOTA) % (2 * franja)
+    if posicion > franja:
+        posicion = 2 * franja - posicion
+    return MITAD_PELOTA + posicion
+
+class JugadorCPU:
+    """
+    Raqueta controlada por el ordenador.
+
+    Cuando la pelota viene hacia su raqueta, calcula dónde va a llegar y va hacia allí;
+    cuando se aleja, vuelve al centro. La predicción solo se calcula cuando cambia la velocidad
+    de la pelota (en un golpe, un rebote o un saque), y tarda el tiempo de reacción en usarla.
+    """
+
+    def __init__(self, jugador: int, dificultad: str = 'normal', semilla: Optional[int] = None):
+        """
+        Args:
+            jugador: 0 para la raqueta de la izquierda, 1 para la de la derecha
+            dificultad: Una de las claves de DIFICULTADES
+        """
+        self.jugador = jugador
+        self.cara = CARA_RAQUETA1 if jugador == 0 else CARA_RAQUETA2
+        self.reaccion, self.error = DIFICULTADES[dificultad]
+        self.aleatorio = random.Random(semilla)
+        # Velocidad de la pelota con la que se hizo la última predicción
+        self.velocidad = None
+        # Altura a la que va la raqueta, y la que usará cuando pase el tiempo de reacción
+        self.objetivo = ALTO_VENTANA / 2
+        self.siguiente_objetivo = self.objetivo
+        self.espera = 0.0
+        # Número de predicciones calculadas (para comprobar que no se hacen en cada fotograma)
+        self.predicciones = 0
+
+    def accion(self, observacion: Sequence[float], tiempo: float = PASO_TIEMPO) -> int:
+        """
+        Decide hacia dónde mover la raqueta
+
+        Args:
+            observacion: Raquetas, posición y velocidad de la pelota (ver EstadoPong.observacion)
+            tiempo: Tiempo en segundos desde la última llamada
+
+        Returns:
+            int: SUBIR, QUIETO o BAJAR
+        """
+        x, y, velocidad_x, velocidad_y = observacion[2:6]
+        if (velocidad_x, velocidad_y) != self.velocidad:
+            self.velocidad = (velocidad_x, velocidad_y)
+            self.espera = self.reaccion
+            if (velocidad_x < 0) == (self.jugador == 0):
+                self.siguiente_objetivo = prediccion_y(x, y, velocidad_x, velocidad_y, self.cara) \
+                    + self.aleatorio.gauss(0, self.error)
+                self.predicciones += 1
+            else:
+                self.siguiente_objetivo = ALTO_VENTANA / 2
+        if self.espera > 0:
+            self.espera -= tiempo
+            if self.espera <= 0:
+                self.objetivo = self.siguiente_objetivo
+
+        # Se mueve solo si en este paso no se va a pasar del objetivo
+        diferencia = self.objetivo - observacion[self.jugador]
+        if abs(diferencia) <= VELOCIDAD_RAQUETA * tiempo / 2:
+            return QUIETO
+        return BAJAR if diferencia > 0 else SUBIR
+
+# -------------------------------------------------
+# Medida de rendimiento
+# -------------------------------------------------
+
+def seguir_pelota(observacion: Sequence[float], jugador: int) -> int:
+    """Jugador automático muy simple: mueve la raqueta hacia la altura de la pelota"""
+    diferencia = observacion[3] - observacion[jugador]
+    if diferencia > MITAD_RAQUETA / 2:
+        return BAJAR
+    if diferencia < -MITAD_RAQUETA / 2:
+        return SUBIR
+    return QUIETO
+
+def medir(pasos: int = 100000, partidas: int = 1000) -> List[str]:
+    resultados = []
+
+    simulacion = SimulacionPong(semilla=0)
+    estado = simulacion.estado
+    inicio = time.perf_counter()
+    for _ in range(pasos):
+        observacion = estado.observacion()
+        estado, _ = simulacion.paso((seguir_pelota(observacion, 0), seguir_pelota(observacion, 1)))
+    duracion = time.perf_counter() - inicio
+    resultados.append(f"Una partida: {pasos / duracion:,.0f} pasos/s "
+                      f"(marcador {estado.puntos1}-{estado.puntos2})")
+
+    lote = LotePong(partidas, semilla=0)
+    repeticiones = max(1, pasos // partidas)
+    inicio = time.perf_counter()
+    if np is None:
+        for _ in range(repeticiones):
+            lote.paso([(random.randint(-1, 1), random.randint(-1, 1)) for _ in range(partidas)])
+    else:
+        aleatorio = np.random.default_rng(0)
+        for _ in range(repeticiones):
+            lote.paso(aleatorio.integers(-1, 2, (partidas, 2)))
+    duracion = time.perf_counter() - inicio
+    modo = "NumPy" if np is not None else "sin NumPy"
+    resultados.append(f"Lote de {partidas} partidas ({modo}): {repeticiones * partidas / duracion:,.0f} pasos/s")
+
+    simulacion = SimulacionPong(semilla=0)
+    estado = simulacion.estado
+    cpu1 = JugadorCPU(0, 'normal', semilla=1)
+    cpu2 = JugadorCPU(1, 'dificil', semilla=2)
+    inicio = time.perf_counter()
+    for _ in range(pasos):
+        observacion = estado.observacion()
+        estado, _ = simulacion.paso((cpu1.accion(observacion), cpu2.accion(observacion)))
+    duracion = time.perf_counter() - inicio
+    resultados.append(f"CPU normal contra CPU difícil: {pasos / duracion:,.0f} pasos/s "
+                      f"(marcador {estado.puntos1}-{estado.puntos2}, "
+                      f"{cpu1.predicciones + cpu2.predicciones} predicciones)")
+    return resultados
+
+if __name__ == "__main__":
+    for linea in medir():
+        print(linea)
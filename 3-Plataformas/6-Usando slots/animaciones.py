@@ -1,11 +1,57 @@
-from pyganim import PygAnimation
+import pygame
+from pyganim import PygAnimation, PygConductor, getFramesFromSpriteSheet
+from recursos import GestorRecursos
 
 # Extendemos la clase animacion de PygAnimation para darle posicion
 class Animacion(PygAnimation):
-    def __init__(self, *args):
-        super().__init__(args)
+    # Frames ya transformados, compartidos por todas las animaciones
+    #  La clave es (imagenes de los frames, cadena de transformaciones)
+    _cacheTransformaciones = {}
+
+    def __init__(self, frames, loop=True, transformaciones=()):
+        """
+        Args:
+            frames: Lista de tuplas (imagen, duracion) de PygAnimation
+            loop: Si la animacion se repite
+            transformaciones: Cadena de transformaciones a aplicar a los frames, como tuplas
+                (nombre de la funcion de pygame.transform, argumentos...), por ejemplo
+                (('scale', (400, 400)),) o (('rotate', 30),)
+        """
+        super().__init__(frames, loop)
         # Posicion que tendra esta animacion
         self.posicion = (0, 0)
+        # Los frames transformados se calculan una sola vez para todas las animaciones iguales
+        #  (en lugar de llamar a scale() o rotate() en cada animacion, que copia todos los frames)
+        #  La clave de la cache se guarda para que la escena que libera la animacion libere tambien sus frames
+        self.claveTransformaciones = None
+        if transformaciones:
+            self.claveTransformaciones = (tuple(frame[0] for frame in frames), tuple(transformaciones))
+            self._transformedImages = Animacion._framesTransformados(self.claveTransformaciones, self._frames.images)
+            # Como los comparte con las demas, si se cambian (con set_alpha(), por ejemplo) antes se copian
+            self._sharedTransformedImages = True
+
+    @staticmethod
+    def _framesTransformados(clave, imagenes):
+        if clave not in Animacion._cacheTransformaciones:
+            transformados = []
+            for imagen in imagenes:
+                # Cada transformacion se aplica sobre el resultado de la anterior, sin copias intermedias
+                for nombre, *argumentos in clave[1]:
+                    imagen = getattr(pygame.transform, nombre)(imagen, *argumentos)
+                transformados.append(imagen)
+            # Se guarda como tupla, que comparten todas: PygAnimation la sustituye al transformarla,
+            #  y la copia antes de cambiar sus frames (ver _sharedTransformedImages)
+            Animacion._cacheTransformaciones[clave] = tuple(transformados)
+        return Animacion._cacheTransformaciones[clave]
+
+    @staticmethod
+    def LiberarCacheTransformaciones(claves):
+        # Quita de la cache los frames transformados con esas claves (las de las animaciones que
+        #  libera una escena al suspenderse, ver GrupoAnimaciones.clavesTransformaciones), sin tocar
+        #  los del resto de escenas. Las animaciones que ya existen siguen teniendo sus frames, asi que
+        #  solo se libera la memoria de los que ya no usa ninguna; se vuelven a calcular cuando hagan falta
+        for clave in claves:
+            Animacion._cacheTransformaciones.pop(clave, None)
         
     def establecerPosicion(self, posicion):
         # La posicion es una tupla (x, y)
@@ -15,49 +61,83 @@ class Animacion(PygAnimation):
         # La distancia es una tupla (x, y)
         self.posicion = (self.posicion[0] + distancia[0], self.posicion[1] + distancia[1])
 
+    def reiniciar(self, posicion=(0, 0)):
+        # Vuelve a empezar la animacion en otra posicion, para poder reutilizarla desde un PoolObjetos
+        self.establecerPosicion(posicion)
+        self.stop()
+        self.play()
+
+    def rectangulo(self):
+        # Rectangulo de la pantalla que puede llegar a ocupar la animacion (con los frames ya transformados)
+        ancho = max(self.getFrame(i).get_width() for i in range(self.numFrames))
+        alto = max(self.getFrame(i).get_height() for i in range(self.numFrames))
+        return pygame.Rect(self.posicion, (ancho, alto))
+
     def draw(self, pantalla):
         # Dibuja la animacion en la pantalla
         self.blit(pantalla, self.posicion)
 
+# Grupo de animaciones que se dibujan todas a la vez
+class GrupoAnimaciones(PygConductor):
+    def __init__(self, *animaciones):
+        # A diferencia de PygConductor, el grupo puede empezar vacio
+        self._animations = []
+        if animaciones:
+            self.add(*animaciones)
+
+    def __len__(self):
+        return len(self._animations)
+
+    def remove(self, *animaciones):
+        for animacion in animaciones:
+            self._animations.remove(animacion)
+
+    def rectangulos(self):
+        # Rectangulos de la pantalla que pueden ocupar las animaciones del grupo
+        return [animacion.rectangulo() for animacion in self._animations]
+
+    def clavesTransformaciones(self):
+        # Claves de la cache de frames transformados que usan las animaciones del grupo
+        return {animacion.claveTransformaciones for animacion in self._animations
+                if animacion.claveTransformaciones is not None}
+
+    def draw(self, pantalla, scroll=None):
+        # Dibuja todas las animaciones en su posicion con una sola llamada a blits(),
+        #  y devuelve los rectangulos de la pantalla que se han modificado
+        # Si se indica el scroll, las posiciones son globales (del decorado) y se pasan a la pantalla
+        if scroll is None:
+            return self.blits(pantalla, [animacion.posicion for animacion in self._animations])
+        return self.blits(pantalla, [(animacion.posicion[0] - scroll[0], animacion.posicion[1] - scroll[1])
+                                     for animacion in self._animations])
+
 # Las distintas animaciones que tendremos
+#  Cada una se carga de una sola hoja de sprites (HOJA) con su archivo de coordenadas (COORDENADAS),
+#  en el directorio de imagenes del gestor de recursos
 
 # La animacion del fuego
 class AnimacionFuego(Animacion):
-    def __init__(self):
-        super().__init__([
-                        ('imagenes/flame_a_0001.png', 0.1),
-                        ('imagenes/flame_a_0002.png', 0.1),
-                        ('imagenes/flame_a_0003.png', 0.1),
-                        ('imagenes/flame_a_0004.png', 0.1),
-                        ('imagenes/flame_a_0005.png', 0.1),
-                        ('imagenes/flame_a_0006.png', 0.1)])
+    HOJA = GestorRecursos.RutaImagen('flame_a.png')
+    COORDENADAS = GestorRecursos.RutaImagen('coordFlame.txt')
+
+    def __init__(self, loop=True, transformaciones=()):
+        super().__init__(getFramesFromSpriteSheet(self.HOJA, self.COORDENADAS, 0.1),
+                         loop, transformaciones)
 
 # La animacion del rayo
 class AnimacionRayo(Animacion):
-    def __init__(self):
-        super().__init__([
-                        ('imagenes/bolt_strike_0001.png', 0.1),
-                        ('imagenes/bolt_strike_0002.png', 0.1),
-                        ('imagenes/bolt_strike_0003.png', 0.1),
-                        ('imagenes/bolt_strike_0004.png', 0.1),
-                        ('imagenes/bolt_strike_0005.png', 0.1),
-                        ('imagenes/bolt_strike_0006.png', 0.1),
-                        ('imagenes/bolt_strike_0007.png', 0.1),
-                        ('imagenes/bolt_strike_0008.png', 0.1),
-                        ('imagenes/bolt_strike_0009.png', 0.1),
-                        ('imagenes/bolt_strike_0010.png', 0.1)])
+    HOJA = GestorRecursos.RutaImagen('bolt_strike.png')
+    COORDENADAS = GestorRecursos.RutaImagen('coordBolt.txt')
+
+    def __init__(self, loop=True, transformaciones=()):
+        super().__init__(getFramesFromSpriteSheet(self.HOJA, self.COORDENADAS, 0.1),
+                         loop, transformaciones)
 
 # La animacion del humo
 class AnimacionHumo(Animacion):
-    def __init__(self):
-        super().__init__([
-                        ('imagenes/smoke_puff_0001.png', 0.1),
-                        ('imagenes/smoke_puff_0002.png', 0.1),
-                        ('imagenes/smoke_puff_0003.png', 0.1),
-                        ('imagenes/smoke_puff_0004.png', 0.1),
-                        ('imagenes/smoke_puff_0005.png', 0.1),
-                        ('imagenes/smoke_puff_0006.png', 0.1),
-                        ('imagenes/smoke_puff_0007.png', 0.1),
-                        ('imagenes/smoke_puff_0008.png', 0.2),
-                        ('imagenes/smoke_puff_0009.png', 0.2),
-                        ('imagenes/smoke_puff_0010.png', 0.2)])
+    HOJA = GestorRecursos.RutaImagen('smoke_puff.png')
+    COORDENADAS = GestorRecursos.RutaImagen('coordSmoke.txt')
+
+    def __init__(self, loop=True, transformaciones=()):
+        super().__init__(getFramesFromSpriteSheet(self.HOJA, self.COORDENADAS,
+                                                  [0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2]),
+                         loop, transformaciones)
@@ -17,3 +17,30 @@ class Configuracion:
         self.FPS = 60
         self.DEAD_ZONE_HEIGHT = 600
         self.DEAD_ZONE_WIDTH = 600
+        # Perfilado: anotar las superficies que se dibujan sin estar en el formato de la pantalla
+        self.PERFILAR_FORMATOS = False
+        # Perfilado: medir los tiempos de cada parte de las escenas y guardarlos al salir (CSV o JSON)
+        self.PERFILAR_ESCENAS = False
+        self.FICHERO_PERFIL = "perfil_escenas.csv"
+        # Preparacion de escenas en segundo plano: hilos que leen las imagenes,
+        #  y milisegundos de cada frame que se dedican a construir la escena
+        self.HILOS_CARGA = 2
+        self.TIEMPO_PREPARACION = 4
+        # Numero de escenas de la cima de la pila que mantienen sus recursos;
+        #  las que queden por debajo se suspenden y los liberan hasta que se reanuden
+        self.ESCENAS_RESIDENTES = 1
+        # Canales del mezclador de sonido, y cuantos de ellos se reservan para los sonidos de prioridad alta
+        self.CANALES_SONIDO = 16
+        self.CANALES_RESERVADOS = 2
+        # Milisegundos del fundido de la musica al cambiar de escena
+        self.TIEMPO_FUNDIDO = 500
+        # Juego en red: puerto por defecto, milisegundos de cada paso (fijo) de la simulacion,
+        #  pasos que se retrasan las entradas de los jugadores, y cada cuantos pasos se mide la latencia
+        self.PUERTO_RED = 5556
+        self.PASO_RED = 16
+        self.RETARDO_ENTRADA = 4
+        self.PASOS_PING = 30
+        # Archivo del guardado rapido de la partida (F5 guarda, F9 carga)
+        self.FICHERO_PARTIDA_RAPIDA = "partida_rapida.bin"
+        # Archivo en el que el anfitrion de una partida en red graba la repeticion (None para no grabarla)
+        self.FICHERO_REPETICION = None
@@ -1,16 +1,22 @@
 # Modulos
 import pygame
 import sys
+import time
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from escena import *
+from recursos import GestorRecursos
+from perfilador import Perfilador
+from sonido import GestorMusica
+from configuracion import Configuracion
 from pygame.locals import *
-import configuracion as cfg
 
 class Director:
 
     def __init__(self):
         # Inicializamos la pantalla y el modo grafico
-        self._pantalla = pygame.display.set_mode((cfg.ANCHO_PANTALLA, cfg.ALTO_PANTALLA))
+        config = Configuracion()
+        self._pantalla = pygame.display.set_mode((config.ANCHO_PANTALLA, config.ALTO_PANTALLA))
         pygame.display.set_caption("Ejemplo de Juego controlado por el patrón Director")
         # Pila de escenas
         self.pila = deque()
@@ -18,6 +24,17 @@ class Director:
         self.salir_escena = False
         # Reloj
         self.reloj = pygame.time.Clock()
+        # Creamos el gestor de recursos (Singleton), una vez que ya existe la pantalla
+        GestorRecursos()
+        # Perfiladores de las escenas, por nombre de la clase de la escena
+        self.perfilar = Configuracion().PERFILAR_ESCENAS
+        self.perfiles = {}
+        # Escena que se esta preparando en segundo plano (con las imagenes que se estan leyendo)
+        #  y los hilos que las leen (ver hilosCarga)
+        self.preparacion = None
+        self.hilos = None
+        # La musica de las escenas, que tambien se lee en los hilos de carga
+        self.musica = GestorMusica(self.hilosCarga())
 
     @property
     def pantalla(self):
@@ -26,9 +43,19 @@ class Director:
         """
         return self._pantalla
 
+    def perfilEscena(self, nombre):
+        # Devuelve el perfilador de las escenas con ese nombre (creandolo la primera vez)
+        if nombre not in self.perfiles:
+            self.perfiles[nombre] = Perfilador(nombre, self.perfilar)
+        return self.perfiles[nombre]
+
     def bucle(self, escena):
 
         self.salir_escena = False
+        fps = Configuracion().FPS
+
+        # Solo se dejan pasar los tipos de evento que trata la escena
+        self.filtrarEventos(escena)
 
         # Eliminamos todos los eventos producidos antes de entrar en el bucle
         pygame.event.clear()
@@ -37,17 +64,82 @@ class Director:
         while not self.salir_escena:
 
             # Sincronizar el juego a 60 fps
-            tiempo_pasado = self.reloj.tick(cfg.FPS)
+            tiempo_pasado = self.reloj.tick(fps)
 
             # Pasamos los eventos a la escena
-            escena.eventos(pygame.event.get())
+            with escena.seccion("eventos"):
+                escena.eventos(pygame.event.get())
 
             # Actualiza la escena
-            escena.update(tiempo_pasado)
+            with escena.seccion("update"):
+                escena.update(tiempo_pasado)
 
             # Se dibuja en pantalla
-            escena.draw(self.pantalla)
-            pygame.display.flip()
+            with escena.seccion("draw"):
+                escena.draw(self.pantalla)
+                pygame.display.flip()
+
+            # Se avanza en la preparacion de la siguiente escena, si la hay
+            if self.preparacion is not None:
+                self.avanzarPreparacion()
+            # y se empieza la musica de la escena cuando termine el fundido de la anterior
+            self.musica.update()
+
+    def hilosCarga(self):
+        # Hilos en los que se leen los archivos (imagenes de las escenas que se preparan, musica)
+        if self.hilos is None:
+            self.hilos = ThreadPoolExecutor(max_workers=Configuracion().HILOS_CARGA)
+        return self.hilos
+
+    def filtrarEventos(self, escena):
+        # Los eventos que no tiene en su tabla de manejadores la escena los descarta SDL
+        #  sin llegar a meterlos en la cola (por ejemplo, los MOUSEMOTION al mover el raton),
+        #  asi la cola solo tiene los eventos que se van a tratar
+        # Si la escena no usa la tabla (trata los eventos en su metodo eventos), se dejan pasar todos
+        if escena.manejadores:
+            pygame.event.set_blocked(None)
+            pygame.event.set_allowed(list(escena.manejadores))
+        else:
+            pygame.event.set_allowed(None)
+
+    def prepararEscena(self, escena, apilar=False):
+        """
+        Prepara una escena sin congelar la actual: sus imagenes se leen en otros hilos
+        y despues se construye por partes (Escena.construir) en los frames siguientes.
+        Cuando esta lista, se cambia a ella (o se apila, si apilar es True).
+        """
+        if self.preparacion is not None:
+            return # Ya se esta preparando otra escena
+        lecturas = [(ruta, self.hilosCarga().submit(GestorRecursos.DecodificarImagen, ruta)) for ruta in escena.recursos]
+        # Tambien se va leyendo su musica, para que el cambio de pista sea inmediato
+        self.musica.precargar(escena.musica)
+        self.preparacion = (escena, apilar, lecturas)
+
+    def avanzarPreparacion(self):
+        escena, apilar, lecturas = self.preparacion
+        # Hasta que no esten leidas todas las imagenes no se empieza a construir la escena
+        if not all(lectura.done() for (ruta, lectura) in lecturas):
+            return
+        for (ruta, lectura) in lecturas:
+            # Si fallo alguna lectura no se interrumpe la preparacion: la imagen se vuelve
+            #  a intentar cargar al construir la escena, como si no se hubiera leido antes
+            error = lectura.exception()
+            if error is not None:
+                print(f"Error al cargar la imagen {ruta}: {error}")
+        # (las lecturas ya se han comprobado, no hace falta volver a mirarlas en los siguientes frames)
+        self.preparacion = (escena, apilar, [])
+        # Se construyen partes de la escena hasta agotar el tiempo de este frame
+        limite = time.perf_counter() + Configuracion().TIEMPO_PREPARACION / 1000.0
+        while not escena.avanzarConstruccion():
+            if time.perf_counter() >= limite:
+                return
+        # La escena esta lista: se cambia a ella, entre dos frames
+        self.preparacion = None
+        GestorRecursos().decodificadas.clear()
+        if apilar:
+            self.apilarEscena(escena)
+        else:
+            self.cambiarEscena(escena)
 
 
     def execute(self):
@@ -58,9 +150,39 @@ class Director:
             # Se coge la escena a ejecutar como la que este en la cima de la pila
             escena = self.pila[-1]
 
+            # Si estaba suspendida, recupera ahora lo que habia liberado
+            if escena.suspendida:
+                escena.suspendida = False
+                escena.reanudar()
+            # y se suspenden las escenas que hayan quedado enterradas en la pila
+            self.suspenderEscenasEnterradas()
+            # Si la escena tiene otra musica, se cambia con un fundido
+            self.musica.reproducir(escena.musica)
+
             # Ejecutamos el bucle de eventos hasta que termine la escena
             self.bucle(escena)
 
+        # Si se estaba perfilando, se muestran las superficies que no estaban en el formato de la pantalla
+        if GestorRecursos.perfilarFormatos:
+            GestorRecursos.InformeFormatos()
+        # Y si se estaban perfilando las escenas, se guardan sus tiempos
+        if self.perfilar:
+            Perfilador.volcar(self.perfiles.values(), Configuracion().FICHERO_PERFIL)
+        # Se vuelven a dejar pasar todos los eventos
+        pygame.event.set_allowed(None)
+        # Se quita la musica y se terminan los hilos de carga
+        self.musica.reproducir(None)
+        self.hilos.shutdown(wait=False)
+
+
+    def suspenderEscenasEnterradas(self):
+        # Las escenas que esten por debajo de las ESCENAS_RESIDENTES de la cima liberan sus recursos,
+        #  para que la memoria dependa de la escena activa y no de todas las de la pila
+        residentes = Configuracion().ESCENAS_RESIDENTES
+        for profundidad, escena in enumerate(reversed(self.pila)):
+            if profundidad >= residentes and not escena.suspendida:
+                escena.suspendida = True
+                escena.suspender()
 
     def salirEscena(self):
         # Indicamos en el flag que se quiere salir de la escena
@@ -74,14 +196,19 @@ class Director:
     def salirPrograma(self):
         # Vaciamos la lista de escenas pendientes
         self.pila.clear() # Liberar la memoria asociada a la pila
+        # y se abandona la escena que se estuviera preparando
+        self.preparacion = None
         self.salir_escena = True
 
     def cambiarEscena(self, escena):
+        # Si la escena no se ha preparado antes, se termina de construir ahora
+        escena.completarConstruccion()
         self.salirEscena()
         # Ponemos la escena pasada en la cima de la pila
         self.pila.append(escena)
 
     def apilarEscena(self, escena):
+        escena.completarConstruccion()
         self.salir_escena = True
         # Ponemos la escena pasada en la cima de la pila
         #  (por encima de la actual)
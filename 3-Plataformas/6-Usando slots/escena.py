@@ -7,15 +7,79 @@ ALTO_PANTALLA = 600
 # Clase Escena con lo metodos abstractos
 
 class Escena:
+    # Rutas de las imagenes que usa la escena, para que el director las pueda leer
+    #  en segundo plano mientras la prepara (ver Director.prepararEscena)
+    recursos = ()
+    # Pista de musica de fondo de la escena (None si no tiene)
+    musica = None
 
     def __init__(self, director):
         self.director = director
+        # Construccion por partes de la escena (ver construir)
+        self._construccion = None
+        self.construida = False
+        # Si la escena esta suspendida (enterrada en la pila del director, ver suspender)
+        self.suspendida = False
+        # Tabla de manejadores de eventos: tipo de evento -> funcion que lo trata
+        #  (el director solo deja entrar en la cola los tipos de evento que aparecen aqui)
+        self.manejadores = {}
+        # Perfilador de la escena (compartido por todas las escenas de la misma clase)
+        self.perfil = director.perfilEscena(type(self).__name__)
+
+    def seccion(self, nombre):
+        # Cronometro para medir una parte de la escena, con with:
+        #  with self.seccion("colisiones"):
+        #      ...
+        # El director mide asi las fases "eventos", "update" y "draw"
+        return self.perfil.seccion(nombre)
+
+    def construir(self):
+        # Generador que construye la escena por partes, con un yield entre cada una,
+        #  para que el director la pueda preparar en varios frames sin congelar la escena actual
+        # Por defecto la escena se construye entera en __init__ y no hay nada mas que hacer
+        return
+        yield
+
+    def avanzarConstruccion(self):
+        # Construye la siguiente parte de la escena. Devuelve True cuando ya esta construida
+        if not self.construida:
+            if self._construccion is None:
+                self._construccion = self.construir()
+            try:
+                next(self._construccion)
+            except StopIteration:
+                self.construida = True
+        return self.construida
+
+    def completarConstruccion(self):
+        # Construye de una vez todo lo que le quede a la escena
+        while not self.avanzarConstruccion():
+            pass
+
+    def suspender(self):
+        # El director llama a este metodo cuando la escena queda enterrada en la pila,
+        #  para que libere lo que pueda volver a crear despues (imagenes escaladas, animaciones...)
+        pass
+
+    def reanudar(self):
+        # El director llama a este metodo cuando la escena suspendida vuelve a ejecutarse,
+        #  para que recree lo que libero en suspender
+        pass
 
     def update(self, *args):
         raise NotImplemented("Tiene que implementar el metodo update.")
 
-    def eventos(self, *args):
-        raise NotImplemented("Tiene que implementar el metodo eventos.")
+    def manejar(self, tipo, manejador):
+        # Indica la funcion que trata los eventos de un tipo (recibe el evento)
+        self.manejadores[tipo] = manejador
+
+    def eventos(self, lista_eventos):
+        # Cada evento se pasa directamente a su manejador, sin recorrer cadenas de if
+        manejadores = self.manejadores
+        for evento in lista_eventos:
+            manejador = manejadores.get(evento.type)
+            if manejador is not None:
+                manejador(evento)
 
     def draw(self, pantalla):
         raise NotImplemented("Tiene que implementar el metodo draw.")
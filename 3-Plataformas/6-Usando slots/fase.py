@@ -1,31 +1,57 @@
 # -*- coding: utf-8 -*-
 
-#import pygame
+import pygame
 import sys
 import os
+import struct
 from pygame.locals import *
-from personajes import Jugador, Sniper, MiSprite
+from personajes import Personaje, Jugador, Sniper, MiSprite, IndiceJugadores, GestorProyectiles
 from configuracion import Configuracion
 from recursos import GestorRecursos, Camera
 from escena import Escena
+from sonido import GestorSonido, PRIORIDAD_NORMAL, PRIORIDAD_ALTA
 from animaciones import *
+from pool import PoolObjetos
+import instantaneas
 
 # Obtenemos la configuración (Singleton)
 config = Configuracion()
 
 # Constantes
 VELOCIDAD_SOL = 0.1 # Pixeles por milisegundo
+MAXIMO_HUMOS = 16 # Humos de los impactos que puede haber a la vez
+TAMANO_HUMO = 48 # Tamaño (en pixeles) de cada humo
+
+# Al final del estado de la fase (ver empaquetarEstado) se indica si la partida ha terminado
+FORMATO_TERMINADA = struct.Struct('<?')
 
 # Archivos de recursos
 ARCHIVO_JUGADOR = 'Jugador.png'
 ARCHIVO_COORD_JUGADOR = 'coordJugador.txt'
 ARCHIVO_SNIPER = 'Sniper.png'
 ARCHIVO_COORD_SNIPER = 'coordSniper.txt'
+# (los sonidos son los del Pong: el golpe de la pelota para los disparos y los aplausos para el final)
+ARCHIVO_SONIDO_DISPARO = 'Ping_Pong.wav'
+ARCHIVO_SONIDO_IMPACTO = 'Aplausos.wav'
 
 # -------------------------------------------------
 # Clase Fase
 
 class Fase(Escena):
+    # Imagenes de la fase, que el director puede leer en segundo plano antes de construirla
+    #  (las mismas rutas con las que se cargan despues: las del gestor de recursos y las hojas de las animaciones)
+    recursos = (
+        GestorRecursos.RutaImagen(ARCHIVO_JUGADOR),
+        GestorRecursos.RutaImagen(ARCHIVO_SNIPER),
+        GestorRecursos.RutaImagen('decorado.png'),
+        GestorRecursos.RutaImagen('sol.png'),
+        AnimacionFuego.HOJA,
+        AnimacionHumo.HOJA,
+    )
+
+    # Musica de fondo de la fase
+    musica = os.path.join("musica", "fase.wav")
+
     def __init__(self, director):
 
         ## Habria que pasarle como parámetro el número de fase, a partir del cual se cargue
@@ -39,23 +65,47 @@ class Fase(Escena):
         # De esta forma, se podrian tener muchas fases distintas con esta clase
 
         # Primero invocamos al constructor de la clase padre
-        super().__init__(self, director)
+        super().__init__(director)
+        # Se trata el evento de salir y las teclas de guardar y cargar la partida;
+        #  el movimiento se lee del estado del teclado
+        self.manejar(pygame.QUIT, lambda evento: self.director.salirPrograma())
+        self.manejar(pygame.KEYDOWN, self.pulsarTecla)
+
+        # Se pone a True cuando un jugador es alcanzado; la escena no se deja dentro de la
+        #  simulacion, sino despues (ver update), para que se pueda repetir un paso sin salir
+        self.terminada = False
+        # Sonidos del ultimo paso simulado: por lo mismo, no se reproducen dentro de la simulacion,
+        #  sino en presentarEfectos, que no se llama cuando un paso se repite
+        self.sonidos = []
+
+        # El resto de la fase se construye por partes en construir()
+
+
+    def construir(self):
+        # Se crea la fase por partes (con un yield entre cada una), para que el director
+        #  la pueda ir preparando en varios frames mientras se sigue mostrando el menu
 
         # Creamos el decorado y el fondo
         self.decorado = Decorado()
         self.fondo = Cielo()
-        # Almacenamos el director del juego en lugar de la pantalla
-        self.director = director
+        yield
+
+        # Cargamos los sonidos de la fase: los disparos pueden ser muchos, asi que no se repiten
+        #  mas de una vez cada 80ms; el impacto en un jugador siempre tiene que sonar
+        GestorSonido().registrar('disparo', ARCHIVO_SONIDO_DISPARO, PRIORIDAD_NORMAL, intervalo=80, volumen=0.5)
+        GestorSonido().registrar('impacto', ARCHIVO_SONIDO_IMPACTO, PRIORIDAD_ALTA)
 
-        # Creamos los sprites de los jugadores
         # Creamos los sprites de los jugadores
         self.jugador1 = Jugador(ARCHIVO_JUGADOR, ARCHIVO_COORD_JUGADOR)
         self.jugador2 = Jugador(ARCHIVO_JUGADOR, ARCHIVO_COORD_JUGADOR)
         self.grupoJugadores = pygame.sprite.Group(self.jugador1, self.jugador2)
+        # Indice de los jugadores que consultan los enemigos para buscar su objetivo
+        self.indiceJugadores = IndiceJugadores(self.grupoJugadores)
 
         # Ponemos a los jugadores en sus posiciones iniciales
         self.jugador1.establecerPosicion((200, 551))
         self.jugador2.establecerPosicion((400, 551))
+        yield
         
         # Los enemigos que tendran en este decorado
         enemigo1 = Sniper(ARCHIVO_SNIPER, ARCHIVO_COORD_SNIPER)
@@ -73,48 +123,93 @@ class Fase(Escena):
         
         # Creamos un grupo con los Sprites que se mueven
         self.grupoSpritesDinamicos = pygame.sprite.Group(self.jugador1, self.jugador2, enemigo1)
+        # y la lista de esos mismos Sprites en un orden fijo, para guardar su estado (ver empaquetarEstado)
+        self.entidades = (self.jugador1, self.jugador2, enemigo1)
         # Creamos otro grupo con todos los Sprites
         self.grupoSprites = pygame.sprite.Group(self.jugador1, self.jugador2, enemigo1, plataformaSuelo, plataformaCasa)
 
+        # Los proyectiles que disparen los enemigos, que se eliminan al salir del decorado o chocar con una plataforma
+        self.proyectiles = GestorProyectiles(pygame.Rect(0, 0, self.decorado.rect.width, config.ALTO_PANTALLA), self.grupoPlataformas)
+        yield
+
+        # Creamos las animaciones de fuego
+        self.crearAnimaciones()
+        yield
+
+        # El humo que sale donde un proyectil choca con una plataforma: en lugar de crear una animacion
+        #  en cada impacto, se reutilizan las de una reserva, creadas todas ahora (las que se pueden ver a la vez)
+        #  Las animaciones en uso estan tambien en el grupo efectos, con su posicion en el decorado
+        self.efectos = GrupoAnimaciones()
+        self.reservaHumos = PoolObjetos(lambda: AnimacionHumo(loop=False, transformaciones=(('scale', (TAMANO_HUMO, TAMANO_HUMO)),)),
+                                        inicial=MAXIMO_HUMOS, maximo=MAXIMO_HUMOS)
+        yield
+
+        # Creamos la cámara establece la parte del decorado que se va a ver
+        self.camara = Camera(config.ANCHO_PANTALLA, config.ALTO_PANTALLA, 
+                           self.decorado.rect.width, self.decorado.rect.height)
+
+
+    def crearAnimaciones(self):
         # Creamos las animaciones de fuego,
         #  las que estan detras del decorado, y delante
 
-        self.animacionesDetras = []
-        for i in range(9):
-            # La animacion del fuego
-            animacionFuego = AnimacionFuego()
-            # Aumentamos un poco el tamaño de la animacion
-            animacionFuego.scale((400,400))
+        # (cada grupo se dibuja de una sola vez)
+        self.animacionesDetras = GrupoAnimaciones()
+        # La animacion del fuego, un poco mas grande
+        #  (los frames escalados se calculan una sola vez para todas las animaciones)
+        animacionFuego = AnimacionFuego(transformaciones=(('scale', (400,400)),))
+        # Las copias comparten los frames, y cada una va un frame por delante de la anterior
+        for i, animacionFuego in enumerate(animacionFuego.getCopies(9, offset=0.1)):
             # La situamos en su posicion
-            animacionFuego.posicionx = 120*i - 200
-            animacionFuego.posiciony = 250
+            animacionFuego.establecerPosicion((120*i - 200, 250))
             # Iniciamos la animacion
             animacionFuego.play()
-            animacionFuego.nextFrame(i)
-            # y la anadimos a la lista de animaciones detras
-            self.animacionesDetras.append(animacionFuego)
-
-        self.animacionesDelante = []
-        for i in range(11):
-            # La animacion del fuego
-            animacionFuego = AnimacionFuego()
-            # Aumentamos un poco el tamaño de la animacion
-            animacionFuego.scale((450,450))
+            # y la anadimos al grupo de animaciones detras
+            self.animacionesDetras.add(animacionFuego)
+
+        self.animacionesDelante = GrupoAnimaciones()
+        # La animacion del fuego, un poco mas grande
+        #  (los frames escalados se calculan una sola vez para todas las animaciones)
+        animacionFuego = AnimacionFuego(transformaciones=(('scale', (450,450)),))
+        # Las copias comparten los frames, y cada una va un frame por delante de la anterior
+        for i, animacionFuego in enumerate(animacionFuego.getCopies(11, offset=0.1)):
             # La situamos en su posicion
-            animacionFuego.posicionx = 120*i - 200
-            animacionFuego.posiciony = 450
+            animacionFuego.establecerPosicion((120*i - 200, 450))
             # Iniciamos la animacion
             animacionFuego.play()
-            animacionFuego.nextFrame(i)
-            # y la anadimos a la lista de animaciones delante
-            self.animacionesDelante.append(animacionFuego)
-
-        # Creamos la cámara establece la parte del decorado que se va a ver
-        self.camara = Camera(config.ANCHO_PANTALLA, config.ALTO_PANTALLA, 
-                           self.decorado.rect.width, self.decorado.rect.height)
-
+            # y la anadimos al grupo de animaciones delante
+            self.animacionesDelante.add(animacionFuego)
+
+
+    def suspender(self):
+        # Mientras la fase esta enterrada en la pila, se liberan las imagenes escaladas
+        #  y las animaciones, que se vuelven a crear al reanudarla
+        self.decorado.liberar()
+        self.fondo.liberar()
+        #  (y con ellas, sus frames transformados de la cache, pero no los de otras escenas)
+        claves = self.animacionesDetras.clavesTransformaciones() | self.animacionesDelante.clavesTransformaciones()
+        self.animacionesDetras = GrupoAnimaciones()
+        self.animacionesDelante = GrupoAnimaciones()
+        Animacion.LiberarCacheTransformaciones(claves)
+
+    def reanudar(self):
+        self.decorado.cargarImagen()
+        self.fondo.cargarImagen()
+        self.crearAnimaciones()
 
     def update(self, tiempo):
+        # Se simula la fase, se reproducen sus sonidos y efectos y, si un jugador ha sido alcanzado, se termina
+        self.simular(tiempo)
+        self.presentarEfectos()
+        if self.terminada:
+            self.terminar()
+
+    def terminar(self):
+        GestorSonido().reproducir('impacto')
+        # Se le dice al director que salga de esta escena y ejecute la siguiente en la pila
+        self.director.salirEscena()
+
+    def simular(self, tiempo):
         """
         Actualiza el estado de la fase, incluyendo todos los elementos del juego.
         
@@ -125,53 +220,152 @@ class Fase(Escena):
         4. Actualizar la cámara y el scroll
         5. Actualizar elementos visuales (fondo, decorado)
         
+        Si un jugador es alcanzado (por un enemigo o por un proyectil) no se sale de la escena,
+        solo se pone terminada a True: el que simula decide cuando salir (ver update y FaseRed).
+        Del mismo modo, los sonidos y el humo de este paso no se reproducen ni se crean aqui,
+        sino en presentarEfectos, para que repetir el paso (rollback, repeticiones) no los duplique.
+
         Args:
             tiempo (int): Milisegundos transcurridos desde la última actualización.
                          Se usa para calcular el movimiento correcto de los elementos.
-            
-        Returns:
-            bool: True si se debe terminar el juego (por ejemplo, por colisión jugador-enemigo),
-                 False si el juego debe continuar.
         """
-        # Actualización de la IA de los enemigos
-        for enemigo in iter(self.grupoEnemigos):
-            if self.camara.inCamera(enemigo):
-                enemigo.mover_cpu(self.grupoJugadores)  # Si está en cámara, persigue al jugador
-            else:
-                enemigo.mover_cpu()  # Si está fuera de cámara, es decir no hacer nada QUIETO
+        self.sonidos = []
+        # Se construye una sola vez por frame el indice de jugadores que comparten todos los enemigos
+        self.indiceJugadores.actualizar(self.grupoJugadores)
 
-        # Actualización de sprites dinámicos (personajes, proyectiles, etc.)
-        self.grupoSpritesDinamicos.update(self.grupoPlataformas, tiempo)
-
-        # Comprobación de colisiones entre jugadores y enemigos
-        if pygame.sprite.groupcollide(self.grupoJugadores, self.grupoEnemigos, False, False) != {}:
-            # Se le dice al director que salga de esta escena y ejecute la siguiente en la pila
-            self.director.salirEscena()
+        # Actualización de la IA de los enemigos
+        with self.seccion("ia"):
+            enCamara = []
+            for enemigo in iter(self.grupoEnemigos):
+                if self.camara.inCamera(enemigo):
+                    enCamara.append(enemigo)
+                else:
+                    enemigo.mover_cpu()  # Si está fuera de cámara, es decir no hacer nada QUIETO
+            # Los que están en cámara persiguen (y disparan) al jugador más cercano, que se busca
+            #  para todos ellos con una sola consulta al indice
+            for enemigo, jugador in zip(enCamara, self.indiceJugadores.masCercanos(enCamara)):
+                if enemigo.mover_cpu(jugador, self.proyectiles):
+                    self.sonidos.append('disparo')
+
+        with self.seccion("fisica"):
+            # Actualización de sprites dinámicos (personajes, proyectiles, etc.)
+            self.grupoSpritesDinamicos.update(self.grupoPlataformas, tiempo)
+
+            # Movimiento de todos los proyectiles de una vez, y colisiones de los mismos con jugadores y plataformas
+            #  (los puntos en los que han chocado quedan en self.proyectiles.impactos, ver presentarEfectos)
+            jugadoresAlcanzados = self.proyectiles.update(tiempo, self.grupoJugadores)
+
+        # Comprobación de colisiones entre jugadores y enemigos (o sus proyectiles)
+        with self.seccion("colisiones"):
+            if jugadoresAlcanzados or pygame.sprite.groupcollide(self.grupoJugadores, self.grupoEnemigos, False, False) != {}:
+                self.terminada = True
 
           # Actualización de la cámara y scroll
-        if self.camara.update(self.grupoJugadores):
-            # Si la cámara se movió, actualizar posiciones de sprites y decorado
-            self.camara.actualizar_sprites(self.grupoSprites)
-            self.decorado.update(self.camara.obtener_posicion()[0])
+        with self.seccion("camara"):
+            # La cámara sigue al punto medio entre los jugadores
+            if self.camara.update(self.centroJugadores()):
+                # Si la cámara se movió, actualizar posiciones de sprites y decorado
+                self.camara.actualizar_sprites(self.grupoSprites)
+                self.decorado.update(self.camara.obtener_posicion()[0])
 
         # Actualización de elementos visuales
         self.fondo.update(tiempo)  # Actualiza posición del sol y color del cielo
 
+    def presentarEfectos(self):
+        """
+        Reproduce los sonidos y crea el humo del ultimo paso simulado. Se llama una sola vez
+        por paso, despues de simularlo por primera vez (ni al repetirlo ni al validar una repeticion).
+        """
+        for sonido in self.sonidos:
+            GestorSonido().reproducir(sonido)
+        self.sonidos = []
+        # Donde han chocado los proyectiles (con una plataforma o con un jugador), sale humo
+        for (x, y) in self.proyectiles.impactos:
+            self.crearHumo((x, y))
+        self.liberarHumos()
+
+    def crearHumo(self, posicion):
+        # Coge un humo de la reserva y lo empieza centrado en la posicion (global);
+        #  si ya se estan viendo todos, este impacto no tiene humo
+        humo = self.reservaHumos.adquirir((posicion[0] - TAMANO_HUMO / 2, posicion[1] - TAMANO_HUMO / 2))
+        if humo is not None:
+            self.efectos.add(humo)
+
+    def liberarHumos(self):
+        # Los humos que ya han terminado se devuelven a la reserva
+        for humo in [humo for humo in self.reservaHumos if humo.isFinished()]:
+            self.reservaHumos.liberar(humo)
+            self.efectos.remove(humo)
+
         
-    def draw(self):
+    def centroJugadores(self):
+        # Punto medio (en coordenadas globales) de los rectangulos de los jugadores
+        jugadores = self.grupoJugadores.sprites()
+        x = sum(jugador.posicion_global[0] + jugador.rect.width / 2 for jugador in jugadores) / len(jugadores)
+        y = sum(jugador.posicion_global[1] - jugador.rect.height / 2 for jugador in jugadores) / len(jugadores)
+        return (x, y)
+
+    def draw(self, pantalla):
         """Dibuja todos los elementos de la fase en la pantalla"""
         # Ponemos primero el fondo
-        self.fondo.draw(self.director.pantalla)
+        self.fondo.draw(pantalla)
         # Despues, las animaciones que haya detras
-        for animacion in self.animacionesDetras:
-            animacion.draw(self.director.pantalla)
+        self.animacionesDetras.draw(pantalla)
         # Después el decorado
-        self.decorado.draw(self.director.pantalla)
+        self.decorado.draw(pantalla)
         # Luego los Sprites
-        self.grupoSprites.draw(self.director.pantalla)
+        self.grupoSprites.draw(pantalla)
+        # El humo de los impactos, que se mueve con el decorado
+        self.efectos.draw(pantalla, self.camara.obtener_posicion())
+        # Los proyectiles, todos de una vez
+        self.proyectiles.draw(pantalla, self.camara.obtener_posicion())
         # Y por ultimo, dibujamos las animaciones por encima del decorado
-        for animacion in self.animacionesDelante:
-            animacion.draw(self.director.pantalla)
+        self.animacionesDelante.draw(pantalla)
+
+
+    def simularPaso(self, movimientos, tiempo):
+        """Aplica un movimiento a cada jugador y actualiza la fase (juego en red y repeticiones)"""
+        Personaje.mover(self.jugador1, movimientos[0])
+        Personaje.mover(self.jugador2, movimientos[1])
+        Fase.simular(self, tiempo)
+
+    def empaquetarEstado(self):
+        """
+        Estado de la partida en binario: el de cada entidad, en orden, despues el de los proyectiles,
+        el de la camara (que decide que enemigos se mueven) y por ultimo si la partida ha terminado
+        """
+        return b''.join([entidad.empaquetarEstado() for entidad in self.entidades] +
+                        [self.proyectiles.empaquetarEstado(), self.camara.empaquetarEstado(),
+                         FORMATO_TERMINADA.pack(self.terminada)])
+
+    def desempaquetarEstado(self, datos):
+        """Deja la partida en el estado guardado con empaquetarEstado"""
+        desplazamiento = 0
+        for entidad in self.entidades:
+            desplazamiento = entidad.desempaquetarEstado(datos, desplazamiento)
+        desplazamiento = self.proyectiles.desempaquetarEstado(datos, desplazamiento)
+        desplazamiento = self.camara.desempaquetarEstado(datos, desplazamiento)
+        (self.terminada,) = FORMATO_TERMINADA.unpack_from(datos, desplazamiento)
+        # Las posiciones en pantalla de los sprites y del decorado dependen de la camara
+        self.camara.actualizar_sprites(self.grupoSprites)
+        self.decorado.update(self.camara.obtener_posicion()[0])
+
+    @staticmethod
+    def EstadoTerminado(datos):
+        """Si en un estado (o en una instantanea, que lo lleva al final) la partida ha terminado, sin cargarlo"""
+        return FORMATO_TERMINADA.unpack_from(datos, len(datos) - FORMATO_TERMINADA.size)[0]
+
+    def pulsarTecla(self, evento):
+        # Guardado y carga rapida de la partida, con una instantanea (ver instantaneas.py)
+        if evento.key == K_F5:
+            with open(config.FICHERO_PARTIDA_RAPIDA, 'wb') as archivo:
+                archivo.write(instantaneas.guardar(self))
+        elif evento.key == K_F9:
+            try:
+                with open(config.FICHERO_PARTIDA_RAPIDA, 'rb') as archivo:
+                    instantaneas.cargar(self, archivo.read())
+            except (OSError, instantaneas.ErrorInstantanea) as e:
+                print(f"No se puede cargar la partida: {e}")
 
 
     def eventos(self, lista_eventos):
@@ -184,11 +378,8 @@ class Fase(Escena):
         Returns:
             bool: True si se debe salir del programa, False en caso contrario
         """
-        # Miramos a ver si hay algun evento de salir del programa
-        for evento in lista_eventos:
-            # Si se sale del programa
-            if evento.type == pygame.QUIT:
-                self.director.salirPrograma()
+        # Miramos a ver si hay algun evento de salir del programa (con la tabla de manejadores)
+        super().eventos(lista_eventos)
 
         # Indicamos la acción a realizar segun la tecla pulsada para cada jugador
         teclasPulsadas = pygame.key.get_pressed()
@@ -202,7 +393,7 @@ class Fase(Escena):
 
 #class Plataforma(pygame.sprite.Sprite):
 class Plataforma(MiSprite):
-    __slots__ = ("__dict__")
+    __slots__ = ()
     # __slots__ vacío se define para:
     # - Mantener la optimización de memoria de la clase base (MiSprite)
     # - Evitar la creación de __dict__ en la subclase
@@ -224,13 +415,20 @@ class Plataforma(MiSprite):
 
 class Cielo:
     def __init__(self):
-        self.sol = GestorRecursos.CargarImagen('sol.png', -1)
-        self.sol = pygame.transform.scale(self.sol, (300, 200))
+        self.cargarImagen()
         self.rect = self.sol.get_rect()
         self.colorCielo = (100, 200, 255) # Color del cielo inicial
         self.posicionx = 0 # El lado izquierdo de la subimagen que se esta visualizando
         self.update(0)
 
+    def cargarImagen(self):
+        self.sol = GestorRecursos.CargarImagen('sol.png', -1)
+        self.sol = pygame.transform.scale(self.sol, (300, 200))
+
+    def liberar(self):
+        # Se libera el sol escalado (se vuelve a crear con cargarImagen)
+        self.sol = None
+
     def update(self, tiempo):
         self.posicionx += VELOCIDAD_SOL * tiempo
         if (self.posicionx - self.rect.width >= config.ANCHO_PANTALLA):
@@ -257,8 +455,7 @@ class Cielo:
 class Decorado:
     def __init__(self):
         # Cargamos la imagen del decorado
-        self.imagen = GestorRecursos.CargarImagen('decorado.png', -1)
-        self.imagen = pygame.transform.scale(self.imagen, (1200, 300))
+        self.cargarImagen()
 
         self.rect = self.imagen.get_rect()
         self.rect.bottom = config.ALTO_PANTALLA
@@ -267,6 +464,14 @@ class Decorado:
         self.rectSubimagen = pygame.Rect(0, 0, config.ANCHO_PANTALLA, config.ALTO_PANTALLA)
         self.rectSubimagen.left = 0 # El scroll horizontal empieza en la posicion 0 por defecto
 
+    def cargarImagen(self):
+        self.imagen = GestorRecursos.CargarImagen('decorado.png', -1)
+        self.imagen = pygame.transform.scale(self.imagen, (1200, 300))
+
+    def liberar(self):
+        # Se libera la imagen escalada (se vuelve a crear con cargarImagen)
+        self.imagen = None
+
     def update(self, scrollx):
         self.rectSubimagen.left = scrollx
 
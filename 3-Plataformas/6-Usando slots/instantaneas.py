@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+
+import struct
+import time
+import zlib
+from array import array
+from collections import deque
+
+# Formato de las instantaneas: una cabecera y despues el estado de la fase (Fase.empaquetarEstado),
+#  que es el de cada entidad en orden (con el FORMATO_ESTADO de su clase), el de los proyectiles,
+#  el de la camara y si la partida ha terminado
+MAGIA = b'PLAT'
+# Version 2: se añade la camara y el final de la partida
+VERSION_INSTANTANEA = 2
+# Cabecera: magia, version, paso, numero de entidades, longitud y CRC32 del estado
+CABECERA = struct.Struct('<4sHIHII')
+
+# Archivo de las repeticiones: magia, version, milisegundos de cada paso, numero de pasos
+#  y longitud de la instantanea inicial; despues la instantanea inicial, los movimientos
+#  de los dos jugadores en cada paso y el CRC32 del estado despues de cada paso
+MAGIA_REPETICION = b'PREP'
+CABECERA_REPETICION = struct.Struct('<4sHdII')
+
+
+class ErrorInstantanea(ValueError):
+    """La instantanea no es valida para esta version del juego o para esta fase"""
+    pass
+
+
+def guardar(fase, paso=0):
+    """Devuelve la instantanea del estado actual de la fase"""
+    estado = fase.empaquetarEstado()
+    return CABECERA.pack(MAGIA, VERSION_INSTANTANEA, paso, len(fase.entidades), len(estado), zlib.crc32(estado)) + estado
+
+
+def leerPaso(datos):
+    """Paso en el que se tomo una instantanea, sin restaurarla"""
+    return CABECERA.unpack_from(datos)[2]
+
+
+def cargar(fase, datos):
+    """
+    Deja la fase en el estado de la instantanea y devuelve el paso en el que se tomo.
+
+    Antes de tocar la fase se comprueba la cabecera, asi que si la instantanea no vale
+    (es de otra version, de otra fase o esta corrupta) se lanza ErrorInstantanea sin cambiar nada.
+    """
+    if len(datos) < CABECERA.size:
+        raise ErrorInstantanea("La instantanea esta incompleta")
+    magia, version, paso, numEntidades, longitud, crc = CABECERA.unpack_from(datos)
+    if magia != MAGIA:
+        raise ErrorInstantanea("No es una instantanea")
+    if version != VERSION_INSTANTANEA:
+        # Si cambia el formato, aqui se convertirian las instantaneas de versiones anteriores
+        raise ErrorInstantanea(f"Version de instantanea {version} no soportada (se esperaba {VERSION_INSTANTANEA})")
+    estado = memoryview(datos)[CABECERA.size:]
+    if numEntidades != len(fase.entidades) or longitud != len(estado) or zlib.crc32(estado) != crc:
+        raise ErrorInstantanea("La instantanea no corresponde a esta fase o esta corrupta")
+    fase.desempaquetarEstado(estado)
+    return paso
+
+# -------------------------------------------------
+# Clase HistorialInstantaneas
+
+class HistorialInstantaneas:
+    """
+    Las instantaneas de los ultimos pasos, para volver a uno de ellos (rollback).
+
+    Como los pasos se guardan en orden, se usa una cola de capacidad fija: al guardar
+    una nueva, la mas antigua se descarta sola.
+    """
+    __slots__ = ("instantaneas",)
+
+    def __init__(self, capacidad=64):
+        self.instantaneas = deque(maxlen=capacidad)
+
+    def guardar(self, paso, datos):
+        # Si se vuelve a un paso anterior, las instantaneas posteriores ya no valen
+        while self.instantaneas and self.instantaneas[-1][0] >= paso:
+            self.instantaneas.pop()
+        self.instantaneas.append((paso, datos))
+
+    def obtener(self, paso):
+        """Devuelve la instantanea de ese paso, o None si no se tiene"""
+        for pasoGuardado, datos in reversed(self.instantaneas):
+            if pasoGuardado == paso:
+                return datos
+            if pasoGuardado < paso:
+                break
+        return None
+
+    def descartarHasta(self, paso):
+        """Descarta las instantaneas de los pasos anteriores o iguales a paso (ya confirmados)"""
+        while self.instantaneas and self.instantaneas[0][0] <= paso:
+            self.instantaneas.popleft()
+
+    def __len__(self):
+        return len(self.instantaneas)
+
+# -------------------------------------------------
+# Clase Repeticion
+
+class Repeticion:
+    """
+    Grabacion de una partida para comprobar despues que se reproduce igual.
+
+    Se guarda la instantanea inicial, los movimientos de los jugadores en cada paso y el CRC32
+    del estado despues de cada paso. Como la fase se simula con pasos fijos, al repetir esos
+    movimientos desde la instantanea inicial se tiene que llegar a los mismos estados: validar()
+    devuelve el primer paso en el que no es asi (por ejemplo, despues de cambiar la fisica).
+    """
+
+    def __init__(self, inicial, tiempoPaso):
+        self.inicial = inicial
+        self.tiempoPaso = tiempoPaso
+        self.movimientos = bytearray()
+        self.crcs = array('I')
+
+    @staticmethod
+    def Empezar(fase, tiempoPaso):
+        return Repeticion(guardar(fase), tiempoPaso)
+
+    def anotar(self, fase, movimientos):
+        """Anota un paso: los movimientos que se aplicaron y el estado en el que quedo la fase"""
+        self.movimientos.extend(movimientos)
+        self.crcs.append(zlib.crc32(fase.empaquetarEstado()))
+
+    def __len__(self):
+        return len(self.crcs)
+
+    def validar(self, fase):
+        """Repite la partida en la fase; devuelve el primer paso distinto, o None si es igual"""
+        cargar(fase, self.inicial)
+        for paso in range(len(self.crcs)):
+            fase.simularPaso(self.movimientos[2 * paso:2 * paso + 2], self.tiempoPaso)
+            if zlib.crc32(fase.empaquetarEstado()) != self.crcs[paso]:
+                return paso
+        return None
+
+    def guardarArchivo(self, ruta):
+        with open(ruta, 'wb') as archivo:
+            archivo.write(CABECERA_REPETICION.pack(MAGIA_REPETICION, VERSION_INSTANTANEA, self.tiempoPaso,
+                                                   len(self.crcs), len(self.inicial)))
+            archivo.write(self.inicial)
+            archivo.write(self.movimientos)
+            archivo.write(self.crcs.tobytes())
+
+    @staticmethod
+    def CargarArchivo(ruta):
+        with open(ruta, 'rb') as archivo:
+            datos = archivo.read()
+        if len(datos) < CABECERA_REPETICION.size:
+            raise ErrorInstantanea("La repeticion esta incompleta")
+        magia, version, tiempoPaso, numPasos, longitudInicial = CABECERA_REPETICION.unpack_from(datos)
+        if magia != MAGIA_REPETICION or version != VERSION_INSTANTANEA:
+            raise ErrorInstantanea(f"No es una repeticion de la version {VERSION_INSTANTANEA}")
+        inicio = CABECERA_REPETICION.size
+        repeticion = Repeticion(datos[inicio:inicio + longitudInicial], tiempoPaso)
+        inicio += longitudInicial
+        repeticion.movimientos = bytearray(datos[inicio:inicio + 2 * numPasos])
+        inicio += 2 * numPasos
+        repeticion.crcs.frombytes(datos[inicio:inicio + 4 * numPasos])
+        return repeticion
+
+# -------------------------------------------------
+# Medida del tamaño y del tiempo de las instantaneas
+
+def medir(fase, repeticiones=10000):
+    """Devuelve las lineas de un informe con el tamaño y los tiempos de codificar y decodificar cada entidad"""
+    lineas = []
+    reloj = time.perf_counter
+    for entidad in list(fase.entidades) + [fase.proyectiles, fase.camara]:
+        datos = entidad.empaquetarEstado()
+        inicio = reloj()
+        for _ in range(repeticiones):
+            entidad.empaquetarEstado()
+        codificar = (reloj() - inicio) / repeticiones
+        inicio = reloj()
+        for _ in range(repeticiones):
+            entidad.desempaquetarEstado(datos)
+        decodificar = (reloj() - inicio) / repeticiones
+        lineas.append(f"{type(entidad).__name__:>18}: {len(datos):5d} bytes, "
+                      f"codificar {codificar * 1e6:7.2f} us, decodificar {decodificar * 1e6:7.2f} us")
+
+    datos = guardar(fase)
+    inicio = reloj()
+    for _ in range(repeticiones):
+        guardar(fase)
+    codificar = (reloj() - inicio) / repeticiones
+    inicio = reloj()
+    for _ in range(repeticiones):
+        cargar(fase, datos)
+    decodificar = (reloj() - inicio) / repeticiones
+    lineas.append(f"{'Instantanea':>18}: {len(datos):5d} bytes, "
+                  f"codificar {codificar * 1e6:7.2f} us, decodificar {decodificar * 1e6:7.2f} us")
+    return lineas
+
+
+if __name__ == '__main__':
+    import pygame
+    from configuracion import Configuracion
+    from director import Director
+    from fase import Fase
+    from personajes import QUIETO, DERECHA, ARRIBA
+    pygame.init()
+    director = Director()
+    fase = Fase(director)
+    fase.completarConstruccion()
+    for linea in medir(fase):
+        print(linea)
+
+    # Se graba una partida corta (el jugador 1 avanza saltando) y se comprueba que se repite igual
+    tiempoPaso = Configuracion().PASO_RED
+    repeticion = Repeticion.Empezar(fase, tiempoPaso)
+    for paso in range(600):
+        movimientos = bytes((ARRIBA if paso % 50 < 5 else DERECHA, QUIETO))
+        fase.simularPaso(movimientos, tiempoPaso)
+        repeticion.anotar(fase, movimientos)
+    inicio = time.perf_counter()
+    distinto = repeticion.validar(fase)
+    duracion = time.perf_counter() - inicio
+    resultado = "igual" if distinto is None else f"distinta desde el paso {distinto}"
+    print(f"Repeticion de {len(repeticion)} pasos: {resultado} ({duracion * 1e3:.1f} ms)")
+    pygame.quit()
@@ -2,10 +2,12 @@
 # -*- coding: utf-8 -*-
 
 # Importar modulos
+import sys
 import pygame
 import director
 from director import *
 from menu import Menu
+from red import FaseRed
 
 if __name__ == '__main__':
 
@@ -14,10 +16,16 @@ if __name__ == '__main__':
     # Creamos el director
     director = Director()
     # Creamos la escena con la pantalla inicial
-    escena = Menu(director)
+    #  o, para jugar en red, directamente la fase:
+    #   python main.py anfitrion [puerto]
+    #   python main.py invitado host [puerto]
+    if len(sys.argv) > 1 and sys.argv[1] in ('anfitrion', 'invitado'):
+        escena = FaseRed.CrearDesdeArgumentos(director, sys.argv[1:])
+    else:
+        escena = Menu(director)
     # Le decimos al director que apile esta escena
     director.apilarEscena(escena)
     # Y ejecutamos el juego
-    director.ejecutar()
+    director.execute()
     # Cuando se termine la ejecución, finaliza la librería
     pygame.quit()
@@ -1,12 +1,13 @@
 # -*- encoding: utf-8 -*-
 
+import os
 import pygame
 from pygame.locals import *
 from enum import Enum, auto
 from escena import *
 from recursos import GestorRecursos
 from fase import Fase
-from animaciones import AnimacionFuego, AnimacionRayo, AnimacionHumo
+from animaciones import Animacion, AnimacionFuego, AnimacionRayo, AnimacionHumo, GrupoAnimaciones
 
 # -------------------------------------------------
 # Clase abstracta ElementoGUI
@@ -19,6 +20,8 @@ class ElementoGUI:
     def establecerPosicion(self, posicion):
         self.rect.left = posicion[0]
         self.rect.bottom = posicion[1]
+        # El panel tiene que volver a componer su fondo (y recolocar el elemento en su indice)
+        self.panel.elementoCambiado(self)
 
     def posicionEnElemento(self, posicion):
         posicionx, posiciony = posicion
@@ -65,8 +68,8 @@ class BotonSalir(Boton):
 
 class TextoGUI(ElementoGUI):
     def __init__(self, panel, fuente, color, texto, posicion):
-        # Se crea la imagen del texto
-        self.imagen = fuente.render(texto, True, color)
+        # Se crea la imagen del texto (la fuente es una tupla (nombre, tamaño) del gestor de recursos)
+        self.imagen = GestorRecursos.RenderizarTexto(fuente[0], fuente[1], texto, color)
         # Se llama al método de la clase padre con el rectángulo que ocupa el texto
         super().__init__(panel, self.imagen.get_rect())
         # Se coloca el rectangulo en su posicion
@@ -76,20 +79,53 @@ class TextoGUI(ElementoGUI):
 
 class TextoJugar(TextoGUI):
     def __init__(self, panel):
-        # La fuente la debería cargar el estor de recursos
-        fuente = pygame.font.SysFont('arial', 26);
-        super().__init__(panel, fuente, (0, 0, 0), 'Jugar', (610, 535))
+        # La fuente la carga (una sola vez) el gestor de recursos
+        super().__init__(panel, ('arial', 26), (0, 0, 0), 'Jugar', (610, 535))
     def accion(self):
         self.panel.menu.ejecutarJuego()
 
 class TextoSalir(TextoGUI):
     def __init__(self, panel):
-        # La fuente la debería cargar el estor de recursos
-        fuente = pygame.font.SysFont('arial', 26);
-        super().__init__(panel, fuente, (0, 0, 0), 'Salir', (610, 565))
+        # La fuente la carga (una sola vez) el gestor de recursos
+        super().__init__(panel, ('arial', 26), (0, 0, 0), 'Salir', (610, 565))
     def accion(self):
         self.panel.menu.salirPrograma()
 
+# -------------------------------------------------
+# Clase IndiceElementos
+
+# Tamaño (en pixeles) de las celdas del indice de elementos
+TAMANO_CELDA_GUI = 64
+
+class IndiceElementos:
+    """
+        Indice espacial de los elementos GUI de un panel, para saber que elemento hay
+        en una posicion del raton sin recorrerlos todos.
+
+        La pantalla se divide en celdas y cada celda guarda los elementos que la tocan,
+        en el orden en que se dibujan (los ultimos quedan por encima).
+    """
+    __slots__ = ("celdas",)
+
+    def __init__(self):
+        self.celdas = {}
+
+    def anadir(self, elemento):
+        # Se anade el elemento a todas las celdas que toca (incluidos los bordes derecho e inferior,
+        #  que posicionEnElemento considera dentro del elemento)
+        rect = elemento.rect
+        for celdax in range(rect.left // TAMANO_CELDA_GUI, rect.right // TAMANO_CELDA_GUI + 1):
+            for celday in range(rect.top // TAMANO_CELDA_GUI, rect.bottom // TAMANO_CELDA_GUI + 1):
+                self.celdas.setdefault((celdax, celday), []).append(elemento)
+
+    def elementoEn(self, posicion):
+        """Devuelve el elemento de mas arriba que esta en la posicion, o None si no hay ninguno"""
+        candidatos = self.celdas.get((posicion[0] // TAMANO_CELDA_GUI, posicion[1] // TAMANO_CELDA_GUI), ())
+        for elemento in reversed(candidatos):
+            if elemento.posicionEnElemento(posicion):
+                return elemento
+        return None
+
 # -------------------------------------------------
 # Clase PantallaGUI y las distintas pantallas
 
@@ -99,35 +135,93 @@ class PanelGUI:
     """	
     def __init__(self, menu, nombreImagen):
         self.menu = menu
+        # Capa estatica: el fondo con los elementos que no cambian ya dibujados encima,
+        #  que se compone una sola vez (ver componer) y se dibuja de un solo blit
+        self.capaEstatica = None
+        # Los elementos que se siguen dibujando cada frame (los que pueden quedar debajo de una animacion)
+        self.elementosDinamicos = []
         # Se carga la imagen de fondo
-        self.imagen = GestorRecursos.CargarImagen(nombreImagen)
-        self.imagen = pygame.transform.scale(self.imagen, (ANCHO_PANTALLA, ALTO_PANTALLA))
-        # Se tiene una lista de elementos GUI
+        self.nombreImagen = nombreImagen
+        self.cargarFondo()
+        # Se tiene una lista de elementos GUI (ver anadirElemento), y su indice para los clics
         self.elementosGUI = []
+        self.indiceElementos = IndiceElementos()
         self.elementoClic = None
-        # Se tiene una lista de animaciones
-        self.animaciones = []
-
-    def eventos(self, lista_eventos):
-        
-        for evento in lista_eventos:
-            if evento.type == MOUSEBUTTONDOWN:
-                elementos_raton = [elemento for elemento in self.elementosGUI if elemento.posicionEnElemento(evento.pos)]
-                self.elementoClic = elementos_raton[0]
-            if evento.type == MOUSEBUTTONUP:
-                elementos_raton = [elemento for elemento in self.elementosGUI if elemento.posicionEnElemento(evento.pos)]
-                if (elementos_raton[0] == self.elementoClic):
-                    elementos_raton[0].accion()
-                self.elementoClic = None  
+        # Se tiene un grupo de animaciones, que se dibujan todas a la vez
+        self.animaciones = GrupoAnimaciones()
+
+    def cargarFondo(self):
+        # La imagen de fondo, escalada al tamaño de la pantalla
+        self.imagen = GestorRecursos.CargarImagen(self.nombreImagen)
+        self.imagen = pygame.transform.scale(self.imagen, (ANCHO_PANTALLA, ALTO_PANTALLA))
+        self.invalidar()
+
+    def crearAnimaciones(self):
+        # Cada panel crea aqui sus animaciones
+        pass
+
+    def suspender(self):
+        # Se liberan el fondo escalado y las animaciones, que se vuelven a crear al reanudar
+        self.imagen = None
+        self.animaciones = GrupoAnimaciones()
+        self.invalidar()
+
+    def reanudar(self):
+        self.cargarFondo()
+        self.crearAnimaciones()
+        self.invalidar()
+
+    def anadirElemento(self, elemento):
+        # Los elementos se dibujan en el orden en que se anaden
+        self.elementosGUI.append(elemento)
+        self.indiceElementos.anadir(elemento)
+        self.invalidar()
+
+    def elementoCambiado(self, elemento):
+        # Si un elemento del panel cambia de posicion, se rehace el indice con su nueva posicion
+        if elemento in self.elementosGUI:
+            self.indiceElementos = IndiceElementos()
+            for elementoGUI in self.elementosGUI:
+                self.indiceElementos.anadir(elementoGUI)
+        self.invalidar()
+
+    def invalidar(self):
+        # La capa estatica se vuelve a componer la proxima vez que se dibuje el panel
+        self.capaEstatica = None
+
+    def componer(self):
+        # Se dibujan sobre una copia del fondo los elementos que no solapan con ninguna animacion;
+        #  los que si lo hacen se tienen que seguir dibujando encima de ellas en cada frame
+        self.capaEstatica = self.imagen.copy()
+        zonasAnimadas = self.animaciones.rectangulos()
+        self.elementosDinamicos = []
+        for elemento in self.elementosGUI:
+            if elemento.rect.collidelist(zonasAnimadas) == -1:
+                elemento.draw(self.capaEstatica)
+            else:
+                self.elementosDinamicos.append(elemento)
+
+    # El menu le pasa al panel actual los eventos del raton
+    def pulsarRaton(self, evento):
+        # Si no se pulsa sobre ningun elemento, es None
+        self.elementoClic = self.indiceElementos.elementoEn(evento.pos)
+
+    def soltarRaton(self, evento):
+        elemento = self.indiceElementos.elementoEn(evento.pos)
+        # Solo se ejecuta la accion si se suelta sobre el mismo elemento en el que se pulso
+        if elemento is not None and elemento is self.elementoClic:
+            elemento.accion()
+        self.elementoClic = None  
 
     def draw(self, pantalla):
-        # Dibujamos primero la imagen de fondo
-        pantalla.blit(self.imagen, self.imagen.get_rect())
+        # Dibujamos primero el fondo, con los elementos estaticos ya compuestos
+        if self.capaEstatica is None:
+            self.componer()
+        pantalla.blit(self.capaEstatica, (0, 0))
         # Después las animaciones
-        for animacion in self.animaciones:
-            animacion.draw(pantalla)
-        # Después los botones
-        for elemento in self.elementosGUI:
+        self.animaciones.draw(pantalla)
+        # Y los elementos que pueden estar encima de las animaciones
+        for elemento in self.elementosDinamicos:
             elemento.draw(pantalla)
 
 class PanelInicialGUI(PanelGUI):
@@ -136,47 +230,43 @@ class PanelInicialGUI(PanelGUI):
         # Creamos los botones y los metemos en la lista
         botonJugar = BotonJugar(self)
         botonSalir = BotonSalir(self)
-        self.elementosGUI.append(botonJugar)
-        self.elementosGUI.append(botonSalir)
+        self.anadirElemento(botonJugar)
+        self.anadirElemento(botonSalir)
         # Creamos el texto y lo metemos en la lista
         textoJugar = TextoJugar(self)
         textoSalir = TextoSalir(self)
-        self.elementosGUI.append(textoJugar)
-        self.elementosGUI.append(textoSalir)
-
-        # La animacion del fuego
-        animacionFuego = AnimacionFuego()
-        # Aumentamos un poco el tamaño de la animacion
-        animacionFuego.scale((200,200))
+        self.anadirElemento(textoJugar)
+        self.anadirElemento(textoSalir)
+        # Y las animaciones
+        self.crearAnimaciones()
+
+    def crearAnimaciones(self):
+        # La animacion del fuego, un poco mas grande
+        animacionFuego = AnimacionFuego(transformaciones=(('scale', (200,200)),))
         # La situamos en su posicion
-        animacionFuego.posicionx = 70
-        animacionFuego.posiciony = 100
+        animacionFuego.establecerPosicion((70, 100))
         # Iniciamos la animacion
         animacionFuego.play()
-        # Y la introducimos en la lista
-        self.animaciones.append(animacionFuego)
+        # Y la introducimos en el grupo
+        self.animaciones.add(animacionFuego)
 
         # La animacion del humo
         animacionHumo = AnimacionHumo()
         # La situamos en su posicion
-        animacionHumo.posicionx = 695
-        animacionHumo.posiciony = 420
+        animacionHumo.establecerPosicion((695, 420))
         # Iniciamos la animacion
         animacionHumo.play()
-        # Y la introducimos en la lista
-        self.animaciones.append(animacionHumo)
+        # Y la introducimos en el grupo
+        self.animaciones.add(animacionHumo)
 
-        # La animacion del rayo
-        animacionRayo = AnimacionRayo()
-        # Rotamos un poco la animacion
-        animacionRayo.rotate(30)
+        # La animacion del rayo, rotada un poco
+        animacionRayo = AnimacionRayo(transformaciones=(('rotate', 30),))
         # La situamos en su posicion
-        animacionRayo.posicionx = 512
-        animacionRayo.posiciony = 130
+        animacionRayo.establecerPosicion((512, 130))
         # Iniciamos la animacion
         animacionRayo.play()
-        # Y la introducimos en la lista
-        self.animaciones.append(animacionRayo)
+        # Y la introducimos en el grupo
+        self.animaciones.add(animacionRayo)
 
 # -------------------------------------------------
 # Clase Menú
@@ -193,6 +283,9 @@ class Menu(Escena):
         Clase que representa un menu, que es una escena estática que contiene un panel
         o conjunto de paneles como podrían ser los paneles de opciones, etc.
     """
+    # Musica de fondo del menu
+    musica = os.path.join("musica", "menu.wav")
+
     def __init__(self, director):
         super().__init__(director);
         # Creamos la lista de paneles
@@ -204,6 +297,11 @@ class Menu(Escena):
         self.panelActual = PanelesMenu.PANEL_INICIAL
         # Mostramos el panel inicial
         self.mostrarPanelInicial()
+        # Los eventos que trata el menu: el resto no llegan a la cola de eventos
+        self.manejar(pygame.QUIT, lambda evento: self.salirPrograma())
+        self.manejar(KEYDOWN, self.pulsarTecla)
+        self.manejar(MOUSEBUTTONDOWN, lambda evento: self.listaPaneles[self.panelActual].pulsarRaton(evento))
+        self.manejar(MOUSEBUTTONUP, lambda evento: self.listaPaneles[self.panelActual].soltarRaton(evento))
 
     def update(self, *args):
         """ 
@@ -212,19 +310,27 @@ class Menu(Escena):
         """	
         return
 
-    def eventos(self, lista_eventos):
-        # Se mira si se quiere salir de esta escena
-        for evento in lista_eventos:
-            # Si se quiere salir, se le indica al director
-            if (evento.type == KEYDOWN and evento.key == K_ESCAPE) or (evento.type == pygame.QUIT):
-                self.salirPrograma()
-
-        # Se pasa la lista de eventos a la pantalla actual
-        self.listaPaneles[self.panelActual].eventos(lista_eventos)
+    def pulsarTecla(self, evento):
+        # Si se quiere salir, se le indica al director
+        if evento.key == K_ESCAPE:
+            self.salirPrograma()
 
     def draw(self, pantalla):
         self.listaPaneles[self.panelActual].draw(pantalla)
 
+    def suspender(self):
+        # Los paneles liberan sus fondos y animaciones mientras el menu esta enterrado en la pila,
+        #  y se quitan de la cache los frames transformados de esas animaciones (solo los del menu)
+        claves = set()
+        for panel in self.listaPaneles.values():
+            claves |= panel.animaciones.clavesTransformaciones()
+            panel.suspender()
+        Animacion.LiberarCacheTransformaciones(claves)
+
+    def reanudar(self):
+        for panel in self.listaPaneles.values():
+            panel.reanudar()
+
     #--------------------------------------
     # Metodos propios del menu
 
@@ -234,8 +340,11 @@ class Menu(Escena):
         self.director.salirPrograma()
 
     def ejecutarJuego(self):
+        # La fase se prepara en segundo plano mientras se sigue mostrando el menu,
+        #  y el director la apila encima de el cuando esta lista: mientras se juega el menu
+        #  queda suspendido, y se reanuda cuando termina la partida
         fase = Fase(self.director)
-        self.director.cambiarEscena(fase)
+        self.director.prepararEscena(fase, apilar=True)
 
     def mostrarPanelInicial(self):
         self.panelActual = PanelesMenu.PANEL_INICIAL
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import json
+import time
+from collections import deque
+
+# Limites (en milisegundos) de las clases de los histogramas; la ultima clase recoge todo lo que pase de 33ms
+LIMITES_HISTOGRAMA = (0.25, 0.5, 1, 2, 4, 8, 16, 33)
+# Numero de medidas que se guardan de cada seccion (unos 10 segundos a 60 fps)
+TAMANO_VENTANA = 600
+
+# -------------------------------------------------
+# Clase HistogramaMovil
+
+class HistogramaMovil:
+    """
+    Histograma de las ultimas medidas (en milisegundos) de una seccion.
+
+    Solo se guardan las ultimas TAMANO_VENTANA medidas: al entrar una nueva, la mas antigua
+    sale del histograma, asi que refleja lo que esta pasando ahora y no toda la partida.
+    """
+    __slots__ = ("medidas", "clases", "total", "numeroMedidas")
+
+    def __init__(self, tamano=TAMANO_VENTANA):
+        self.medidas = deque(maxlen=tamano)
+        self.clases = [0] * (len(LIMITES_HISTOGRAMA) + 1)
+        # Acumulados de todas las medidas, no solo de la ventana
+        self.total = 0.0
+        self.numeroMedidas = 0
+
+    @staticmethod
+    def _clase(ms):
+        for i, limite in enumerate(LIMITES_HISTOGRAMA):
+            if ms < limite:
+                return i
+        return len(LIMITES_HISTOGRAMA)
+
+    def anadir(self, ms):
+        if len(self.medidas) == self.medidas.maxlen:
+            self.clases[HistogramaMovil._clase(self.medidas[0])] -= 1
+        self.medidas.append(ms)
+        self.clases[HistogramaMovil._clase(ms)] += 1
+        self.total += ms
+        self.numeroMedidas += 1
+
+    def percentil(self, p):
+        if not self.medidas:
+            return 0.0
+        ordenadas = sorted(self.medidas)
+        return ordenadas[min(len(ordenadas) - 1, int(p / 100.0 * len(ordenadas)))]
+
+    def resumen(self):
+        """Devuelve un diccionario con las estadisticas de la ventana"""
+        return {
+            'medidas': self.numeroMedidas,
+            'mediaTotal': self.total / self.numeroMedidas if self.numeroMedidas else 0.0,
+            'media': sum(self.medidas) / len(self.medidas) if self.medidas else 0.0,
+            'p50': self.percentil(50),
+            'p95': self.percentil(95),
+            'maximo': max(self.medidas) if self.medidas else 0.0,
+            'histograma': list(self.clases),
+        }
+
+# -------------------------------------------------
+# Clase Cronometro
+
+class Cronometro:
+    """Gestor de contexto que mide el tiempo de una seccion y lo anade a su histograma"""
+    __slots__ = ("histograma", "inicio")
+
+    def __init__(self, histograma):
+        self.histograma = histograma
+        self.inicio = 0.0
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.histograma.anadir((time.perf_counter() - self.inicio) * 1000.0)
+        return False
+
+# Cronometro que no mide nada, para cuando no se esta perfilando
+class _CronometroNulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+CRONOMETRO_NULO = _CronometroNulo()
+
+# -------------------------------------------------
+# Clase Perfilador
+
+class Perfilador:
+    """
+    Tiempos de las secciones de una escena (las fases eventos/update/draw y las que
+    declare la propia escena, como "ia" o "colisiones"), cada una con su histograma.
+
+    Los cronometros se crean una sola vez por seccion y se reutilizan en cada frame.
+    Si el perfilador no esta activo, seccion() devuelve un cronometro que no hace nada.
+    """
+
+    def __init__(self, nombre, activo=True):
+        self.nombre = nombre
+        self.activo = activo
+        self.histogramas = {}
+        self.cronometros = {}
+
+    def seccion(self, nombre):
+        if not self.activo:
+            return CRONOMETRO_NULO
+        cronometro = self.cronometros.get(nombre)
+        if cronometro is None:
+            self.histogramas[nombre] = HistogramaMovil()
+            cronometro = self.cronometros[nombre] = Cronometro(self.histogramas[nombre])
+        return cronometro
+
+    def resumen(self):
+        return {seccion: histograma.resumen() for seccion, histograma in self.histogramas.items()}
+
+    @staticmethod
+    def volcar(perfiladores, ruta):
+        """Guarda el resumen de varios perfiladores en un fichero JSON o CSV (segun la extension de la ruta)"""
+        if ruta.endswith('.json'):
+            with open(ruta, 'w') as fichero:
+                json.dump({perfilador.nombre: perfilador.resumen() for perfilador in perfiladores}, fichero, indent=2)
+            return
+        cabecera = ['escena', 'seccion', 'medidas', 'mediaTotal', 'media', 'p50', 'p95', 'maximo']
+        cabecera += ['<%gms' % limite for limite in LIMITES_HISTOGRAMA] + ['>=%gms' % LIMITES_HISTOGRAMA[-1]]
+        with open(ruta, 'w', newline='') as fichero:
+            escritor = csv.writer(fichero)
+            escritor.writerow(cabecera)
+            for perfilador in perfiladores:
+                for seccion, datos in perfilador.resumen().items():
+                    escritor.writerow([perfilador.nombre, seccion] + [datos[campo] for campo in cabecera[2:8]] + datos['histograma'])
@@ -2,10 +2,20 @@ import pygame
 import sys
 import os
 import math
+import struct
+from array import array
+from bisect import bisect_left
 from pygame.locals import *
 from configuracion import Configuracion
 from recursos import GestorRecursos
 
+# NumPy es opcional: si esta instalado, los proyectiles se mueven y se eliminan con operaciones
+#  sobre los arrays enteros (ver GestorProyectiles.update)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # Obtenemos la configuración (Singleton)
 config = Configuracion()
 
@@ -34,6 +44,12 @@ VELOCIDAD_SALTO_SNIPER = 0.27 # Pixeles por milisegundo
 RETARDO_ANIMACION_SNIPER = 5 # updates que durará cada imagen del personaje
                              # debería de ser un valor distinto para cada postura
 # El Sniper camina un poco más lento que el jugador, y salta menos
+RETARDO_DISPARO_SNIPER = 90 # updates que tiene que esperar el Sniper entre dos disparos
+
+VELOCIDAD_PROYECTIL = 0.4 # Pixeles por milisegundo
+DURACION_PROYECTIL = 3000 # Milisegundos que dura un proyectil antes de desaparecer
+MAXIMO_PROYECTILES = 256 # Proyectiles que puede haber a la vez en la fase
+TAMANO_CELDA_PROYECTILES = 64 # Tamaño de las celdas de la rejilla de colisiones de los proyectiles
 
 GRAVEDAD = 0.0003 # Píxeles / ms2
 
@@ -47,11 +63,15 @@ GRAVEDAD = 0.0003 # Píxeles / ms2
 # Clase MiSprite
 class MiSprite(pygame.sprite.Sprite):
     "Los Sprites que tendra este juego"
-    # Usamos __slots__ para optimizar el uso de memoria, ya que evita la creación automática de __dict__ para cada instancia,
-    # lo que es útil cuando se crean muchos objetos Sprite. Sin embargo, añadimos '__dict__' explícitamente para mantener
-    # compatibilidad total con pygame.sprite.Sprite, que puede requerir atributos dinámicos en tiempo de ejecución.
+    # Usamos __slots__ para que los atributos que se consultan cada frame se guarden en huecos fijos del objeto.
+    # No hace falta (ni se puede) añadir '__dict__': pygame.sprite.Sprite no define __slots__, asi que sus instancias
+    # ya tienen __dict__ para los atributos dinámicos que necesita PyGame (y poner '__dict__' daria un TypeError).
     # No incluimos 'rect' en los slots porque es gestionado internamente por Sprite y puede ser reasignado por PyGame.
-    __slots__ = ("posicion_global", "velocidad", "posicion_pantalla", "__dict__")
+    __slots__ = ("posicion_global", "velocidad", "posicion_pantalla")
+    # Formato binario del estado que cambia durante la partida (ver empaquetarEstado):
+    #  posicion global y velocidad
+    FORMATO_ESTADO = struct.Struct('<4d')
+
     def __init__(self):
         super().__init__()
         self.posicion_global = (0, 0)
@@ -74,11 +94,34 @@ class MiSprite(pygame.sprite.Sprite):
         (incrementox, incrementoy) = incremento
         self.establecerPosicion((posx+incrementox, posy+incrementoy))
 
+    def reiniciar(self, posicion=(0, 0), velocidad=(0, 0)):
+        # Deja el sprite como recien creado, para poder reutilizarlo desde un PoolObjetos
+        self.velocidad = velocidad
+        self.establecerPosicion(posicion)
+
     def update(self, tiempo):
         incrementox = self.velocidad[0]*tiempo
         incrementoy = self.velocidad[1]*tiempo
         self.incrementarPosicion((incrementox, incrementoy))
 
+    # Estado del sprite en binario, para enviarlo por la red o guardarlo
+    #  Cada subclase que añade estado redefine FORMATO_ESTADO, valoresEstado y restaurarValores
+    def valoresEstado(self):
+        return (self.posicion_global[0], self.posicion_global[1], self.velocidad[0], self.velocidad[1])
+
+    def restaurarValores(self, valores):
+        self.velocidad = (valores[2], valores[3])
+        self.establecerPosicion((valores[0], valores[1]))
+
+    def empaquetarEstado(self):
+        return self.FORMATO_ESTADO.pack(*self.valoresEstado())
+
+    def desempaquetarEstado(self, datos, desplazamiento=0):
+        """Restaura el estado desde los datos binarios y devuelve el desplazamiento siguiente"""
+        formato = self.FORMATO_ESTADO
+        self.restaurarValores(formato.unpack_from(datos, desplazamiento))
+        return desplazamiento + formato.size
+
 
 
 
@@ -91,6 +134,8 @@ class Personaje(MiSprite):
     # De nuevo, usamos __slots__ para optimizar memoria, no se añade '__dict__' porque ya está en la clase base
     # dinámicos requeridos por PyGame (por ejemplo, 'image'). No incluimos 'image' en los slots por la misma razón.
     __slots__ = ("hoja", "movimiento", "mirando", "numPostura", "numImagenPostura", "coordenadasHoja", "retardoMovimiento", "velocidadCarrera", "velocidadSalto", "retardoAnimacion")
+    # Ademas de la posicion y la velocidad: movimiento, lado al que mira, postura, imagen de la postura y retardo
+    FORMATO_ESTADO = struct.Struct('<4d5b')
 
     def __init__(self, archivoImagen, archivoCoordenadas, numImagenes, velocidadCarrera, velocidadSalto, retardoAnimacion):
         """
@@ -173,14 +218,26 @@ class Personaje(MiSprite):
                 self.numImagenPostura = 0;
             if self.numImagenPostura < 0:
                 self.numImagenPostura = len(self.coordenadasHoja[self.numPostura])-1
+            self.actualizarImagen()
+
+    def actualizarImagen(self):
+        # Si esta mirando a la izquiera, cogemos la porcion de la hoja
+        if self.mirando == IZQUIERDA:
             self.image = self.hoja.subsurface(self.coordenadasHoja[self.numPostura][self.numImagenPostura])
+        #  Si no, si mira a la derecha, invertimos esa imagen
+        elif self.mirando == DERECHA:
+            self.image = pygame.transform.flip(self.hoja.subsurface(self.coordenadasHoja[self.numPostura][self.numImagenPostura]), 1, 0)
+        else:
+            self.image = self.hoja.subsurface(self.coordenadasHoja[self.numPostura][self.numImagenPostura])
+
+    def valoresEstado(self):
+        return MiSprite.valoresEstado(self) + (self.movimiento, self.mirando, self.numPostura, self.numImagenPostura, self.retardoMovimiento)
 
-            # Si esta mirando a la izquiera, cogemos la porcion de la hoja
-            if self.mirando == IZQUIERDA:
-                self.image = self.hoja.subsurface(self.coordenadasHoja[self.numPostura][self.numImagenPostura])
-            #  Si no, si mira a la derecha, invertimos esa imagen
-            elif self.mirando == DERECHA:
-                self.image = pygame.transform.flip(self.hoja.subsurface(self.coordenadasHoja[self.numPostura][self.numImagenPostura]), 1, 0)
+    def restaurarValores(self, valores):
+        MiSprite.restaurarValores(self, valores)
+        (self.movimiento, self.mirando, self.numPostura, self.numImagenPostura, self.retardoMovimiento) = valores[4:9]
+        # La imagen depende de la postura, asi que se vuelve a coger de la hoja
+        self.actualizarImagen()
 
 
     def update(self, grupoPlataformas, tiempo):
@@ -236,7 +293,7 @@ class Personaje(MiSprite):
             if (plataforma != None) and (velocidady>0) and (plataforma.rect.bottom>self.rect.bottom):
                 # Lo situamos con la parte de abajo un pixel colisionando con la plataforma
                 #  para poder detectar cuando se cae de ella
-                self.establecerPosicion((self.posicion[0], plataforma.posicion[1]-plataforma.rect.height+1))
+                self.establecerPosicion((self.posicion_global[0], plataforma.posicion_global[1]-plataforma.rect.height+1))
                 # Lo ponemos como quieto
                 self.numPostura = SPRITE_QUIETO
                 # Y estará quieto en el eje y
@@ -277,14 +334,18 @@ class Jugador(Personaje):
 
     def mover(self, teclasPulsadas, arriba, abajo, izquierda, derecha):
         # Indicamos la acción a realizar segun la tecla pulsada para el jugador
+        Personaje.mover(self, Jugador.movimientoTeclas(teclasPulsadas, arriba, abajo, izquierda, derecha))
+
+    @staticmethod
+    def movimientoTeclas(teclasPulsadas, arriba, abajo, izquierda, derecha):
+        # El movimiento que corresponde a las teclas pulsadas (es lo que se envia por la red)
         if teclasPulsadas[arriba]:
-            Personaje.mover(self,ARRIBA)
+            return ARRIBA
         elif teclasPulsadas[izquierda]:
-            Personaje.mover(self,IZQUIERDA)
+            return IZQUIERDA
         elif teclasPulsadas[derecha]:
-            Personaje.mover(self,DERECHA)
-        else:
-            Personaje.mover(self,QUIETO)
+            return DERECHA
+        return QUIETO
 
 
 # -------------------------------------------------
@@ -305,46 +366,362 @@ class NoJugador(Personaje):
     # Aqui vendria la implementacion de la IA segun las posiciones de los jugadores
     # La implementacion por defecto, este metodo deberia de ser implementado en las clases inferiores
     #  mostrando la personalidad de cada enemigo
-    def mover_cpu(self, grupo_jugadores):
+    def mover_cpu(self, jugador_mas_cercano=None, proyectiles=None):
         # Por defecto un enemigo no hace nada
-        #  (se podria programar, por ejemplo, que disparase al jugador por defecto)
-        return
+        #  (los que disparan lo hacen a traves del gestor de proyectiles que se les pasa,
+        #  y devuelven True cuando disparan, para que la fase haga sonar el disparo)
+        return False
 
 # -------------------------------------------------
 # Clase Sniper
 
 class Sniper(NoJugador):
     "El enemigo 'Sniper'"
-    __slots__= ()
-    # __slots__ vacío se define para:
-    # - Mantener la optimización de memoria de la clase base (MiSprite)
-    # - Evitar la creación de __dict__ en la subclase
-    # - No añadir nuevos atributos propios a esta subclase
-    # Si se omite, las instancias de Sniper tendrían __dict__ y perderían la optimización de slots
+    __slots__= ("retardoDisparo",)
+    # El Sniper solo añade el retardo entre disparos a los slots de la clase base (y a su estado)
+    FORMATO_ESTADO = struct.Struct('<4d5bh')
     def __init__(self, imagen, coordenadas):
         # Invocamos al constructor de la clase padre con la configuracion de este personaje concreto
         super().__init__(imagen, coordenadas, [5, 10, 6],
                           VELOCIDAD_SNIPER, VELOCIDAD_SALTO_SNIPER,
                           RETARDO_ANIMACION_SNIPER)
+        # Updates que faltan para poder volver a disparar
+        self.retardoDisparo = RETARDO_DISPARO_SNIPER
+
+    def valoresEstado(self):
+        return Personaje.valoresEstado(self) + (self.retardoDisparo,)
+
+    def restaurarValores(self, valores):
+        Personaje.restaurarValores(self, valores)
+        self.retardoDisparo = valores[9]
 
     # Aqui vendria la implementacion de la IA segun las posiciones de los jugadores
     # La implementacion de la inteligencia segun este personaje particular
-    def mover_cpu(self,grupo_jugadores=None):
-
-        # Movemos solo a los enemigos que esten en la pantalla
-        if grupo_jugadores is not None:
-            # Se selecciona el enemigo que está más cerca
-            jugador_mas_cercano = min(grupo_jugadores.sprites(),
-                                      key=lambda jugador: math.sqrt((jugador.rect.centerx - self.rect.centerx) ** 2 +
-                                                                   (jugador.rect.centery - self.rect.centery) ** 2))
+    def mover_cpu(self, jugador_mas_cercano=None, proyectiles=None):
+
+        # Movemos solo a los enemigos que esten en la pantalla: la fase le pasa el jugador mas cercano,
+        #  que busca de una vez para todos los enemigos en camara (ver IndiceJugadores.masCercanos)
+        #  Si no esta en pantalla, o no queda ningun jugador, es None
+        if jugador_mas_cercano is not None:
             #Se mueve a dicho enemigo hacía el jugador más cercano
             if jugador_mas_cercano.rect.centerx < self.rect.centerx:
+                direccion = -1
                 Personaje.mover(self,IZQUIERDA)
             else:
+                direccion = 1
                 Personaje.mover(self,DERECHA)
 
-        # Si este personaje no esta en pantalla, no hara nada
+            # Y, cuando ha pasado el retardo, le dispara
+            self.retardoDisparo -= 1
+            if proyectiles is not None and self.retardoDisparo < 0:
+                (posx, posy) = self.posicion_global
+                origen = (posx + self.rect.width / 2, posy - self.rect.height / 2)
+                if proyectiles.disparar(origen, self.velocidadDisparo(origen, jugador_mas_cercano, direccion)):
+                    self.retardoDisparo = RETARDO_DISPARO_SNIPER
+                    # El sonido no se reproduce aqui, dentro de la simulacion: lo hace la fase
+                    return True
+
+        # Si este personaje no esta en pantalla (o no hay jugadores), no hara nada
         else:
             Personaje.mover(self,QUIETO)
+        return False
+
+    @staticmethod
+    def velocidadDisparo(origen, jugador, direccion):
+        # Apunta al centro del jugador (en coordenadas globales): desde lo alto de la casa los
+        #  disparos van hacia abajo, y los que fallan acaban chocando con el suelo
+        (jugadorx, jugadory) = jugador.posicion_global
+        dx = jugadorx + jugador.rect.width / 2 - origen[0]
+        dy = jugadory - jugador.rect.height / 2 - origen[1]
+        distancia = math.hypot(dx, dy)
+        if distancia == 0:
+            return (direccion * VELOCIDAD_PROYECTIL, 0)
+        return (dx * VELOCIDAD_PROYECTIL / distancia, dy * VELOCIDAD_PROYECTIL / distancia)
+
+
+# -------------------------------------------------
+# Clase IndiceJugadores
+
+class IndiceJugadores:
+    """
+    Indice con los jugadores ordenados por su coordenada x, compartido por todos los enemigos.
+
+    Se construye una sola vez por frame (en Fase.update), que despues le pide con una sola
+    llamada (masCercanos) el objetivo de todos los enemigos que estan en cámara. Como esta
+    ordenado, la búsqueda empieza en la x del enemigo y se detiene en cuanto la distancia
+    horizontal supera la mejor distancia encontrada, de forma que no se recorren todos los
+    jugadores ni se calculan raíces cuadradas.
+    """
+    __slots__ = ("jugadores", "posicionesx", "posicionesy")
+
+    def __init__(self, grupo_jugadores=()):
+        self.actualizar(grupo_jugadores)
+
+    def actualizar(self, grupo_jugadores):
+        """Reconstruye el indice con las posiciones actuales de los jugadores"""
+        self.jugadores = sorted(grupo_jugadores, key=lambda jugador: jugador.rect.centerx)
+        self.posicionesx = [jugador.rect.centerx for jugador in self.jugadores]
+        self.posicionesy = [jugador.rect.centery for jugador in self.jugadores]
+
+    def masCercano(self, x, y):
+        """
+        Devuelve el jugador más cercano a la posición (x, y), o None si no hay jugadores.
+
+        Args:
+            x: Coordenada x en pantalla desde la que se busca
+            y: Coordenada y en pantalla desde la que se busca
+        """
+        # Lugar que ocuparia x dentro de la lista ordenada
+        return self._masCercanoDesde(x, y, bisect_left(self.posicionesx, x))
+
+    def _masCercanoDesde(self, x, y, inicio):
+        # Busca el jugador más cercano a (x, y) empezando por el lugar que ocupa x entre los jugadores
+        posicionesx = self.posicionesx
+        posicionesy = self.posicionesy
+        mejor = None
+        mejorDistancia = float('inf')  # Se comparan distancias al cuadrado
+        # Hacia la derecha, hasta que la distancia en x ya no pueda mejorar
+        for i in range(inicio, len(posicionesx)):
+            dx = posicionesx[i] - x
+            if dx * dx >= mejorDistancia:
+                break
+            dy = posicionesy[i] - y
+            distancia = dx * dx + dy * dy
+            if distancia < mejorDistancia:
+                mejor, mejorDistancia = i, distancia
+        # Y lo mismo hacia la izquierda
+        for i in range(inicio - 1, -1, -1):
+            dx = x - posicionesx[i]
+            if dx * dx >= mejorDistancia:
+                break
+            dy = posicionesy[i] - y
+            distancia = dx * dx + dy * dy
+            if distancia < mejorDistancia:
+                mejor, mejorDistancia = i, distancia
+        return None if mejor is None else self.jugadores[mejor]
+
+    def masCercanos(self, sprites):
+        """
+        Resuelve en una sola llamada el jugador más cercano de cada uno de los sprites.
+
+        Los sprites se ordenan una vez por su x y se recorren a la vez que los jugadores (como al
+        mezclar dos listas ordenadas), asi que el lugar de cada sprite entre los jugadores se
+        encuentra avanzando desde el del anterior, sin una búsqueda binaria por sprite.
+        Devuelve una lista con el jugador más cercano (o None) en el mismo orden que los sprites.
+        """
+        resultado = [None] * len(sprites)
+        if not self.jugadores:
+            return resultado
+        posicionesx = self.posicionesx
+        numJugadores = len(posicionesx)
+        inicio = 0
+        for i in sorted(range(len(sprites)), key=lambda i: sprites[i].rect.centerx):
+            (x, y) = sprites[i].rect.center
+            # Se avanza hasta el primer jugador que no esta a la izquierda del sprite
+            while inicio < numJugadores and posicionesx[inicio] < x:
+                inicio += 1
+            resultado[i] = self._masCercanoDesde(x, y, inicio)
+        return resultado
 
 
+# -------------------------------------------------
+# Clase GestorProyectiles
+
+class GestorProyectiles:
+    """
+    Gestiona todos los proyectiles de la fase de una sola vez.
+
+    Los proyectiles no son sprites: sus posiciones, velocidades y tiempo de vida se guardan
+    en arrays contiguos (uno por campo), en lugar de tener un objeto (y un update) por cada
+    bala. Las posiciones son globales, como posicion_global en MiSprite.
+
+    Si NumPy esta instalado, los arrays son de NumPy y todos los proyectiles se mueven, caducan
+    y se eliminan (al salirse de los limites) con operaciones sobre los arrays enteros, que
+    despues se compactan con una mascara. Si no, se hace con un bucle sobre arrays de Python,
+    con el mismo resultado (los vivos quedan en el mismo orden), para que dos programas con y
+    sin NumPy lleguen al mismo estado en el juego en red.
+
+    Para las colisiones se usa una rejilla de celdas (fase amplia): cada proyectil solo se
+    compara con las plataformas y jugadores que ocupan su misma celda. Esta parte es la unica
+    que se hace proyectil a proyectil.
+    """
+    __slots__ = ("imagen", "mitadImagen", "limites", "capacidad", "numProyectiles",
+                 "x", "y", "vx", "vy", "vida", "rejillaPlataformas", "impactos")
+
+    def __init__(self, limites, grupoPlataformas=(), capacidad=MAXIMO_PROYECTILES, imagen=None):
+        """
+        Args:
+            limites: Rectángulo (en coordenadas globales) fuera del cual se eliminan los proyectiles
+            grupoPlataformas: Plataformas contra las que chocan los proyectiles
+            capacidad: Número máximo de proyectiles a la vez
+            imagen: Imagen de los proyectiles (si no se indica, un pequeño rectángulo)
+        """
+        if imagen is None:
+            imagen = pygame.Surface((8, 3)).convert()
+            imagen.fill((40, 40, 40))
+        self.imagen = imagen
+        self.mitadImagen = (imagen.get_width() // 2, imagen.get_height() // 2)
+        self.limites = limites
+        self.capacidad = capacidad
+        # Los proyectiles vivos son los numProyectiles primeros de cada array
+        self.numProyectiles = 0
+        self.x = GestorProyectiles._crearCampo(capacidad)
+        self.y = GestorProyectiles._crearCampo(capacidad)
+        self.vx = GestorProyectiles._crearCampo(capacidad)
+        self.vy = GestorProyectiles._crearCampo(capacidad)
+        self.vida = GestorProyectiles._crearCampo(capacidad)
+        # Puntos (globales) en los que los proyectiles han chocado (con una plataforma o un jugador) en el ultimo update
+        self.impactos = []
+        # Las plataformas no se mueven, asi que su rejilla se construye una sola vez
+        self.rejillaPlataformas = {}
+        for plataforma in grupoPlataformas:
+            GestorProyectiles._insertar(self.rejillaPlataformas, GestorProyectiles._rectGlobal(plataforma), plataforma)
+
+    def __len__(self):
+        return self.numProyectiles
+
+    def disparar(self, posicion, velocidad, duracion=DURACION_PROYECTIL):
+        """
+        Crea un proyectil en la posicion global indicada.
+
+        Returns:
+            bool: False si ya se ha alcanzado el número máximo de proyectiles
+        """
+        i = self.numProyectiles
+        if i >= self.capacidad:
+            return False
+        self.x[i], self.y[i] = posicion
+        self.vx[i], self.vy[i] = velocidad
+        self.vida[i] = duracion
+        self.numProyectiles += 1
+        return True
+
+    def vaciar(self):
+        """Elimina todos los proyectiles"""
+        self.numProyectiles = 0
+
+    def empaquetarEstado(self):
+        """Los proyectiles vivos en binario: su numero y despues los trozos usados de cada array"""
+        n = self.numProyectiles
+        return struct.pack('<H', n) + b''.join(campo[:n].tobytes() for campo in (self.x, self.y, self.vx, self.vy, self.vida))
+
+    def desempaquetarEstado(self, datos, desplazamiento=0):
+        """Restaura los proyectiles desde los datos binarios y devuelve el desplazamiento siguiente"""
+        (n,) = struct.unpack_from('<H', datos, desplazamiento)
+        desplazamiento += 2
+        for campo in (self.x, self.y, self.vx, self.vy, self.vida):
+            fin = desplazamiento + n * campo.itemsize
+            # frombytes interpreta los bytes como doubles (tambien si los datos son un memoryview)
+            valores = array('d')
+            valores.frombytes(datos[desplazamiento:fin])
+            campo[:n] = valores
+            desplazamiento = fin
+        self.numProyectiles = n
+        return desplazamiento
+
+    def update(self, tiempo, grupoJugadores=()):
+        """
+        Mueve todos los proyectiles, elimina los que se salen, caducan o chocan,
+        y devuelve la lista de jugadores alcanzados en este frame.
+        Los puntos en los que han chocado (con las plataformas o con los jugadores) quedan en impactos.
+        """
+        # Los jugadores se mueven, asi que su rejilla se construye en cada frame
+        rejillaJugadores = {}
+        for jugador in grupoJugadores:
+            GestorProyectiles._insertar(rejillaJugadores, GestorProyectiles._rectGlobal(jugador), jugador)
+
+        alcanzados = []
+        impactos = []
+        if np is not None:
+            self._updateArrays(tiempo, rejillaJugadores, alcanzados, impactos)
+        else:
+            self._updateBucle(tiempo, rejillaJugadores, alcanzados, impactos)
+        self.impactos = impactos
+        return alcanzados
+
+    def _updateArrays(self, tiempo, rejillaJugadores, alcanzados, impactos):
+        # Con NumPy: se mueven y se comprueban todos los proyectiles a la vez
+        n = self.numProyectiles
+        x, y, vida = self.x[:n], self.y[:n], self.vida[:n]
+        x += self.vx[:n] * tiempo
+        y += self.vy[:n] * tiempo
+        vida -= tiempo
+        limites = self.limites
+        vivos = ((vida > 0) & (x >= limites.left) & (x < limites.right)
+                 & (y >= limites.top) & (y < limites.bottom))
+        # Solo los que siguen vivos pasan por la rejilla, uno a uno
+        xs, ys = x.tolist(), y.tolist()
+        for i in np.flatnonzero(vivos).tolist():
+            if self._chocar(xs[i], ys[i], rejillaJugadores, alcanzados, impactos):
+                vivos[i] = False
+        # Se compactan los vivos al principio de cada array, en el mismo orden
+        numVivos = int(np.count_nonzero(vivos))
+        if numVivos < n:
+            for campo in (self.x, self.y, self.vx, self.vy, self.vida):
+                campo[:numVivos] = campo[:n][vivos]
+        self.numProyectiles = numVivos
+
+    def _updateBucle(self, tiempo, rejillaJugadores, alcanzados, impactos):
+        # Sin NumPy: un bucle que hace lo mismo que _updateArrays, proyectil a proyectil
+        x, y, vx, vy, vida = self.x, self.y, self.vx, self.vy, self.vida
+        limites = self.limites
+        izquierda, derecha, arriba, abajo = limites.left, limites.right, limites.top, limites.bottom
+        numVivos = 0
+        for i in range(self.numProyectiles):
+            nx = x[i] + vx[i] * tiempo
+            ny = y[i] + vy[i] * tiempo
+            v = vida[i] - tiempo
+            if v <= 0 or not (izquierda <= nx < derecha and arriba <= ny < abajo):
+                continue
+            if self._chocar(nx, ny, rejillaJugadores, alcanzados, impactos):
+                continue
+            # Los vivos se van copiando al principio de cada array, en el mismo orden
+            x[numVivos], y[numVivos], vx[numVivos], vy[numVivos], vida[numVivos] = nx, ny, vx[i], vy[i], v
+            numVivos += 1
+        self.numProyectiles = numVivos
+
+    def _chocar(self, x, y, rejillaJugadores, alcanzados, impactos):
+        # Fase estrecha: solo con los jugadores y plataformas de la celda del punto (x, y)
+        celda = (int(x) // TAMANO_CELDA_PROYECTILES, int(y) // TAMANO_CELDA_PROYECTILES)
+        for rect, jugador in rejillaJugadores.get(celda, ()):
+            if rect.collidepoint(x, y):
+                alcanzados.append(jugador)
+                impactos.append((x, y))
+                return True
+        for rect, plataforma in self.rejillaPlataformas.get(celda, ()):
+            if rect.collidepoint(x, y):
+                impactos.append((x, y))
+                return True
+        return False
+
+    def draw(self, pantalla, scroll=(0, 0)):
+        """Dibuja todos los proyectiles con una unica llamada a blits()"""
+        if self.numProyectiles == 0:
+            return
+        imagen = self.imagen
+        desplazamientox = scroll[0] + self.mitadImagen[0]
+        desplazamientoy = scroll[1] + self.mitadImagen[1]
+        n = self.numProyectiles
+        pantalla.blits([(imagen, (x - desplazamientox, y - desplazamientoy))
+                         for x, y in zip(self.x[:n].tolist(), self.y[:n].tolist())], False)
+
+    @staticmethod
+    def _crearCampo(capacidad):
+        # Un array de doubles a cero: de NumPy si esta instalado, y si no, de Python
+        if np is not None:
+            return np.zeros(capacidad)
+        return array('d', bytes(8 * capacidad))
+
+    @staticmethod
+    def _rectGlobal(sprite):
+        # El rectangulo del sprite en coordenadas globales (posicion_global es la esquina inferior izquierda)
+        rect = sprite.rect.copy()
+        rect.bottomleft = sprite.posicion_global
+        return rect
+
+    @staticmethod
+    def _insertar(rejilla, rect, objeto):
+        # Mete el objeto en todas las celdas de la rejilla que ocupa su rectangulo
+        for cx in range(rect.left // TAMANO_CELDA_PROYECTILES, rect.right // TAMANO_CELDA_PROYECTILES + 1):
+            for cy in range(rect.top // TAMANO_CELDA_PROYECTILES, rect.bottom // TAMANO_CELDA_PROYECTILES + 1):
+                rejilla.setdefault((cx, cy), []).append((rect, objeto))
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------
+# Clase PoolObjetos
+
+class PoolObjetos:
+    """
+    Reserva de objetos reutilizables para sprites y animaciones de vida corta
+    (proyectiles, explosiones, humo, ...).
+
+    En lugar de crear y destruir un objeto cada vez que aparece uno de estos elementos,
+    se piden a la reserva con adquirir() y se devuelven con liberar(). Así no se reserva
+    memoria durante la partida ni se acumula basura que obligue al recolector a pararse
+    en mitad de un frame.
+
+    Si los objetos son sprites, al adquirirlos se meten en los grupos de la reserva y al
+    liberarlos se sacan de ellos. Si el objeto tiene un método reiniciar(), se llama al
+    adquirirlo con los argumentos pasados a adquirir().
+    """
+    __slots__ = ("fabrica", "maximo", "grupos", "libres", "activos", "creados", "adquisiciones", "maximoActivos")
+
+    def __init__(self, fabrica, inicial=0, maximo=None, grupos=()):
+        """
+        Args:
+            fabrica: Función (o clase) sin argumentos que crea un objeto nuevo
+            inicial: Número de objetos que se crean por adelantado
+            maximo: Número máximo de objetos que puede haber a la vez (None si no hay límite)
+            grupos: Grupos de sprites en los que se meten los objetos adquiridos
+        """
+        self.fabrica = fabrica
+        self.maximo = maximo
+        self.grupos = tuple(grupos)
+        # Los objetos disponibles, y los que estan en uso (un dict para mantener el orden)
+        self.libres = []
+        self.activos = {}
+        # Estadisticas
+        self.creados = 0
+        self.adquisiciones = 0
+        self.maximoActivos = 0
+        self.precalentar(inicial)
+
+    def precalentar(self, cantidad):
+        """Crea por adelantado objetos hasta tener 'cantidad' libres (por ejemplo, al cargar la fase)"""
+        while len(self.libres) < cantidad and not self._lleno():
+            self.libres.append(self._crear())
+
+    def adquirir(self, *args):
+        """
+        Devuelve un objeto de la reserva, reiniciado con los argumentos pasados.
+
+        Returns:
+            El objeto, o None si se ha alcanzado el máximo de objetos en uso.
+        """
+        if self.libres:
+            objeto = self.libres.pop()
+        elif self._lleno():
+            return None
+        else:
+            objeto = self._crear()
+        if hasattr(objeto, 'reiniciar'):
+            objeto.reiniciar(*args)
+        if self.grupos:
+            objeto.add(*self.grupos)
+        self.activos[objeto] = None
+        self.adquisiciones += 1
+        if len(self.activos) > self.maximoActivos:
+            self.maximoActivos = len(self.activos)
+        return objeto
+
+    def liberar(self, objeto):
+        """Devuelve un objeto a la reserva (si no estaba en uso, no se hace nada)"""
+        if objeto not in self.activos:
+            return
+        del self.activos[objeto]
+        if self.grupos:
+            objeto.remove(*self.grupos)
+        self.libres.append(objeto)
+
+    def liberarSi(self, condicion):
+        """Libera todos los objetos en uso que cumplan la condición (por ejemplo, animaciones terminadas)"""
+        for objeto in [objeto for objeto in self.activos if condicion(objeto)]:
+            self.liberar(objeto)
+
+    def liberarTodos(self):
+        """Libera todos los objetos en uso"""
+        for objeto in list(self.activos):
+            self.liberar(objeto)
+
+    def __iter__(self):
+        # Se itera sobre los objetos en uso
+        return iter(self.activos)
+
+    def __len__(self):
+        return len(self.activos)
+
+    def estadisticas(self):
+        """Devuelve un diccionario con el uso de la reserva"""
+        return {
+            'creados': self.creados,
+            'activos': len(self.activos),
+            'libres': len(self.libres),
+            'maximoActivos': self.maximoActivos,
+            'adquisiciones': self.adquisiciones,
+        }
+
+    def _lleno(self):
+        return self.maximo is not None and self.creados >= self.maximo
+
+    def _crear(self):
+        self.creados += 1
+        return self.fabrica()
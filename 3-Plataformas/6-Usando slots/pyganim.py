@@ -13,9 +13,12 @@
 #
 
 
-# TODO: Feature idea: if the same image file is specified, re-use the Surface object. (Make this optional though.)
+# Images given as filenames are loaded through GestorRecursos, so the same file specified
+# several times re-uses one Surface object, already converted to the display format.
 
-import pygame, time
+import pygame, time, copy
+from array import array
+from recursos import GestorRecursos
 
 # setting up constants
 PLAYING = 'playing'
@@ -34,8 +37,63 @@ SOUTH = 'south'
 SOUTHEAST = 'southeast'
 
 
+class PygFrameSet(object):
+    # The frames of an animation: their images, durations and start times, plus the
+    # precomputed frame lookup. A frame set is never modified once it is created, so
+    # any number of PygAnimation objects (copies, reversed animations...) can share
+    # the same one by reference.
+    __slots__ = ('images', 'durations', 'startTimes', 'numFrames', 'uniformDurationMs', 'frameLookup', 'totalMs')
+
+    def __init__(self, images, durations):
+        # images stores the pygame.Surface objects of each frame
+        self.images = tuple(images)
+        # durations stores the durations (in seconds) of each frame.
+        # e.g. (1, 1, 2.5) means the first and second frames last one second,
+        # and the third frame lasts for two and half seconds.
+        self.durations = tuple(durations)
+        self.numFrames = len(self.images)
+        # startTimes shows when each frame begins. len(startTimes) will
+        # always be one more than len(images), because the last number
+        # will be when the last frame ends, rather than when it starts.
+        # The values are in seconds.
+        # So startTimes[-1] tells you the length of the entire animation.
+        # e.g. if durations is (1, 1, 2.5), then startTimes will be (0, 1, 2, 4.5)
+        startTimes = [0]
+        for duration in self.durations:
+            startTimes.append(startTimes[-1] + duration)
+        self.startTimes = tuple(startTimes)
+
+        # To find the current frame in constant time, the durations are quantised to whole
+        # milliseconds. If every frame lasts the same, the frame number is just a division by
+        # uniformDurationMs; otherwise frameLookup stores the frame number for each millisecond.
+        # totalMs is the length of the entire animation in milliseconds.
+        durationsMs = [max(1, int(round(duration * 1000))) for duration in self.durations]
+        self.totalMs = sum(durationsMs)
+        if durationsMs.count(durationsMs[0]) == len(durationsMs):
+            self.uniformDurationMs = durationsMs[0]
+            self.frameLookup = None
+        else:
+            self.uniformDurationMs = None
+            self.frameLookup = array('H')
+            for i in range(len(durationsMs)):
+                self.frameLookup.extend(array('H', [i]) * durationsMs[i])
+
+
+    def findFrameNum(self, elapsedMs):
+        # Returns the number of the frame that is shown "elapsedMs" milliseconds
+        # into the animation, in constant time.
+        if elapsedMs >= self.totalMs:
+            return self.numFrames - 1
+        if elapsedMs <= 0:
+            return 0
+        if self.uniformDurationMs is not None:
+            return elapsedMs // self.uniformDurationMs
+        return self.frameLookup[elapsedMs]
+
+
+
 class PygAnimation(object):
-    def __init__(self, frames, loop=True):
+    def __init__(self, frames, loop=True, colorkey=None):
         # Constructor function for the animation object. Starts off in the STOPPED state.
         #
         # @param frames
@@ -45,24 +103,29 @@ class PygAnimation(object):
         #     Note that the images and duration cannot be changed. A new PygAnimation object
         #     will have to be created.
         # @param loop Tells the animation object to keep playing in a loop.
-
-        # _images stores the pygame.Surface objects of each frame
-        self._images = []
-        # _durations stores the durations (in seconds) of each frame.
-        # e.g. [1, 1, 2.5] means the first and second frames last one second,
-        # and the third frame lasts for two and half seconds.
-        self._durations = []
-        # _startTimes shows when each frame begins. len(self._startTimes) will
-        # always be one more than len(self._images), because the last number
-        # will be when the last frame ends, rather than when it starts.
-        # The values are in seconds.
-        # So self._startTimes[-1] tells you the length of the entire animation.
-        # e.g. if _durations is [1, 1, 2.5], then _startTimes will be [0, 1, 2, 4.5]
-        self._startTimes = None
-
-        # if the sprites are transformed, the originals are kept in _images
-        # and the transformed sprites are kept in _transformedImages.
-        self._transformedImages = []
+        # @param colorkey Transparent colour for frames loaded from files without per-pixel alpha.
+        #     Those frames are loaded with RLE acceleration; the rest are loaded with convert_alpha().
+
+        # _frames is the PygFrameSet with the images and durations of the frames.
+        # It is shared (never copied) by all the copies of this animation.
+        self._frames = None
+
+        # if the sprites are transformed, the originals are kept in _frames
+        # and the transformed sprites are kept in the _transformedImages tuple.
+        # Each transformation replaces the tuple with a new one, so it can be shared
+        # by the copies of this animation (and by other animations, see Animacion).
+        # The Surface method wrappers (set_alpha(), scroll()...) do change the frames
+        # in place, so while _sharedTransformedImages is True they first copy them
+        # (copy on write) and the other animations that share the tuple are not changed.
+        self._transformedImages = ()
+        self._sharedTransformedImages = False
+
+        # If _reversed is True, the frames are played from the last one to the first one.
+        # _offset is a time offset (in seconds) added when finding the frame to draw.
+        # These are the only things that change between an animation and its reversed
+        # or offset copies, so reversing or copying an animation never copies any list.
+        self._reversed = False
+        self._offset = 0
 
         self._state = STOPPED # The state is always either PLAYING, PAUSED, or STOPPED
         self._loop = loop # If True, the animation will keep looping. If False, the animation stops after playing once.
@@ -73,36 +136,64 @@ class PygAnimation(object):
         self._pausedStartTime = 0 # the time that the pause() function was last called.
 
         if frames != '_copy': # ('_copy' is passed for frames by the getCopies() method)
-            self.numFrames = len(frames)
-            assert self.numFrames > 0, 'Must contain at least one frame.'
-            for i in range(self.numFrames):
-                # load each frame of animation into _images
+            assert len(frames) > 0, 'Must contain at least one frame.'
+            images = []
+            durations = []
+            for i in range(len(frames)):
+                # load each frame of animation
                 frame = frames[i]
                 assert type(frame) in (list, tuple) and len(frame) == 2, 'Frame %s has incorrect format.' % (i)
                 assert type(frame[0]) in (str, pygame.Surface), 'Frame %s image must be a string filename or a pygame.Surface' % (i)
                 assert frame[1] > 0, 'Frame %s duration must be greater than zero.' % (i)
                 if type(frame[0]) == str:
-                    frame = (pygame.image.load(frame[0]), frame[1])
-                self._images.append(frame[0])
-                self._durations.append(frame[1])
-            self._startTimes = self._getStartTimes()
+                    frame = (GestorRecursos.CargarFrame(frame[0], colorkey), frame[1])
+                images.append(frame[0])
+                durations.append(frame[1])
+            self._frames = PygFrameSet(images, durations)
 
 
-    def _getStartTimes(self):
-        # Internal method to get the start times based off of the _durations list.
-        # Don't call this method.
-        startTimes = [0]
-        for i in range(self.numFrames):
-            startTimes.append(startTimes[-1] + self._durations[i])
-        return startTimes
+    def _propGetNumFrames(self):
+        return self._frames.numFrames
+
+    numFrames = property(_propGetNumFrames)
+
+
+    def _getImages(self):
+        # Internal method. Returns the tuple of Surfaces drawn for each frame, in the
+        # order of the frame set (that is, without taking _reversed into account).
+        return self._transformedImages or self._frames.images
+
+
+    def _getStartTime(self, frameNum):
+        # Internal method. Returns when the frameNum-th frame begins, taking into
+        # account whether the animation is reversed.
+        startTimes = self._frames.startTimes
+        if self._reversed:
+            return startTimes[-1] - startTimes[self._frames.numFrames - frameNum]
+        return startTimes[frameNum]
+
+
+    def _findFrameNum(self, elapsed):
+        # Internal method. Returns the number of the frame that is shown "elapsed" seconds
+        # into the animation, in constant time.
+        frames = self._frames
+        if self._offset:
+            elapsed += self._offset
+            if self._loop:
+                elapsed = elapsed % frames.startTimes[-1]
+        elapsedMs = int(round(elapsed * 1000))
+        if self._reversed:
+            # a reversed animation shows, at each time, the frame that the
+            # frame set would show that long before its end
+            return frames.numFrames - 1 - frames.findFrameNum(frames.totalMs - 1 - elapsedMs)
+        return frames.findFrameNum(elapsedMs)
 
 
     def reverse(self):
         # Reverses the order of the animations.
-        self.elapsed = self._startTimes[-1] - self.elapsed
-        self._images.reverse()
-        self._transformedImages.reverse()
-        self._durations.reverse()
+        # (Only a flag is changed: the frames are shared and never reordered.)
+        self.elapsed = self._frames.startTimes[-1] - self.elapsed
+        self._reversed = not self._reversed
 
 
     def getCopy(self):
@@ -115,25 +206,41 @@ class PygAnimation(object):
         return self.getCopies(1)[0]
 
 
-    def getCopies(self, numCopies=1):
+    def getCopies(self, numCopies=1, offset=0):
         # Returns a list of copies of this PygAnimation object, but one that refers to the
         # Surface objects of the original so it efficiently uses memory.
+        # The copies share the frame set and the transformed frames of the original by
+        # reference (no list is copied), so each copy only costs its own playing state.
+        # The transformed frames are copied later only by the first animation (the original
+        # or a copy) that calls a Surface method wrapper on them, see _surfaceMethodWrapper().
+        # The copies are of the same class as the original and start off STOPPED.
         #
         # NOTE: Messing around with the original Surface objects will affect all
         # the copies. If you want to modify the Surface objects, then just make
         # copies using constructor function instead.
+        #
+        # @param offset
+        #     Time offset (in seconds) between consecutive copies, so they don't all
+        #     show the same frame at the same time.
         retval = []
+        self._sharedTransformedImages = True
         for i in range(numCopies):
-            newAnim = PygAnimation('_copy', loop=self.loop)
-            newAnim._images = self._images[:]
-            newAnim._transformedImages = self._transformedImages[:]
-            newAnim._durations = self._durations[:]
-            newAnim._startTimes = self._startTimes[:]
-            newAnim.numFrames = self.numFrames
+            newAnim = copy.copy(self)
+            newAnim._state = STOPPED
+            newAnim._offset = self._offset + (i + 1) * offset
             retval.append(newAnim)
         return retval
 
 
+    def _propGetOffset(self):
+        return self._offset
+
+    def _propSetOffset(self, offset):
+        self._offset = offset
+
+    offset = property(_propGetOffset, _propSetOffset)
+
+
     def blit(self, destSurface, dest):
         # Draws the appropriate frame of the animation to the destination Surface
         # at the specified position.
@@ -150,18 +257,43 @@ class PygAnimation(object):
             self.state = STOPPED
         if not self.visibility or self.state == STOPPED:
             return
-        frameNum = findStartTime(self._startTimes, self.elapsed)
-        destSurface.blit(self.getFrame(frameNum), dest)
+        frameNum = self._findFrameNum(self.elapsed)
+        self._blitFrame(self.getFrame(frameNum), destSurface, dest)
+
+
+    def _getFrameAtTime(self, now):
+        # Internal method. Returns the Surface that blit() would draw at the time "now"
+        # (as returned by time.time()), or None if nothing would be drawn. It is used by
+        # PygConductor to compute the frames of all its animations with one clock reading.
+        if self._state == STOPPED or not self._visibility:
+            return None
+        if self._state == PLAYING:
+            elapsed = (now - self._playingStartTime) * self._rate
+        else:
+            elapsed = (self._pausedStartTime - self._playingStartTime) * self._rate
+        if self._loop:
+            elapsed = elapsed % self._frames.startTimes[-1]
+        elif elapsed >= self._frames.startTimes[-1]:
+            # the animation doesn't loop and has finished playing
+            self._state = STOPPED
+            return None
+        return self.getFrame(self._findFrameNum(elapsed))
+
+
+    def _blitFrame(self, frame, destSurface, dest):
+        # Internal method. Draws a frame, checking its pixel format if profiling is enabled.
+        if GestorRecursos.perfilarFormatos:
+            GestorRecursos.ComprobarFormato(frame, destSurface)
+        destSurface.blit(frame, dest)
 
 
     def getFrame(self, frameNum):
         # Returns the pygame.Surface object of the frameNum-th frame in this
         # animation object. If there is a transformed version of the frame,
         # it will return that one.
-        if self._transformedImages == []:
-            return self._images[frameNum]
-        else:
-            return self._transformedImages[frameNum]
+        if self._reversed:
+            frameNum = self._frames.numFrames - 1 - frameNum
+        return self._getImages()[frameNum]
 
 
     def getCurrentFrame(self):
@@ -179,12 +311,16 @@ class PygAnimation(object):
         # This is handy to do for multiple transformation, where calling
         # the rotation or scaling functions multiple times results in
         # degraded/noisy images.
-        self._transformedImages = []
+        self._transformedImages = ()
+        self._sharedTransformedImages = False
 
     def makeTransformsPermanent(self):
-        self._images = [pygame.Surface(surfObj.get_size(), 0, surfObj) for surfObj in self._transformedImages]
+        # The transformed frames become the original ones of a new frame set, which
+        # only this animation uses (its copies keep the previous one).
+        images = [pygame.Surface(surfObj.get_size(), 0, surfObj) for surfObj in self._transformedImages]
         for i in range(len(self._transformedImages)):
-            self._images[i].blit(self._transformedImages[i], (0,0))
+            images[i].blit(self._transformedImages[i], (0,0))
+        self._frames = PygFrameSet(images, self._frames.durations)
 
     def blitFrameNum(self, frameNum, destSurface, dest):
         # Draws the specified frame of the animation object. This ignores the
@@ -204,7 +340,7 @@ class PygAnimation(object):
             self.state = STOPPED
         if not self.visibility or self.state == STOPPED:
             return
-        destSurface.blit(self.getFrame(frameNum), dest)
+        self._blitFrame(self.getFrame(frameNum), destSurface, dest)
 
 
     def blitFrameAtTime(self, elapsed, destSurface, dest):
@@ -227,14 +363,14 @@ class PygAnimation(object):
             self.state = STOPPED
         if not self.visibility or self.state == STOPPED:
             return
-        frameNum = findStartTime(self._startTimes, elapsed)
-        destSurface.blit(self.getFrame(frameNum), dest)
+        frameNum = self._findFrameNum(elapsed)
+        self._blitFrame(self.getFrame(frameNum), destSurface, dest)
 
 
     def isFinished(self):
         # Returns True if this animation doesn't loop and has finished playing
         # all the frames it has.
-        return not self.loop and self.elapsed >= self._startTimes[-1]
+        return not self.loop and self.elapsed >= self._frames.startTimes[-1]
 
 
     def play(self, startTime=None):
@@ -313,7 +449,7 @@ class PygAnimation(object):
         # Returns True if all the Surface objects in this animation object
         # have the same width and height. Otherwise, returns False
         width, height = self.getFrame(0).get_size()
-        for i in range(len(self._images)):
+        for i in range(self.numFrames):
             if self.getFrame(i).get_size() != (width, height):
                 return False
         return True
@@ -325,8 +461,8 @@ class PygAnimation(object):
         # widths and heights may be on different Surface objects.)
         frameWidths = []
         frameHeights = []
-        for i in range(len(self._images)):
-            frameWidth, frameHeight = self._images[i].get_size()
+        for surf in self._frames.images:
+            frameWidth, frameHeight = surf.get_size()
             frameWidths.append(frameWidth)
             frameHeights.append(frameHeight)
         maxWidth = max(frameWidths)
@@ -360,39 +496,42 @@ class PygAnimation(object):
         halfMaxWidth = int(maxWidth / 2)
         halfMaxHeight = int(maxHeight / 2)
 
-        for i in range(len(self._images)):
+        images = []
+        for surf in self._frames.images:
             # go through and copy all frames to a max-sized Surface object
-            # NOTE: This makes changes to the original images in self._images, not the transformed images in self._transformedImages
+            # NOTE: This makes a new frame set with the anchored original images (not the transformed images
+            # in self._transformedImages), which is used by this animation but not by its copies.
             newSurf = pygame.Surface((maxWidth, maxHeight)) # TODO: this is probably going to have errors since I'm using the default depth.
 
             # set the expanded areas to be transparent
             newSurf = newSurf.convert_alpha()
             newSurf.fill((0,0,0,0))
 
-            frameWidth, frameHeight = self._images[i].get_size()
+            frameWidth, frameHeight = surf.get_size()
             halfFrameWidth = int(frameWidth / 2)
             halfFrameHeight = int(frameHeight / 2)
 
             # position the Surface objects to the specified anchor point
             if anchorPoint == NORTHWEST:
-                newSurf.blit(self._images[i], (0, 0))
+                newSurf.blit(surf, (0, 0))
             elif anchorPoint == NORTH:
-                newSurf.blit(self._images[i], (halfMaxWidth - halfFrameWidth, 0))
+                newSurf.blit(surf, (halfMaxWidth - halfFrameWidth, 0))
             elif anchorPoint == NORTHEAST:
-                newSurf.blit(self._images[i], (maxWidth - frameWidth, 0))
+                newSurf.blit(surf, (maxWidth - frameWidth, 0))
             elif anchorPoint == WEST:
-                newSurf.blit(self._images[i], (0, halfMaxHeight - halfFrameHeight))
+                newSurf.blit(surf, (0, halfMaxHeight - halfFrameHeight))
             elif anchorPoint == CENTER:
-                newSurf.blit(self._images[i], (halfMaxWidth - halfFrameWidth, halfMaxHeight - halfFrameHeight))
+                newSurf.blit(surf, (halfMaxWidth - halfFrameWidth, halfMaxHeight - halfFrameHeight))
             elif anchorPoint == EAST:
-                newSurf.blit(self._images[i], (maxWidth - frameWidth, halfMaxHeight - halfFrameHeight))
+                newSurf.blit(surf, (maxWidth - frameWidth, halfMaxHeight - halfFrameHeight))
             elif anchorPoint == SOUTHWEST:
-                newSurf.blit(self._images[i], (0, maxHeight - frameHeight))
+                newSurf.blit(surf, (0, maxHeight - frameHeight))
             elif anchorPoint == SOUTH:
-                newSurf.blit(self._images[i], (halfMaxWidth - halfFrameWidth, maxHeight - frameHeight))
+                newSurf.blit(surf, (halfMaxWidth - halfFrameWidth, maxHeight - frameHeight))
             elif anchorPoint == SOUTHEAST:
-                newSurf.blit(self._images[i], (maxWidth - frameWidth, maxHeight - frameHeight))
-            self._images[i] = newSurf
+                newSurf.blit(surf, (maxWidth - frameWidth, maxHeight - frameHeight))
+            images.append(newSurf)
+        self._frames = PygFrameSet(images, self._frames.durations)
 
 
     def nextFrame(self, jump=1):
@@ -422,15 +561,28 @@ class PygAnimation(object):
     def fastForward(self, seconds=None):
         # Set the elapsed time forward relative to the current elapsed time.
         if seconds is None:
-            self.elapsed = self._startTimes[-1] - 0.00002 # done to compensate for rounding errors
+            # The frames are looked up by whole milliseconds (see PygFrameSet), and the last
+            # millisecond of the lookup always shows the last frame.
+            self.elapsed = (self._frames.totalMs - 1) / 1000.0
         else:
             self.elapsed += seconds
 
     def _makeTransformedSurfacesIfNeeded(self):
-        # Internal-method. Creates the Surface objects for the _transformedImages list.
+        # Internal-method. Creates the Surface objects for the _transformedImages tuple,
+        # so that they can be modified in place: copies of the original frames if there are
+        # no transformed frames yet, or of the transformed frames if they are shared.
         # Don't call this method.
-        if self._transformedImages == []:
-            self._transformedImages = [surf.copy() for surf in self._images]
+        if self._transformedImages == () or self._sharedTransformedImages:
+            self._transformedImages = tuple(surf.copy() for surf in self._getImages())
+            self._sharedTransformedImages = False
+
+
+    def _transformFrames(self, function, *args):
+        # Internal-method. Replaces the transformed frames by the result of applying
+        # function to each of them (or to the originals, if there are no transformed
+        # frames yet). No intermediate copy of the frames is needed.
+        self._transformedImages = tuple(function(surf, *args) for surf in self._getImages())
+        self._sharedTransformedImages = False
 
 
     # Transformation methods.
@@ -439,43 +591,33 @@ class PygAnimation(object):
     def flip(self, xbool, ybool):
         # Flips the image horizontally, vertically, or both.
         # See http://pygame.org/docs/ref/transform.html#pygame.transform.flip
-        self._makeTransformedSurfacesIfNeeded()
-        for i in range(len(self._images)):
-            self._transformedImages[i] = pygame.transform.flip(self.getFrame(i), xbool, ybool)
+        self._transformFrames(pygame.transform.flip, xbool, ybool)
 
 
     def scale(self, width_height):
         # NOTE: Does not support the DestSurface parameter
         # Increases or decreases the size of the images.
         # See http://pygame.org/docs/ref/transform.html#pygame.transform.scale
-        self._makeTransformedSurfacesIfNeeded()
-        for i in range(len(self._images)):
-            self._transformedImages[i] = pygame.transform.scale(self.getFrame(i), width_height)
+        self._transformFrames(pygame.transform.scale, width_height)
 
 
     def rotate(self, angle):
         # Rotates the image.
         # See http://pygame.org/docs/ref/transform.html#pygame.transform.rotate
-        self._makeTransformedSurfacesIfNeeded()
-        for i in range(len(self._images)):
-            self._transformedImages[i] = pygame.transform.rotate(self.getFrame(i), angle)
+        self._transformFrames(pygame.transform.rotate, angle)
 
 
     def rotozoom(self, angle, scale):
         # Rotates and scales the image simultaneously.
         # See http://pygame.org/docs/ref/transform.html#pygame.transform.rotozoom
-        self._makeTransformedSurfacesIfNeeded()
-        for i in range(len(self._images)):
-            self._transformedImages[i] = pygame.transform.rotozoom(self.getFrame(i), angle, scale)
+        self._transformFrames(pygame.transform.rotozoom, angle, scale)
 
 
     def scale2x(self):
         # NOTE: Does not support the DestSurface parameter
         # Double the size of the image using an efficient algorithm.
         # See http://pygame.org/docs/ref/transform.html#pygame.transform.scale2x
-        self._makeTransformedSurfacesIfNeeded()
-        for i in range(len(self._images)):
-            self._transformedImages[i] = pygame.transform.scale2x(self.getFrame(i))
+        self._transformFrames(pygame.transform.scale2x)
 
 
     def smoothscale(self, width_height):
@@ -483,9 +625,7 @@ class PygAnimation(object):
         # Scales the image smoothly. (Computationally more expensive and
         # slower but produces a better scaled image.)
         # See http://pygame.org/docs/ref/transform.html#pygame.transform.smoothscale
-        self._makeTransformedSurfacesIfNeeded()
-        for i in range(len(self._images)):
-            self._transformedImages[i] = pygame.transform.smoothscale(self.getFrame(i), width_height)
+        self._transformFrames(pygame.transform.smoothscale, width_height)
 
 
 
@@ -494,10 +634,13 @@ class PygAnimation(object):
     # They are here for the convenience of the module user. These calls will apply to the transform images,
     # and can have their effects undone by called clearTransforms()
     #
-    # It is not advisable to call these methods on the individual Surface objects in self._images.
+    # It is not advisable to call these methods on the individual Surface objects in self._frames.images.
+    #
+    # The frames are changed in place, but only after copying them if they are shared
+    # with other animations (see _makeTransformedSurfacesIfNeeded()).
     def _surfaceMethodWrapper(self, wrappedMethodName, *args, **kwargs):
         self._makeTransformedSurfacesIfNeeded()
-        for i in range(len(self._images)):
+        for i in range(len(self._transformedImages)):
             methodToCall = getattr(self._transformedImages[i], wrappedMethodName)
             methodToCall(*args, **kwargs)
 
@@ -505,12 +648,14 @@ class PygAnimation(object):
     # but I don't want to make the code even more unreadable.
     def convert(self, *args, **kwargs):
         # See http://pygame.org/docs/ref/surface.html#Surface.convert
-        self._surfaceMethodWrapper('convert', *args, **kwargs)
+        # (convert() returns new Surfaces instead of changing them, so it is a transformation)
+        self._transformFrames(lambda surf: surf.convert(*args, **kwargs))
 
 
     def convert_alpha(self, *args, **kwargs):
         # See http://pygame.org/docs/ref/surface.html#Surface.convert_alpha
-        self._surfaceMethodWrapper('convert_alpha', *args, **kwargs)
+        # (convert_alpha() returns new Surfaces instead of changing them, so it is a transformation)
+        self._transformFrames(lambda surf: surf.convert_alpha(*args, **kwargs))
 
 
     def set_alpha(self, *args, **kwargs):
@@ -601,15 +746,13 @@ class PygAnimation(object):
 
 
     def _propSetElapsed(self, elapsed):
-        # NOTE: Do to floating point rounding errors, this doesn't work precisely.
-        elapsed += 0.00001 # done to compensate for rounding errors
-        # TODO - I really need to find a better way to handle the floating point thing.
-
         # Set the elapsed time to a specific value.
+        # (Frames are looked up by whole milliseconds, so there is no need to compensate
+        # for floating point rounding errors here.)
         if self._loop:
-            elapsed = elapsed % self._startTimes[-1]
+            elapsed = elapsed % self._frames.startTimes[-1]
         else:
-            elapsed = getInBetweenValue(0, elapsed, self._startTimes[-1])
+            elapsed = getInBetweenValue(0, elapsed, self._frames.startTimes[-1])
 
         rightNow = time.time()
         self._playingStartTime = rightNow - (elapsed * self.rate)
@@ -620,8 +763,6 @@ class PygAnimation(object):
 
 
     def _propGetElapsed(self):
-        # NOTE: Do to floating point rounding errors, this doesn't work precisely.
-
         # To prevent infinite recursion, don't use the self.state property,
         # just read/set self._state directly because the state getter calls
         # this method.
@@ -641,10 +782,9 @@ class PygAnimation(object):
             # PygAnimation object was paused
             elapsed = (self._pausedStartTime - self._playingStartTime) * self.rate
         if self._loop:
-            elapsed = elapsed % self._startTimes[-1]
+            elapsed = elapsed % self._frames.startTimes[-1]
         else:
-            elapsed = getInBetweenValue(0, elapsed, self._startTimes[-1])
-        elapsed += 0.00001 # done to compensate for rounding errors
+            elapsed = getInBetweenValue(0, elapsed, self._frames.startTimes[-1])
         return elapsed
 
     elapsed = property(_propGetElapsed, _propSetElapsed)
@@ -653,16 +793,16 @@ class PygAnimation(object):
     def _propGetCurrentFrameNum(self):
         # Return the frame number of the frame that will be currently
         # displayed if the animation object were drawn right now.
-        return findStartTime(self._startTimes, self.elapsed)
+        return self._findFrameNum(self.elapsed)
 
 
     def _propSetCurrentFrameNum(self, frameNum):
         # Change the elapsed time to the beginning of a specific frame.
         if self.loop:
-            frameNum = frameNum % len(self._images)
+            frameNum = frameNum % self.numFrames
         else:
-            frameNum = getInBetweenValue(0, frameNum, len(self._images)-1)
-        self.elapsed = self._startTimes[frameNum]
+            frameNum = getInBetweenValue(0, frameNum, self.numFrames-1)
+        self.elapsed = self._getStartTime(frameNum) - self._offset
 
     currentFrameNum = property(_propGetCurrentFrameNum, _propSetCurrentFrameNum)
 
@@ -695,6 +835,28 @@ class PygConductor(object):
 
     animations = property(_propGetAnimations, _propSetAnimations)
 
+    def blits(self, destSurface, dests, doreturn=True):
+        # Draws the current frame of every animation in this conductor with a single
+        # call to destSurface.blits(). The frames are all computed in one pass with the
+        # same clock reading, so the animations stay in sync.
+        #
+        # @param destSurface
+        #     The Surface object to draw the frames
+        # @param dests
+        #     A sequence with the position of each animation, in the same order as the
+        #     animations were added to the conductor.
+        # @param doreturn
+        #     If True, returns the list of Rects that were drawn (the dirty rects).
+        now = time.time()
+        sequence = []
+        for animObj, dest in zip(self._animations, dests):
+            frame = animObj._getFrameAtTime(now)
+            if frame is not None:
+                if GestorRecursos.perfilarFormatos:
+                    GestorRecursos.ComprobarFormato(frame, destSurface)
+                sequence.append((frame, dest))
+        return destSurface.blits(sequence, doreturn)
+
     def play(self, startTime=None):
         if startTime is None:
             startTime = time.time()
@@ -802,6 +964,22 @@ class PygConductor(object):
             animObj.unlock()
 
 
+def getFramesFromSpriteSheet(sheetFilename, coordsFilename, durations, colorkey=None):
+    # Returns a list of frames, in the format expected by the PygAnimation constructor,
+    # taken from a single sprite sheet image. The coords file has four numbers per frame
+    # (left, top, width and height of the frame inside the sheet), like the coordinate
+    # files used by the characters. The sheet is read and decoded only once, and the
+    # frames are subsurfaces of it.
+    #
+    # @param durations
+    #     Either the duration (in seconds) of every frame, or a list with the duration of each one.
+    images = GestorRecursos.CargarHojaFrames(sheetFilename, coordsFilename, colorkey)
+    if type(durations) not in (list, tuple):
+        durations = [durations] * len(images)
+    assert len(durations) == len(images), 'There must be one duration for each frame in the sprite sheet.'
+    return list(zip(images, durations))
+
+
 def getInBetweenValue(lowerBound, value, upperBound):
     # Returns the value within the bounds of the lower and upper bound parameters.
     # If value is less than lowerBound, then return lowerBound.
@@ -813,34 +991,3 @@ def getInBetweenValue(lowerBound, value, upperBound):
         return upperBound
     return value
 
-
-def findStartTime(startTimes, target):
-    # With startTimes as a list of sequential numbers and target as a number,
-    # returns the index of the number in startTimes that preceeds target.
-    #
-    # For example, if startTimes was [0, 2, 4.5, 7.3, 10] and target was 6,
-    # then findStartTime() would return 2. If target was 12, returns 4.
-    assert startTimes[0] == 0
-    lb = 0 # "lb" is lower bound
-    ub = len(startTimes) - 1 # "ub" is upper bound
-
-    # handle special cases:
-    if len(startTimes) == 0:
-        return 0
-    if target >= startTimes[-1]:
-        return ub - 1
-
-    # perform binary search:
-    while True:
-        i = int((ub - lb) / 2) + lb
-
-        if startTimes[i] == target or (startTimes[i] < target and startTimes[i+1] > target):
-            if i == len(startTimes):
-                return i - 1
-            else:
-                return i
-
-        if startTimes[i] < target:
-            lb = i
-        elif startTimes[i] > target:
-            ub = i
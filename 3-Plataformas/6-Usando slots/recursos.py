@@ -1,9 +1,17 @@
 import pygame
 import os
+import struct
+from collections import OrderedDict
+from pygame.locals import RLEACCEL
 from configuracion import Configuracion
 
+# Numero maximo de textos renderizados que se guardan (se descartan los usados hace mas tiempo)
+MAXIMO_TEXTOS = 256
+
 class GestorRecursos:
     _instance = None
+    # Si es True, se anotan las superficies que se dibujan sin estar en el formato de la pantalla
+    perfilarFormatos = False
     
     def __new__(cls):
         if cls._instance is None:
@@ -16,32 +24,157 @@ class GestorRecursos:
         self.imagenes = {}
         self.sonidos = {}
         self.coordenadas = {}
+        # Imagenes leidas en segundo plano (ver DecodificarImagen), aun sin convertir, por ruta
+        self.decodificadas = {}
+        # Fuentes por (nombre, tamaño), y textos ya renderizados, del menos al mas usado
+        self.fuentes = {}
+        self.textos = OrderedDict()
+        # Frames de las hojas de animaciones, ya recortados
+        self.hojasFrames = {}
+        # Superficies dibujadas en un formato distinto al de la pantalla, con el numero de veces
+        self.formatosIncorrectos = {}
+        GestorRecursos.perfilarFormatos = self.config.PERFILAR_FORMATOS
         
     @staticmethod
     def CargarImagen(nombre, colorTransparente=None):
-        """Carga una imagen desde el directorio de recursos"""
-        if nombre not in GestorRecursos._instance.imagenes:
+        """Carga una imagen desde el directorio de imagenes"""
+        if nombre not in GestorRecursos().imagenes:
             # Si no está en el diccionario, la cargamos
-            ruta = os.path.join("recursos", "imagenes", nombre)
-            imagen = pygame.image.load(ruta)
+            ruta = GestorRecursos.RutaImagen(nombre)
+            imagen = GestorRecursos._leerImagen(ruta)
             if colorTransparente is not None:
                 imagen = imagen.convert()
                 imagen.set_colorkey(colorTransparente)
             else:
                 imagen = imagen.convert_alpha()
-            GestorRecursos._instance.imagenes[nombre] = imagen
-        return GestorRecursos._instance.imagenes[nombre]
+            GestorRecursos().imagenes[nombre] = imagen
+        return GestorRecursos().imagenes[nombre]
     
+    @staticmethod
+    def RutaImagen(nombre):
+        # Las imagenes (y sus archivos de coordenadas) estan en el directorio imagenes de la fase,
+        #  el mismo del que leen las animaciones
+        return os.path.join("imagenes", nombre)
+
+    @staticmethod
+    def CargarFrame(ruta, colorTransparente=None):
+        """
+        Carga una imagen de un frame de animacion (con la ruta tal cual se le pasa a PygAnimation),
+        convertida al formato de la pantalla para que dibujarla no requiera convertir cada pixel.
+        """
+        gestor = GestorRecursos()
+        if ruta not in gestor.imagenes:
+            imagen = GestorRecursos._leerImagen(ruta)
+            if colorTransparente is not None:
+                imagen = imagen.convert()
+                # Con RLE, los pixeles transparentes se saltan al dibujar en lugar de comprobarlos uno a uno
+                imagen.set_colorkey(colorTransparente, RLEACCEL)
+            else:
+                imagen = imagen.convert_alpha()
+            gestor.imagenes[ruta] = imagen
+        return gestor.imagenes[ruta]
+
+    @staticmethod
+    def DecodificarImagen(ruta):
+        """
+        Lee y descomprime una imagen, sin convertirla, para que la siguiente vez que se cargue
+        no haya que leerla. Se puede llamar desde otro hilo: solo toca el diccionario de
+        imagenes decodificadas (cada operacion sobre un dict es atomica) y nunca la pantalla.
+        """
+        gestor = GestorRecursos()
+        if ruta not in gestor.decodificadas:
+            gestor.decodificadas[ruta] = pygame.image.load(ruta)
+
+    @staticmethod
+    def _leerImagen(ruta):
+        # Devuelve la imagen ya decodificada en segundo plano si la hay, y si no, la lee
+        imagen = GestorRecursos().decodificadas.pop(ruta, None)
+        if imagen is None:
+            imagen = pygame.image.load(ruta)
+        return imagen
+
+    @staticmethod
+    def CargarHojaFrames(rutaHoja, rutaCoordenadas, colorTransparente=None):
+        """
+        Carga los frames de una animacion a partir de una sola hoja de sprites y su archivo
+        de coordenadas (cuatro numeros x, y, ancho y alto por frame, como coordJugador.txt).
+        Se devuelve la lista de frames como subsuperficies de la hoja, que solo se lee una vez.
+        """
+        gestor = GestorRecursos()
+        clave = (rutaHoja, rutaCoordenadas)
+        if clave not in gestor.hojasFrames:
+            hoja = GestorRecursos.CargarFrame(rutaHoja, colorTransparente)
+            archivo = open(rutaCoordenadas, "r")
+            datos = [int(dato) for dato in archivo.read().split()]
+            archivo.close()
+            gestor.hojasFrames[clave] = [hoja.subsurface(pygame.Rect(datos[i:i+4])) for i in range(0, len(datos), 4)]
+        return gestor.hojasFrames[clave]
+
+    @staticmethod
+    def ComprobarFormato(superficie, destino):
+        """Anota la superficie si no tiene el mismo formato de pixel que el destino en el que se dibuja"""
+        if superficie.get_bytesize() != destino.get_bytesize() or superficie.get_masks()[:3] != destino.get_masks()[:3]:
+            formatosIncorrectos = GestorRecursos().formatosIncorrectos
+            formatosIncorrectos[superficie] = formatosIncorrectos.get(superficie, 0) + 1
+
+    @staticmethod
+    def InformeFormatos():
+        """Muestra las superficies que se han dibujado sin estar en el formato de la pantalla"""
+        formatosIncorrectos = GestorRecursos().formatosIncorrectos
+        if not formatosIncorrectos:
+            print("Todas las superficies comprobadas estaban en el formato de la pantalla")
+            return
+        print("Superficies dibujadas sin estar en el formato de la pantalla:")
+        for superficie, veces in sorted(formatosIncorrectos.items(), key=lambda item: -item[1]):
+            print("  %s a %d bits: %d veces" % (superficie.get_size(), superficie.get_bitsize(), veces))
+
+    @staticmethod
+    def CargarFuente(nombre, tamano):
+        """Devuelve la fuente del sistema con ese nombre y tamaño (buscarla en el sistema es lento, asi que se hace una vez)"""
+        gestor = GestorRecursos()
+        clave = (nombre, tamano)
+        if clave not in gestor.fuentes:
+            gestor.fuentes[clave] = pygame.font.SysFont(nombre, tamano)
+        return gestor.fuentes[clave]
+
+    @staticmethod
+    def RenderizarTexto(nombre, tamano, texto, color, antialias=True):
+        """
+        Devuelve la imagen de un texto con la fuente del sistema (nombre, tamaño).
+        Los textos renderizados se guardan, para no volver a renderizar el mismo texto cada frame;
+        si hay mas de MAXIMO_TEXTOS se descarta el que hace mas tiempo que no se usa.
+        """
+        textos = GestorRecursos().textos
+        clave = (nombre, tamano, texto, tuple(color), antialias)
+        imagen = textos.get(clave)
+        if imagen is None:
+            imagen = GestorRecursos.CargarFuente(nombre, tamano).render(texto, antialias, color)
+            textos[clave] = imagen
+            if len(textos) > MAXIMO_TEXTOS:
+                textos.popitem(last=False)
+        else:
+            textos.move_to_end(clave)
+        return imagen
+
+    @staticmethod
+    def CargarSonido(nombre):
+        """Carga un sonido desde el directorio de sonidos"""
+        gestor = GestorRecursos()
+        if nombre not in gestor.sonidos:
+            ruta = os.path.join("sonidos", nombre)
+            gestor.sonidos[nombre] = pygame.mixer.Sound(ruta)
+        return gestor.sonidos[nombre]
+
     @staticmethod
     def CargarArchivoCoordenadas(nombre):
-        """Carga un archivo de coordenadas desde el directorio de recursos"""
-        if nombre not in GestorRecursos._instance.coordenadas:
-            ruta = os.path.join("recursos", "coordenadas", nombre)
+        """Carga un archivo de coordenadas desde el directorio de imagenes"""
+        if nombre not in GestorRecursos().coordenadas:
+            ruta = GestorRecursos.RutaImagen(nombre)
             archivo = open(ruta, "r")
             contenido = archivo.read()
             archivo.close()
-            GestorRecursos._instance.coordenadas[nombre] = contenido
-        return GestorRecursos._instance.coordenadas[nombre]
+            GestorRecursos().coordenadas[nombre] = contenido
+        return GestorRecursos().coordenadas[nombre]
 
 class Camera:
     def __init__(self, width, height, world_width, world_height):
@@ -50,12 +183,27 @@ class Camera:
         self.world_width = world_width
         self.world_height = world_height
         self.scroll = pygame.Vector2(0, 0)
+
+    # Estado de la camara en binario (ver Fase.empaquetarEstado): el scroll
+    FORMATO_ESTADO = struct.Struct('<2d')
+
+    def empaquetarEstado(self):
+        return self.FORMATO_ESTADO.pack(self.scroll.x, self.scroll.y)
+
+    def desempaquetarEstado(self, datos, desplazamiento=0):
+        # Se cambia el mismo vector, porque los sprites guardan una referencia a el
+        self.scroll.x, self.scroll.y = self.FORMATO_ESTADO.unpack_from(datos, desplazamiento)
+        return desplazamiento + self.FORMATO_ESTADO.size
         
     def update(self, target):
-        """Actualiza la posición de la cámara basándose en el objetivo"""
+        """
+        Actualiza la posición de la cámara para centrarla en el objetivo, un punto (x, y)
+        en coordenadas globales (no de pantalla, que dependen de la propia cámara).
+        Devuelve True si la cámara se ha movido.
+        """
         # Calculamos la posición objetivo de la cámara
-        target_x = target.rect.centerx - self.width / 2
-        target_y = target.rect.centery - self.height / 2
+        target_x = target[0] - self.width / 2
+        target_y = target[1] - self.height / 2
         
         # Limitamos la cámara a los bordes del mundo
         target_x = max(0, min(target_x, self.world_width - self.width))
@@ -74,10 +222,12 @@ class Camera:
     
     def inCamera(self, sprite):
         """Comprueba si un sprite está dentro de la vista de la cámara"""
-        return (sprite.rect.right > self.scroll.x and 
-                sprite.rect.left < self.scroll.x + self.width and
-                sprite.rect.bottom > self.scroll.y and 
-                sprite.rect.top < self.scroll.y + self.height)
+        # Se compara en coordenadas globales (posicion_global es la esquina inferior izquierda del sprite)
+        (left, bottom) = sprite.posicion_global
+        return (left + sprite.rect.width > self.scroll.x and 
+                left < self.scroll.x + self.width and
+                bottom > self.scroll.y and 
+                bottom - sprite.rect.height < self.scroll.y + self.height)
     
     def actualizar_sprites(self, sprites):
         """Actualiza la posición en pantalla de todos los sprites"""
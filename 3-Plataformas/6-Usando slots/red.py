@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+
+import socket
+import struct
+import time
+import pygame
+from pygame.locals import *
+from configuracion import Configuracion
+from escena import Escena
+from fase import Fase
+from personajes import Jugador, QUIETO
+from instantaneas import HistorialInstantaneas, Repeticion
+import instantaneas
+
+# Tipos de mensaje (cada mensaje lleva delante su tipo y la longitud de sus datos)
+MENSAJE_ENTRADA = 1
+MENSAJE_ESTADO = 2
+MENSAJE_PING = 3
+MENSAJE_PONG = 4
+
+CABECERA = struct.Struct('<BH')
+# Entrada: paso en el que se aplica y movimiento del jugador
+ENTRADA = struct.Struct('<IB')
+# (el estado se envia como una instantanea, ver instantaneas.py)
+# Ping y pong: momento de envio, en segundos
+MARCA_TIEMPO = struct.Struct('<d')
+
+# Jugadores
+ANFITRION = 0
+INVITADO = 1
+
+# -------------------------------------------------
+# Clase ConexionRed
+
+class ConexionRed:
+    """
+    Conexion TCP sin bloqueo con el otro jugador.
+
+    Los mensajes que se envian se acumulan y se mandan todos juntos con enviar() (una vez por
+    frame); recibir() lee todo lo que haya llegado sin esperar y devuelve los mensajes completos.
+    """
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.conexion.setblocking(False)
+        # Los mensajes se envian en cuanto se llama a enviar(), sin que TCP los retrase para juntarlos
+        self.conexion.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.pendienteEnvio = bytearray()
+        self.pendienteLectura = bytearray()
+        self.abierta = True
+        # Estadisticas
+        self.bytesEnviados = 0
+        self.bytesRecibidos = 0
+
+    @staticmethod
+    def EsperarInvitado(puerto):
+        """Espera (bloqueando) a que se conecte el otro jugador"""
+        servidor = socket.create_server(('', puerto))
+        print(f"Esperando al otro jugador en el puerto {puerto}")
+        conexion, direccion = servidor.accept()
+        servidor.close()
+        return ConexionRed(conexion)
+
+    @staticmethod
+    def Conectar(host, puerto):
+        return ConexionRed(socket.create_connection((host, puerto)))
+
+    def enviarMensaje(self, tipo, datos):
+        self.pendienteEnvio += CABECERA.pack(tipo, len(datos))
+        self.pendienteEnvio += datos
+
+    def enviar(self):
+        if not self.pendienteEnvio or not self.abierta:
+            return
+        try:
+            enviados = self.conexion.send(self.pendienteEnvio)
+        except BlockingIOError:
+            return
+        except OSError:
+            self.abierta = False
+            return
+        del self.pendienteEnvio[:enviados]
+        self.bytesEnviados += enviados
+
+    def recibir(self):
+        """Devuelve la lista de mensajes (tipo, datos) que han llegado completos"""
+        while self.abierta:
+            try:
+                datos = self.conexion.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                self.abierta = False
+                break
+            if not datos:
+                self.abierta = False
+                break
+            self.pendienteLectura += datos
+            self.bytesRecibidos += len(datos)
+        mensajes = []
+        lectura = self.pendienteLectura
+        inicio = 0
+        while len(lectura) - inicio >= CABECERA.size:
+            tipo, longitud = CABECERA.unpack_from(lectura, inicio)
+            fin = inicio + CABECERA.size + longitud
+            if fin > len(lectura):
+                break
+            mensajes.append((tipo, bytes(lectura[inicio + CABECERA.size:fin])))
+            inicio = fin
+        del lectura[:inicio]
+        return mensajes
+
+    def cerrar(self):
+        self.abierta = False
+        self.conexion.close()
+
+# -------------------------------------------------
+# Clase FaseRed
+
+class FaseRed(Fase):
+    """
+    Fase en la que cada jugador esta en un programa (o un ordenador) distinto.
+
+    Los dos programas simulan la fase entera con un paso de tiempo fijo, de forma que con las
+    mismas entradas llegan al mismo estado (lockstep). La entrada de cada jugador se aplica
+    RETARDO_ENTRADA pasos despues de leerla, y mientras tanto se envia al otro; si en algun
+    paso todavia no ha llegado la entrada del otro jugador, la simulacion espera.
+
+    El anfitrion (el jugador 1) tiene la autoridad: despues de cada paso envia la instantanea
+    de la fase. El invitado la compara con la que guardo el en ese paso y, si no coincide, se
+    queda con la del anfitrion y vuelve a simular desde alli los pasos que ya habia dado.
+
+    Por eso la fase no se deja en cuanto un jugador es alcanzado en la simulacion (que en el
+    invitado puede ser una prediccion, o un paso que se esta repitiendo), sino cuando ese paso
+    esta confirmado: en el anfitrion al simularlo, y en el invitado al recibir su instantanea.
+    """
+
+    def __init__(self, director, conexion, jugadorLocal):
+        super().__init__(director)
+        # Cargar una partida guardada en un solo lado haria que los jugadores se desincronizaran
+        self.manejadores.pop(pygame.KEYDOWN, None)
+        config = Configuracion()
+        self.conexion = conexion
+        self.local = jugadorLocal
+        self.remoto = INVITADO if jugadorLocal == ANFITRION else ANFITRION
+        self.pasoTiempo = config.PASO_RED
+        self.retardoEntrada = config.RETARDO_ENTRADA
+        self.pasosPing = config.PASOS_PING
+        # Siguiente paso a simular, y tiempo acumulado que aun no se ha simulado
+        self.paso = 0
+        self.acumulado = 0
+        # Movimiento de cada jugador en cada paso; los primeros pasos no hay entrada, asi que se esta quieto
+        self.entradas = ({}, {})
+        for paso in range(self.retardoEntrada):
+            self.entradas[ANFITRION][paso] = QUIETO
+            self.entradas[INVITADO][paso] = QUIETO
+        self.teclasPulsadas = None
+        # En el invitado: instantaneas de los pasos que ha simulado (hasta comprobarlas) y las recibidas del anfitrion
+        self.historial = HistorialInstantaneas(128)
+        self.estadosAnfitrion = {}
+        # En el anfitrion, si se indica en la configuracion, se graba la partida para validarla despues
+        self.ficheroRepeticion = config.FICHERO_REPETICION if jugadorLocal == ANFITRION else None
+        self.repeticion = None
+        # Si ya se ha confirmado el paso en el que termina la partida
+        self.finConfirmado = False
+        # Estadisticas
+        self.esperas = 0
+        self.correcciones = 0
+        self.pasosRepetidos = 0
+        self.tamanoEstado = 0
+        self.rtt = 0.0
+        self.ultimoPing = -1
+        self.inicio = time.perf_counter()
+        self.siguientesEstadisticas = self.inicio + 1
+
+    @staticmethod
+    def CrearDesdeArgumentos(director, argumentos):
+        """
+        Conecta con el otro jugador y crea la fase, a partir de los argumentos del programa:
+            anfitrion [puerto]
+            invitado host [puerto]
+        """
+        puertoPorDefecto = Configuracion().PUERTO_RED
+        if argumentos[0] == 'anfitrion':
+            puerto = int(argumentos[1]) if len(argumentos) > 1 else puertoPorDefecto
+            return FaseRed(director, ConexionRed.EsperarInvitado(puerto), ANFITRION)
+        host = argumentos[1] if len(argumentos) > 1 else 'localhost'
+        puerto = int(argumentos[2]) if len(argumentos) > 2 else puertoPorDefecto
+        return FaseRed(director, ConexionRed.Conectar(host, puerto), INVITADO)
+
+    def eventos(self, lista_eventos):
+        # Solo se tratan los eventos de la tabla (salir del programa); el movimiento de los
+        #  jugadores no se aplica aqui, sino en cada paso de la simulacion (ver avanzarPaso)
+        Escena.eventos(self, lista_eventos)
+        self.teclasPulsadas = pygame.key.get_pressed()
+
+    def update(self, tiempo):
+        with self.seccion("red"):
+            self.procesarMensajes()
+        if not self.conexion.abierta:
+            # El otro jugador se ha ido
+            self.guardarRepeticion()
+            self.director.salirEscena()
+            return
+
+        # Se dan tantos pasos fijos como quepan en el tiempo que ha pasado
+        #  (sin acumular mas de unos pocos, por si el programa se ha quedado parado)
+        self.acumulado = min(self.acumulado + tiempo, 4 * self.pasoTiempo)
+        while self.acumulado >= self.pasoTiempo and not self.finConfirmado:
+            if not self.avanzarPaso():
+                self.esperas += 1
+                break
+            self.acumulado -= self.pasoTiempo
+
+        if self.local == INVITADO:
+            with self.seccion("red"):
+                self.comprobarEstados()
+
+        if self.paso % self.pasosPing == 0 and self.paso != self.ultimoPing:
+            self.ultimoPing = self.paso
+            self.conexion.enviarMensaje(MENSAJE_PING, MARCA_TIEMPO.pack(time.perf_counter()))
+        with self.seccion("red"):
+            self.conexion.enviar()
+        self.mostrarEstadisticas()
+        # Se sale de la fase solo despues de enviar (en el anfitrion, la instantanea del ultimo paso)
+        if self.finConfirmado:
+            self.terminar()
+
+    def terminar(self):
+        self.guardarRepeticion()
+        Fase.terminar(self)
+
+    def guardarRepeticion(self):
+        if self.repeticion is not None:
+            self.repeticion.guardarArchivo(self.ficheroRepeticion)
+            self.repeticion = None
+
+    def avanzarPaso(self):
+        """Simula el siguiente paso, si ya se tienen las entradas de los dos jugadores"""
+        paso = self.paso
+        # La entrada local se lee ahora pero se aplica retardoEntrada pasos despues
+        pasoEntrada = paso + self.retardoEntrada
+        if pasoEntrada not in self.entradas[self.local]:
+            movimiento = QUIETO
+            if self.teclasPulsadas is not None:
+                movimiento = Jugador.movimientoTeclas(self.teclasPulsadas, K_UP, K_DOWN, K_LEFT, K_RIGHT)
+            self.entradas[self.local][pasoEntrada] = movimiento
+            self.conexion.enviarMensaje(MENSAJE_ENTRADA, ENTRADA.pack(pasoEntrada, movimiento))
+        if paso not in self.entradas[self.remoto]:
+            return False
+
+        if self.ficheroRepeticion is not None and self.repeticion is None:
+            self.repeticion = Repeticion.Empezar(self, self.pasoTiempo)
+        movimientos = self.movimientos(paso)
+        self.simularPaso(movimientos, self.pasoTiempo)
+        # Los sonidos y el humo se presentan solo la primera vez que se simula cada paso:
+        #  al repetirlo en un rollback (ver comprobarEstados) no vuelven a sonar ni a salir
+        self.presentarEfectos()
+        self.paso += 1
+        instantanea = instantaneas.guardar(self, paso)
+        self.tamanoEstado = len(instantanea)
+        if self.local == ANFITRION:
+            self.conexion.enviarMensaje(MENSAJE_ESTADO, instantanea)
+            self.olvidarEntradas(paso)
+            if self.repeticion is not None:
+                self.repeticion.anotar(self, movimientos)
+            # Los pasos del anfitrion son los que valen: si en este termina la partida, termina
+            self.finConfirmado = self.terminada
+        else:
+            self.historial.guardar(paso, instantanea)
+        return True
+
+    def movimientos(self, paso):
+        return (self.entradas[ANFITRION][paso], self.entradas[INVITADO][paso])
+
+    def comprobarEstados(self):
+        """En el invitado: compara los estados del anfitrion con los calculados en esos pasos"""
+        for paso in sorted(self.estadosAnfitrion):
+            if paso >= self.paso:
+                # Todavia no se ha simulado ese paso
+                break
+            instantanea = self.estadosAnfitrion.pop(paso)
+            if self.historial.obtener(paso) != instantanea:
+                # Se ha perdido la sincronizacion: manda el estado del anfitrion, y desde el
+                #  se vuelven a simular los pasos que ya se habian dado (rollback)
+                self.correcciones += 1
+                instantaneas.cargar(self, instantanea)
+                for siguiente in range(paso + 1, self.paso):
+                    self.simularPaso(self.movimientos(siguiente), self.pasoTiempo)
+                    self.historial.guardar(siguiente, instantaneas.guardar(self, siguiente))
+                    self.pasosRepetidos += 1
+            self.historial.descartarHasta(paso)
+            self.olvidarEntradas(paso)
+            if Fase.EstadoTerminado(instantanea):
+                # La partida termina en este paso para los dos, aunque el invitado ya hubiera predicho otra cosa
+                self.finConfirmado = True
+                break
+
+    def olvidarEntradas(self, paso):
+        # Las entradas de los pasos ya confirmados no se vuelven a necesitar
+        for entradas in self.entradas:
+            entradas.pop(paso, None)
+
+    def procesarMensajes(self):
+        for tipo, datos in self.conexion.recibir():
+            if tipo == MENSAJE_ENTRADA:
+                paso, movimiento = ENTRADA.unpack(datos)
+                self.entradas[self.remoto][paso] = movimiento
+            elif tipo == MENSAJE_ESTADO:
+                self.estadosAnfitrion[instantaneas.leerPaso(datos)] = datos
+            elif tipo == MENSAJE_PING:
+                self.conexion.enviarMensaje(MENSAJE_PONG, datos)
+            elif tipo == MENSAJE_PONG:
+                (enviado,) = MARCA_TIEMPO.unpack(datos)
+                self.rtt = time.perf_counter() - enviado
+
+    def estadisticas(self):
+        """Devuelve un diccionario con el uso de la red"""
+        duracion = max(time.perf_counter() - self.inicio, 1e-9)
+        return {
+            'pasos': self.paso,
+            'esperas': self.esperas,
+            'correcciones': self.correcciones,
+            'pasosRepetidos': self.pasosRepetidos,
+            'bytesEstado': self.tamanoEstado,
+            'bytesEnviadosPorSegundo': self.conexion.bytesEnviados / duracion,
+            'bytesRecibidosPorSegundo': self.conexion.bytesRecibidos / duracion,
+            'rttMs': self.rtt * 1000,
+        }
+
+    def mostrarEstadisticas(self):
+        # Una vez por segundo, en el titulo de la ventana
+        ahora = time.perf_counter()
+        if ahora < self.siguientesEstadisticas:
+            return
+        self.siguientesEstadisticas = ahora + 1
+        datos = self.estadisticas()
+        pygame.display.set_caption(
+            f"Jugador {self.local + 1} - RTT {datos['rttMs']:.0f} ms - "
+            f"enviado {datos['bytesEnviadosPorSegundo']:.0f} B/s, recibido {datos['bytesRecibidosPorSegundo']:.0f} B/s - "
+            f"esperas {datos['esperas']}, correcciones {datos['correcciones']}")
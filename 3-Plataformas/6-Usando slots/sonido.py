@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+import io
+import pygame
+from recursos import GestorRecursos
+from configuracion import Configuracion
+
+# Prioridades de los sonidos: los de prioridad alta tienen canales reservados
+#  y pueden interrumpir a los de prioridad menor si no queda ningun canal libre
+PRIORIDAD_BAJA = 0
+PRIORIDAD_NORMAL = 1
+PRIORIDAD_ALTA = 2
+
+# -------------------------------------------------
+# Clase GestorSonido
+
+class GestorSonido:
+    """
+    Clase Singleton que reproduce los efectos de sonido del juego.
+
+    Los sonidos se cargan (una sola vez, con el gestor de recursos) al registrarlos, no al
+    reproducirlos. Los canales del mezclador se reparten entre los sonidos de prioridad alta,
+    que tienen algunos reservados, y el resto. Si se pide el mismo sonido otra vez antes de su
+    intervalo minimo (por ejemplo, muchas colisiones seguidas) se ignora, y si no queda ningun
+    canal libre solo suena si hay otro de menor prioridad al que quitarle el canal.
+
+    Si no hay dispositivo de audio, todos los metodos funcionan pero no suena nada.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(GestorSonido, cls).__new__(cls)
+            cls._instance.inicializar()
+        return cls._instance
+
+    def inicializar(self):
+        config = Configuracion()
+        self.activo = pygame.mixer.get_init() is not None
+        # Sonidos registrados: nombre -> (sonido, prioridad, intervalo minimo en ms)
+        self.efectos = {}
+        # Ultima vez (en ms) que sono cada efecto
+        self.ultimaVez = {}
+        # Canales del mezclador (los primeros, reservados) y la prioridad de lo que suena en cada uno
+        self.canales = []
+        self.reservados = 0
+        self.prioridadCanal = []
+        # Estadisticas
+        self.reproducidos = 0
+        self.ignorados = 0
+        self.interrumpidos = 0
+        if self.activo:
+            pygame.mixer.set_num_channels(config.CANALES_SONIDO)
+            # Los primeros canales se reservan para los sonidos de prioridad alta
+            #  (tampoco los usa Sound.play(), si algun sonido se reproduce directamente)
+            self.reservados = pygame.mixer.set_reserved(config.CANALES_RESERVADOS)
+            self.canales = [pygame.mixer.Channel(i) for i in range(config.CANALES_SONIDO)]
+            self.prioridadCanal = [PRIORIDAD_BAJA] * len(self.canales)
+
+    def registrar(self, nombre, archivo, prioridad=PRIORIDAD_NORMAL, intervalo=50, volumen=1.0):
+        """
+        Carga un efecto de sonido para poder reproducirlo despues por su nombre.
+
+        Args:
+            nombre: Nombre con el que se reproduce el efecto
+            archivo: Archivo del sonido, en el directorio de sonidos de los recursos
+            prioridad: PRIORIDAD_BAJA, PRIORIDAD_NORMAL o PRIORIDAD_ALTA
+            intervalo: Milisegundos minimos entre dos reproducciones del efecto
+            volumen: Volumen del efecto, entre 0 y 1
+        """
+        if not self.activo:
+            return
+        try:
+            sonido = GestorRecursos.CargarSonido(archivo)
+        except (pygame.error, FileNotFoundError) as e:
+            print(f"Error al cargar el sonido {archivo}: {e}")
+            return
+        sonido.set_volume(volumen)
+        self.efectos[nombre] = (sonido, prioridad, intervalo)
+
+    def reproducir(self, nombre):
+        """Reproduce un efecto registrado. Devuelve el canal en el que suena, o None si no suena"""
+        efecto = self.efectos.get(nombre)
+        if efecto is None:
+            return None
+        sonido, prioridad, intervalo = efecto
+        # Si el mismo efecto acaba de sonar, no se vuelve a reproducir
+        ahora = pygame.time.get_ticks()
+        if ahora - self.ultimaVez.get(nombre, -intervalo) < intervalo:
+            self.ignorados += 1
+            return None
+        indice = self._buscarCanal(prioridad)
+        if indice is None:
+            self.ignorados += 1
+            return None
+        canal = self.canales[indice]
+        canal.play(sonido)
+        self.prioridadCanal[indice] = prioridad
+        self.ultimaVez[nombre] = ahora
+        self.reproducidos += 1
+        return canal
+
+    def _buscarCanal(self, prioridad):
+        # Los sonidos de prioridad alta pueden usar todos los canales (primero los reservados),
+        #  el resto solo los que no estan reservados
+        primero = 0 if prioridad >= PRIORIDAD_ALTA else self.reservados
+        if primero >= len(self.canales):
+            return None
+        # Primero se busca un canal libre
+        for indice in range(primero, len(self.canales)):
+            if not self.canales[indice].get_busy():
+                return indice
+        # Si no hay ninguno, se le quita el canal al sonido de menor prioridad (si es menor que esta)
+        indice = min(range(primero, len(self.canales)), key=lambda indice: self.prioridadCanal[indice])
+        if self.prioridadCanal[indice] < prioridad:
+            self.canales[indice].stop()
+            self.interrumpidos += 1
+            return indice
+        return None
+
+    def estadisticas(self):
+        """Devuelve un diccionario con el uso de los canales"""
+        return {
+            'reproducidos': self.reproducidos,
+            'ignorados': self.ignorados,
+            'interrumpidos': self.interrumpidos,
+        }
+
+# -------------------------------------------------
+# Clase GestorMusica
+
+class GestorMusica:
+    """
+    Musica de fondo de las escenas, con pygame.mixer.music.
+
+    La musica se va descomprimiendo mientras suena (nunca se descomprime entera en memoria).
+    Los bytes del archivo se leen antes, en un hilo de carga, para que el cambio de pista no
+    espere a leer el disco. Al cambiar de pista, la anterior se desvanece y despues la nueva
+    entra tambien con un fundido.
+    """
+
+    def __init__(self, hilos):
+        # hilos es el ThreadPoolExecutor en el que se leen los archivos
+        self.hilos = hilos
+        self.activo = pygame.mixer.get_init() is not None
+        # Lecturas de archivos de musica en curso o terminadas, por ruta
+        self.precargadas = {}
+        # La pista que se ha pedido (la que suena, o la que va a sonar) y la que falta por empezar
+        self.actual = None
+        self.pendiente = None
+
+    def precargar(self, ruta):
+        """Empieza a leer el archivo de una pista en segundo plano (por ejemplo, la de la siguiente escena)"""
+        if self.activo and ruta is not None and ruta not in self.precargadas:
+            self.precargadas[ruta] = self.hilos.submit(GestorMusica._leer, ruta)
+
+    @staticmethod
+    def _leer(ruta):
+        with open(ruta, 'rb') as archivo:
+            return archivo.read()
+
+    def reproducir(self, ruta):
+        """Cambia a otra pista (None para quitar la musica) con un fundido"""
+        if not self.activo or ruta == self.actual:
+            return
+        self.actual = ruta
+        self.pendiente = ruta
+        self.precargar(ruta)
+        # La pista que suena se desvanece; la nueva empieza cuando haya terminado (ver update)
+        if pygame.mixer.music.get_busy():
+            pygame.mixer.music.fadeout(Configuracion().TIEMPO_FUNDIDO)
+
+    def update(self):
+        # Se empieza la pista pendiente cuando ya no suena la anterior y su archivo esta leido
+        if self.pendiente is None or pygame.mixer.music.get_busy():
+            return
+        lectura = self.precargadas.get(self.pendiente)
+        if lectura is not None and not lectura.done():
+            return
+        ruta, self.pendiente = self.pendiente, None
+        if lectura is None:
+            return
+        del self.precargadas[ruta]
+        try:
+            pygame.mixer.music.load(io.BytesIO(lectura.result()), ruta)
+        except (pygame.error, OSError) as e:
+            print(f"Error al cargar la musica {ruta}: {e}")
+            return
+        pygame.mixer.music.play(-1, fade_ms=Configuracion().TIEMPO_FUNDIDO)
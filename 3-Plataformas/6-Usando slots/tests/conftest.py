@@ -0,0 +1,21 @@
+# Configuracion comun de las pruebas: se ejecutan sin ventana ni sonido, desde el directorio
+#  de la fase (las imagenes y los sonidos se cargan con rutas relativas a el)
+import os
+import sys
+
+import pytest
+
+DIRECTORIO_FASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, DIRECTORIO_FASE)
+
+import pygame
+
+
+@pytest.fixture(autouse=True)
+def pantalla(monkeypatch):
+    # Las imagenes se convierten al formato de la pantalla, asi que tiene que haber una
+    monkeypatch.chdir(DIRECTORIO_FASE)
+    pygame.init()
+    return pygame.display.set_mode((800, 600))
@@ -0,0 +1,54 @@
+# Pruebas de las animaciones: los frames que comparten varias animaciones
+#  (por la cache de transformaciones o por getCopies) no se cambian desde una de ellas
+import pygame
+
+from animaciones import Animacion, AnimacionFuego
+
+TRANSFORMACIONES = (('scale', (200, 200)),)
+
+
+def alfas(animacion):
+    return [animacion.getFrame(i).get_alpha() for i in range(animacion.numFrames)]
+
+
+def test_animaciones_de_la_cache_independientes():
+    a = AnimacionFuego(transformaciones=TRANSFORMACIONES)
+    b = AnimacionFuego(transformaciones=TRANSFORMACIONES)
+    # Las dos usan los mismos frames transformados, calculados una sola vez
+    assert a.getFrame(0) is b.getFrame(0)
+    antes = alfas(b)
+
+    a.set_alpha(50)
+
+    assert alfas(a) == [50] * a.numFrames
+    assert alfas(b) == antes
+    # Y las que se creen despues siguen sacando los frames de la cache sin cambiar
+    assert alfas(AnimacionFuego(transformaciones=TRANSFORMACIONES)) == antes
+
+
+def test_copias_independientes():
+    original = AnimacionFuego(transformaciones=TRANSFORMACIONES)
+    antes = alfas(original)
+    copia, otra = original.getCopies(2)
+
+    copia.set_colorkey((0, 0, 0))
+    copia.set_alpha(50)
+
+    assert alfas(copia) == [50] * copia.numFrames
+    assert alfas(original) == antes
+    assert alfas(otra) == antes
+    assert original.getFrame(0).get_colorkey() is None
+    # La copia ya tiene sus propios frames, asi que los siguientes cambios no los vuelven a copiar
+    frame = copia.getFrame(0)
+    copia.set_alpha(80)
+    assert copia.getFrame(0) is frame
+
+
+def test_original_independiente_de_sus_copias():
+    original = AnimacionFuego()
+    copia = original.getCopy()
+
+    original.set_alpha(50)
+
+    assert alfas(original) == [50] * original.numFrames
+    assert copia.getFrame(0).get_alpha() != 50
@@ -0,0 +1,92 @@
+# Pruebas del director: las escenas que quedan enterradas en la pila se suspenden,
+#  y se reanudan cuando vuelven a la cima
+from animaciones import Animacion
+from director import Director
+from escena import Escena
+from fase import Fase
+from menu import Menu
+
+
+class EscenaPrueba(Escena):
+    # Escena que anota cuando se suspende y se reanuda, y que en cada update llama a una funcion
+    def __init__(self, director, nombre, registro, alActualizar):
+        super().__init__(director)
+        self.nombre = nombre
+        self.registro = registro
+        self.alActualizar = alActualizar
+
+    def suspender(self):
+        self.registro.append(('suspender', self.nombre))
+
+    def reanudar(self):
+        self.registro.append(('reanudar', self.nombre))
+
+    def update(self, tiempo):
+        self.alActualizar(self)
+
+    def draw(self, pantalla):
+        pass
+
+
+def test_escena_enterrada_se_suspende_y_se_reanuda():
+    director = Director()
+    registro = []
+    arriba = EscenaPrueba(director, 'arriba', registro, lambda escena: director.salirEscena())
+    pasadas = []
+
+    def actualizarAbajo(escena):
+        # La primera vez apila la otra escena encima; cuando vuelve a la cima, termina
+        pasadas.append(escena.suspendida)
+        if len(pasadas) == 1:
+            director.apilarEscena(arriba)
+        else:
+            director.salirEscena()
+
+    abajo = EscenaPrueba(director, 'abajo', registro, actualizarAbajo)
+    director.apilarEscena(abajo)
+    director.execute()
+
+    assert registro == [('suspender', 'abajo'), ('reanudar', 'abajo')]
+    assert pasadas == [False, False]
+    assert not abajo.suspendida and not arriba.suspendida
+
+
+def clavesMenu(menu):
+    claves = set()
+    for panel in menu.listaPaneles.values():
+        claves |= panel.animaciones.clavesTransformaciones()
+    return claves
+
+
+def test_menu_suspendido_mientras_se_juega(monkeypatch):
+    director = Director()
+    menu = Menu(director)
+    claves = clavesMenu(menu)
+    assert claves and claves <= set(Animacion._cacheTransformaciones)
+    durante = []
+
+    def actualizarMenu(self, *args):
+        # Se pulsa Jugar una vez; cuando la partida ha terminado y se vuelve al menu, se sale
+        if not durante and director.preparacion is None:
+            self.ejecutarJuego()
+        elif durante:
+            director.salirPrograma()
+
+    def actualizarFase(self, tiempo):
+        # Durante la partida el menu esta suspendido y sus frames transformados no estan en la
+        #  cache, pero si los de la fase; la partida termina en el primer frame
+        clavesFase = self.animacionesDetras.clavesTransformaciones() | self.animacionesDelante.clavesTransformaciones()
+        cache = set(Animacion._cacheTransformaciones)
+        durante.append((menu.suspendida, claves & cache, clavesFase <= cache))
+        self.terminar()
+
+    monkeypatch.setattr(Menu, 'update', actualizarMenu)
+    monkeypatch.setattr(Fase, 'update', actualizarFase)
+    director.apilarEscena(menu)
+    director.execute()
+
+    assert durante == [(True, set(), True)]
+    # Al volver al menu se han vuelto a crear sus animaciones, con sus frames en la cache
+    assert not menu.suspendida
+    assert clavesMenu(menu) == claves
+    assert claves <= set(Animacion._cacheTransformaciones)